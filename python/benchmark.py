@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from rdflib import Graph, RDF, RDFS, OWL, XSD, URIRef, BNode, Literal
+from rdflib.collection import Collection
+from rdflib.namespace import DC, DCTERMS
+
+log = logging.getLogger("benchmark")
+
+BENCHMARK_FORMATS = ("ttl", "owl", "ofn")
+BENCHMARK_MKDOCS = "site_name: Benchmark\nnav:\n  - Home: index.md\n"
+
+# Restriction kinds of the synthetic ontologies: OFN constructor and OWL predicate for each
+RESTRICTION_KINDS = {
+    "some": ("ObjectSomeValuesFrom", OWL.someValuesFrom),
+    "all": ("ObjectAllValuesFrom", OWL.allValuesFrom),
+    "min": ("ObjectMinCardinality", OWL.minQualifiedCardinality),
+    "max": ("ObjectMaxCardinality", OWL.maxQualifiedCardinality),
+    "exact": ("ObjectExactCardinality", OWL.qualifiedCardinality),
+    "data": ("DataMaxCardinality", OWL.maxQualifiedCardinality)
+}
+
+def generate_ontology(name: str, classes: int, depth: int, restrictions: float, nesting: int, patterns: float, seed: int) -> dict:
+    """Return the specification of a synthetic ontology.
+
+    classes is the number of classes, arranged in a subclass forest at most depth levels deep; each class
+    has on average restrictions restrictions, whose fillers are union/intersection expressions nested up
+    to nesting levels for about a third of them; the fraction patterns of the classes belongs to a pattern."""
+    rng = random.Random(seed)
+    class_names = [f"Class{i}" for i in range(classes)]
+    object_properties = [f"relatesTo{i}" for i in range(max(1, classes // 10))]
+    data_properties = [f"hasValue{i}" for i in range(max(1, classes // 20))]
+    pattern_names = [f"Pattern{i}" for i in range(max(1, classes // 20))]
+
+    def expression(level):
+        if level == 0 or rng.random() < 0.5:
+            return rng.choice(class_names)
+        op = rng.choice(("unionOf", "intersectionOf"))
+        return (op, [expression(level - 1) for _ in range(rng.randint(2, 3))])
+
+    levels = {}
+    spec_classes = []
+    for i, cls_name in enumerate(class_names):
+        candidates = [j for j in range(i) if levels[class_names[j]] < depth - 1]
+        parent = class_names[rng.choice(candidates)] if candidates and rng.random() < 0.9 else None
+        levels[cls_name] = levels[parent] + 1 if parent else 0
+        count = int(restrictions) + (rng.random() < restrictions - int(restrictions))
+        cls_restrictions = []
+        for _ in range(count):
+            kind = rng.choice(tuple(RESTRICTION_KINDS))
+            if kind == "data":
+                cls_restrictions.append({"kind": kind, "property": rng.choice(data_properties), "n": 1, "filler": None})
+            else:
+                filler = expression(nesting) if nesting and rng.random() < 0.3 else rng.choice(class_names)
+                cls_restrictions.append({"kind": kind, "property": rng.choice(object_properties), "n": rng.randint(1, 3), "filler": filler})
+        spec_classes.append({
+            "name": cls_name,
+            "parent": parent,
+            "pattern": rng.choice(pattern_names) if rng.random() < patterns else None,
+            "restrictions": cls_restrictions
+        })
+    return {
+        "name": name,
+        "ns": f"https://example.org/benchmark/{name}#",
+        "classes": spec_classes,
+        "object_properties": object_properties,
+        "data_properties": data_properties
+    }
+
+def ontology_graph(spec: dict) -> Graph:
+    """Build the RDF graph of a synthetic ontology, for the Turtle and RDF/XML files."""
+    g = Graph()
+    ns = spec["ns"]
+    g.bind("", ns)
+    g.bind("dc", DC)
+    g.bind("dcterms", DCTERMS)
+    ontology = URIRef(ns)
+    g.add((ontology, RDF.type, OWL.Ontology))
+    g.add((ontology, DC.title, Literal(f"{spec['name']} Ontology")))
+    g.add((ontology, DC.description, Literal("A synthetic ontology for benchmarking.")))
+    for prop in spec["object_properties"]:
+        g.add((URIRef(ns + prop), RDF.type, OWL.ObjectProperty))
+    for prop in spec["data_properties"]:
+        g.add((URIRef(ns + prop), RDF.type, OWL.DatatypeProperty))
+        g.add((URIRef(ns + prop), RDFS.range, XSD.string))
+
+    def expression(expr):
+        if isinstance(expr, str):
+            return URIRef(ns + expr)
+        node = BNode()
+        g.add((node, RDF.type, OWL.Class))
+        members = BNode()
+        Collection(g, members, [expression(member) for member in expr[1]])
+        g.add((node, OWL[expr[0]], members))
+        return node
+
+    for cls in spec["classes"]:
+        cls_uri = URIRef(ns + cls["name"])
+        g.add((cls_uri, RDF.type, OWL.Class))
+        g.add((cls_uri, RDFS.label, Literal(cls["name"])))
+        g.add((cls_uri, DCTERMS.description, Literal(f"The {cls['name']} class.")))
+        if cls["parent"]:
+            g.add((cls_uri, RDFS.subClassOf, URIRef(ns + cls["parent"])))
+        if cls["pattern"]:
+            g.add((cls_uri, XSD.pattern, Literal(cls["pattern"])))
+        for restriction in cls["restrictions"]:
+            node = BNode()
+            g.add((cls_uri, RDFS.subClassOf, node))
+            g.add((node, RDF.type, OWL.Restriction))
+            g.add((node, OWL.onProperty, URIRef(ns + restriction["property"])))
+            predicate = RESTRICTION_KINDS[restriction["kind"]][1]
+            if restriction["kind"] in ("some", "all"):
+                g.add((node, predicate, expression(restriction["filler"])))
+            else:
+                g.add((node, predicate, Literal(restriction["n"], datatype=XSD.nonNegativeInteger)))
+                if restriction["kind"] == "data":
+                    g.add((node, OWL.onDataRange, XSD.string))
+                else:
+                    g.add((node, OWL.onClass, expression(restriction["filler"])))
+    return g
+
+def ontology_ofn(spec: dict) -> str:
+    """Write a synthetic ontology in OWL functional syntax."""
+    def expression(expr):
+        if isinstance(expr, str):
+            return f":{expr}"
+        constructor = "ObjectUnionOf" if expr[0] == "unionOf" else "ObjectIntersectionOf"
+        return f"{constructor}({' '.join(expression(member) for member in expr[1])})"
+
+    lines = [
+        f"Prefix(:=<{spec['ns']}>)",
+        f"Prefix(owl:=<{OWL}>)",
+        f"Prefix(rdf:=<{RDF}>)",
+        f"Prefix(rdfs:=<{RDFS}>)",
+        f"Prefix(xsd:=<{XSD}>)",
+        f"Prefix(dc:=<{DC}>)",
+        f"Prefix(dcterms:=<{DCTERMS}>)",
+        "",
+        f"Ontology(<{spec['ns']}>",
+        f"Annotation(dc:title \"{spec['name']} Ontology\")",
+        "Annotation(dc:description \"A synthetic ontology for benchmarking.\")"
+    ]
+    lines += [f"Declaration(ObjectProperty(:{prop}))" for prop in spec["object_properties"]]
+    for prop in spec["data_properties"]:
+        lines += [f"Declaration(DataProperty(:{prop}))", f"DataPropertyRange(:{prop} xsd:string)"]
+    for cls in spec["classes"]:
+        name = cls["name"]
+        lines += [
+            f"Declaration(Class(:{name}))",
+            f"AnnotationAssertion(rdfs:label :{name} \"{name}\")",
+            f"AnnotationAssertion(dcterms:description :{name} \"The {name} class.\")"
+        ]
+        if cls["parent"]:
+            lines.append(f"SubClassOf(:{name} :{cls['parent']})")
+        if cls["pattern"]:
+            lines.append(f"AnnotationAssertion(xsd:pattern :{name} \"{cls['pattern']}\")")
+        for restriction in cls["restrictions"]:
+            constructor = RESTRICTION_KINDS[restriction["kind"]][0]
+            if restriction["kind"] in ("some", "all"):
+                lines.append(f"SubClassOf(:{name} {constructor}(:{restriction['property']} {expression(restriction['filler'])}))")
+            elif restriction["kind"] == "data":
+                lines.append(f"SubClassOf(:{name} {constructor}({restriction['n']} :{restriction['property']} xsd:string))")
+            else:
+                lines.append(f"SubClassOf(:{name} {constructor}({restriction['n']} :{restriction['property']} {expression(restriction['filler'])}))")
+    lines.append(")")
+    return "\n".join(lines) + "\n"
+
+def write_ontology(spec: dict, fmt: str, path: str):
+    if fmt == "ofn":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(ontology_ofn(spec))
+    else:
+        ontology_graph(spec).serialize(destination=path, format="turtle" if fmt == "ttl" else "xml")
+
+class _ErrorCollector(logging.Handler):
+    """Collect the error summary that the build logs after "Errors occurred:"."""
+    def __init__(self):
+        super().__init__(level=logging.ERROR)
+        self.in_summary = False
+        self.errors = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if self.in_summary:
+            self.errors.append(message.splitlines()[0])
+        elif message == "Errors occurred:":
+            self.in_summary = True
+
+def run_case(jobs: int) -> dict:
+    """Build the site in the current directory with onto2mkdocs and return its timings.
+
+    Runs in a separate process from a copy of the generator scripts, so every case starts
+    with an empty concept registry and fresh module state."""
+    logging.basicConfig(level=logging.WARNING)
+    collector = _ErrorCollector()
+    logging.getLogger().addHandler(collector)
+    import onto2mkdocs
+    from stage_timer import stage_stats, count_graph_probes
+    count_graph_probes()
+    sys.argv = ["onto2mkdocs.py", "--rebuild", "--no-cache", "--jobs", str(jobs)]
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    onto2mkdocs.main()
+    return {
+        "total_seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - start_cpu,
+        "stages": stage_stats(),
+        "errors": collector.errors
+    }
+
+def run_benchmark(sizes: list, formats: list, depth: int, restrictions: float, nesting: int, patterns: float, seed: int, jobs: int) -> list:
+    """Generate one ontology per size, build it in each format and return one result per (size, format)."""
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    scripts = [f for f in os.listdir(script_dir) if f.endswith(".py")]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="onto2mkdocs-benchmark-") as tmp_dir:
+        for size in sizes:
+            spec = generate_ontology(f"Benchmark{size}", size, depth, restrictions, nesting, patterns, seed)
+            triples = len(ontology_graph(spec))
+            for fmt in formats:
+                case_dir = os.path.join(tmp_dir, f"{size}-{fmt}")
+                python_dir = os.path.join(case_dir, "python")
+                docs_dir = os.path.join(case_dir, "site", "docs")
+                os.makedirs(python_dir)
+                os.makedirs(docs_dir)
+                for script in scripts:
+                    shutil.copy(os.path.join(script_dir, script), python_dir)
+                with open(os.path.join(case_dir, "site", "mkdocs.yml"), "w", encoding="utf-8") as f:
+                    f.write(BENCHMARK_MKDOCS)
+                ontology_path = os.path.join(docs_dir, f"{spec['name']}.{fmt}")
+                write_ontology(spec, fmt, ontology_path)
+
+                log.info("Benchmarking %d classes as .%s", size, fmt)
+                proc = subprocess.run([sys.executable, os.path.join(python_dir, "benchmark.py"), "--run-case", "--jobs", str(jobs)],
+                                      cwd=os.path.dirname(docs_dir), capture_output=True, text=True)
+                if proc.returncode != 0:
+                    log.error("Benchmark of %d classes as .%s failed:\n%s", size, fmt, proc.stderr)
+                    continue
+                result = {"format": fmt, "classes": size, "triples": triples, "file_bytes": os.path.getsize(ontology_path)}
+                result.update(json.loads(proc.stdout.splitlines()[-1]))
+                results.append(result)
+                log.info("  %.2fs total, %d errors", result["total_seconds"], len(result["errors"]))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmark.py", description="Time each stage of onto2mkdocs on synthetic ontologies and write the results as JSON.")
+    parser.add_argument("--sizes", default="50,200,1000", help="comma-separated class counts (default: 50,200,1000)")
+    parser.add_argument("--formats", default=",".join(BENCHMARK_FORMATS), help="comma-separated formats among ttl, owl and ofn (default: all)")
+    parser.add_argument("--depth", type=int, default=4, help="maximum depth of the subclass hierarchy (default: 4)")
+    parser.add_argument("--restrictions", type=float, default=2.0, help="average number of restrictions per class (default: 2.0)")
+    parser.add_argument("--nesting", type=int, default=2, help="maximum nesting of union/intersection fillers, 0 for named classes only (default: 2)")
+    parser.add_argument("--patterns", type=float, default=0.2, help="fraction of classes that belong to a pattern (default: 0.2)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed of the generator (default: 1)")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help="--jobs passed to onto2mkdocs (default: 1)")
+    parser.add_argument("--output", default="benchmark.json", help="JSON file to write (default: benchmark.json)")
+    parser.add_argument("--run-case", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        result = run_case(args.jobs)
+        print(json.dumps(result))
+        return
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s")
+    sizes = [int(size) for size in args.sizes.split(",")]
+    formats = [fmt.strip().lstrip(".") for fmt in args.formats.split(",")]
+    unknown = set(formats) - set(BENCHMARK_FORMATS)
+    if unknown:
+        parser.error(f"unsupported formats: {', '.join(sorted(unknown))}")
+    parameters = {"depth": args.depth, "restrictions": args.restrictions, "nesting": args.nesting, "patterns": args.patterns, "seed": args.seed, "jobs": args.jobs}
+    results = run_benchmark(sizes, formats, args.depth, args.restrictions, args.nesting, args.patterns, args.seed, args.jobs)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": parameters,
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    log.info("Wrote %d results to %s", len(results), args.output)
+
+if __name__ == "__main__":
+    main()
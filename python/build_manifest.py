@@ -0,0 +1,150 @@
+import os
+import json
+import hashlib
+import logging
+from functools import lru_cache
+from rdflib import Graph, RDF, RDFS, OWL, URIRef, BNode, Literal
+from rdflib.namespace import DCTERMS
+from diagram_generator import RENDER_FORMATS
+from concept_registry import registry_overlay
+from graph_index import graph_index, build_class_hierarchy, build_inherited_restrictions, build_subject_facts
+
+log = logging.getLogger("ofn2mkdocs")
+
+MANIFEST_NAME = ".build_manifest.json"
+
+# Modules whose source determines the generated pages and diagrams
+GENERATOR_MODULES = ("build_manifest.py", "class_model.py", "class_pipeline.py", "concept_registry.py", "diagram_generator.py", "graph_index.py", "markdown_generator.py", "utils.py")
+
+# Predicates of referenced properties and classes that affect how a class is rendered
+REFERENCED_PREDICATES = (RDF.type, OWL.inverseOf, RDFS.range)
+
+@lru_cache(maxsize=None)
+def generator_version() -> str:
+    """Hash of the generator source, so that any change to the generator invalidates every page."""
+    h = hashlib.sha256()
+    script_dir = os.path.dirname(os.path.realpath(__file__))
+    for name in GENERATOR_MODULES:
+        with open(os.path.join(script_dir, name), 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+def load_manifest(root_dir: str) -> dict:
+    """Load the page fingerprints recorded by the previous build; return {} if there are none or the generator changed."""
+    manifest_path = os.path.join(root_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except Exception as e:
+        log.warning("Ignoring unreadable build manifest %s: %s", manifest_path, str(e))
+        return {}
+    if manifest.get("generator") != generator_version():
+        log.info("Generator changed since the last build; rebuilding all pages")
+        return {}
+    return manifest.get("pages", {})
+
+def save_manifest(root_dir: str, pages: dict, failed_renders: list = ()):
+    """Write the page fingerprints of this build, dropping pages whose diagram failed to render."""
+    for dot_file, *_ in failed_renders:
+        pages.pop(os.path.splitext(os.path.basename(dot_file))[0], None)
+    manifest_path = os.path.join(root_dir, MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({"generator": generator_version(), "pages": dict(sorted(pages.items()))}, f, indent=1)
+    log.info("Updated build manifest %s with %d pages", manifest_path, len(pages))
+
+def term_key(g, term, seen: frozenset = frozenset()) -> str:
+    """Canonical string for a term; blank nodes are expanded by their content, since their labels change on every parse.
+
+    g is the graph or its SubjectFacts."""
+    if isinstance(term, BNode):
+        if term in seen:
+            return "[cycle]"
+        seen = seen | {term}
+        return "[" + "; ".join(sorted(f"{term_key(g, p)} {term_key(g, o, seen)}" for p, o in g.predicate_objects(term))) + "]"
+    if isinstance(term, Literal):
+        return term.n3()
+    return f"<{term}>"
+
+def context_fingerprint(context: dict) -> str:
+    """Hash the global inputs shared by every page of one ontology."""
+    shared = {
+        "generator": generator_version(),
+        "ns": context["ns"],
+        "ontology_name": context["ontology_name"],
+        "prefix_map": sorted(context["prefix_map"].items()),
+        "ns_to_ontology": sorted(context["ns_to_ontology"].items()),
+        "global_all_classes": sorted(context["global_all_classes"]),
+        "abstract_map": sorted(context["abstract_map"].items()),
+        "global_patterns": sorted((name, sorted(info["classes"])) for name, info in context["global_patterns"].items()),
+        "class_to_onts": sorted((name, sorted(onts)) for name, onts in context["class_to_onts"].items()),
+        "diagram_caps": sorted(context["diagram_caps"].items()),
+    }
+    return hashlib.sha256(json.dumps(shared).encode('utf-8')).hexdigest()
+
+def class_fingerprint(g: Graph, cls: URIRef, context_fp: str) -> str:
+    """Hash everything the page and diagram of cls are generated from.
+
+    This covers the class's own triples (with restrictions and class expressions expanded),
+    the type, inverse and range of every property and class they reference (including types
+    from the registry overlay), the restrictions inherited from named superclasses (which decide
+    what is marked refined), the restrictions that point at the class ("Used by") and the labels
+    and descriptions of all subclasses ("Specializations")."""
+    facts = graph_index(g, build_subject_facts)
+    lines = [context_fp]
+    lines.extend(f"own {term_key(facts, p)} {term_key(facts, o)}" for p, o in facts.predicate_objects(cls))
+
+    # Properties and classes referenced from the class description
+    referenced = set()
+    pending = [cls]
+    visited = set()
+    while pending:
+        node = pending.pop()
+        if node in visited:
+            continue
+        visited.add(node)
+        for p, o in facts.predicate_objects(node):
+            referenced.add(p)
+            if isinstance(o, BNode):
+                pending.append(o)
+            elif isinstance(o, URIRef):
+                referenced.add(o)
+    for inverse in [o for r in referenced for o in facts.objects(r, OWL.inverseOf)]:
+        referenced.add(inverse)
+    overlay = registry_overlay(g)
+    for ref in sorted(referenced):
+        for p in REFERENCED_PREDICATES:
+            lines.extend(f"ref {term_key(facts, ref)} {term_key(facts, p)} {term_key(facts, o)}" for o in facts.objects(ref, p))
+        if overlay is not None and ref in overlay.types:
+            lines.append(f"ref {term_key(facts, ref)} registry {term_key(facts, overlay.types[ref])}")
+
+    # Restrictions inherited from named superclasses
+    for prop, signatures in graph_index(g, build_inherited_restrictions).get(cls, {}).items():
+        for signature in signatures:
+            lines.append(f"inherited {term_key(facts, prop)} " + " ".join("-" if t is None else term_key(facts, t) for t in signature))
+
+    # Restrictions that use the class, and the classes they belong to
+    for predicate in (OWL.allValuesFrom, OWL.someValuesFrom, OWL.hasValue):
+        for restr in g.subjects(predicate, cls):
+            prop = facts.value(restr, OWL.onProperty)
+            owners = sorted(term_key(facts, o) for o in facts.objects(restr, RDFS.label)) + \
+                sorted(f"{s} {term_key(facts, l)}" for s in g.subjects(RDFS.subClassOf, restr) for l in facts.objects(s, RDFS.label))
+            lines.append(f"used {term_key(facts, predicate)} {term_key(facts, restr)} {prop} {owners}")
+
+    # Direct and indirect subclasses
+    for s in sorted(graph_index(g, build_class_hierarchy).subclasses.get(cls, ())):
+        lines.append(f"sub <{s}> " + " ".join(sorted(term_key(facts, o) for p in (RDFS.label, DCTERMS.description) for o in facts.objects(s, p))))
+
+    lines.sort()
+    return hashlib.sha256("\n".join(lines).encode('utf-8')).hexdigest()
+
+def outputs_exist(file_path: str, ontology_name: str, cls_name: str, write_dot: bool = False) -> bool:
+    """Check that the page and rendered diagrams of a class, and its DOT file if write_dot is set, are still on disk."""
+    docs_dir = os.path.dirname(file_path)
+    page_name = f"{ontology_name}__{cls_name}"
+    outputs = [os.path.join(docs_dir, "classes", f"{page_name}.md")]
+    outputs += [os.path.join(docs_dir, "diagrams", f"{page_name}.dot.{fmt}") for fmt in RENDER_FORMATS]
+    if write_dot:
+        outputs.append(os.path.join(docs_dir, "diagrams", f"{page_name}.dot"))
+    return all(os.path.exists(path) for path in outputs)
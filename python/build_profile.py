@@ -0,0 +1,162 @@
+import os
+import html
+import json
+import time
+import pstats
+import cProfile
+import logging
+from contextlib import contextmanager
+from multiprocessing import util as mp_util
+from stage_timer import stage_stats, count_graph_probes, graph_probes
+from utils import get_label
+
+log = logging.getLogger("ofn2mkdocs")
+
+PROFILE_JSON = "build_profile.json"
+PROFILE_HTML = "build_profile.html"
+PROFILE_STATS = "build_profile.prof"
+# Functions listed in the report, by cumulative time on the hot path
+PROFILE_TOP_FUNCTIONS = 50
+
+# Profiling state of this process, set by start_profiling(); None when --profile is not given
+_profiling = None
+
+def start_profiling(hot_path_dump: str = None):
+    """Record the time and graph probes of every class from now on.
+
+    With hot_path_dump, cProfile also runs around the generation of class pages and diagrams, and its
+    statistics are written to that file by write_profile_report()."""
+    global _profiling
+    count_graph_probes()
+    _profiling = {"hot_path_dump": hot_path_dump, "profiler": cProfile.Profile() if hot_path_dump else None, "worker_dumps": [], "classes": []}
+
+def profiling_options():
+    """Return the arguments of start_profiling() for a --jobs worker, or None if profiling is off."""
+    return {"hot_path_dump": _profiling["hot_path_dump"]} if _profiling is not None else None
+
+def start_worker_profiling(options: dict):
+    """Start profiling in a --jobs worker; its cProfile statistics are written to <hot_path_dump>.<pid>
+    when the worker exits, for collect_worker_profiles() in the parent."""
+    start_profiling(**options)
+    if options["hot_path_dump"]:
+        mp_util.Finalize(None, _dump_hot_path, args=(f"{options['hot_path_dump']}.{os.getpid()}",), exitpriority=10)
+
+def _dump_hot_path(path: str):
+    _profiling["profiler"].dump_stats(path)
+
+def collect_worker_profiles(pids):
+    """Take over the cProfile statistics written by the exited workers with the given pids."""
+    if _profiling is None or not _profiling["hot_path_dump"]:
+        return
+    for pid in pids:
+        path = f"{_profiling['hot_path_dump']}.{pid}"
+        if os.path.exists(path):
+            _profiling["worker_dumps"].append(pstats.Stats(path))
+            os.remove(path)
+
+@contextmanager
+def profile_class(ontology_name: str, g, cls):
+    """Record the wall time, CPU time and graph probes of the with-block for a class.
+
+    Yields a dict in which the block can set the class's "status"."""
+    record = {}
+    if _profiling is None:
+        yield record
+        return
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    start_probes = graph_probes()
+    try:
+        yield record
+    finally:
+        record.update({
+            "ontology": ontology_name,
+            "class": get_label(g, cls),
+            "seconds": time.perf_counter() - start,
+            "cpu_seconds": time.process_time() - start_cpu,
+            "probes": graph_probes() - start_probes
+        })
+        _profiling["classes"].append(record)
+
+@contextmanager
+def hot_path():
+    """Run cProfile over the with-block if hot-path profiling is on."""
+    profiler = _profiling["profiler"] if _profiling is not None else None
+    if profiler is None:
+        yield
+        return
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+
+def take_class_profiles() -> list:
+    """Return the class records collected in this process since the last call, and forget them."""
+    if _profiling is None:
+        return []
+    records = _profiling["classes"]
+    _profiling["classes"] = []
+    return records
+
+def add_class_profiles(records: list):
+    """Add class records collected in another process (e.g. a --jobs worker)."""
+    if _profiling is not None:
+        _profiling["classes"].extend(records)
+
+def _hot_path_functions(stats: pstats.Stats) -> list:
+    functions = []
+    for (file_name, line, func_name), (_, calls, total, cumulative, _) in stats.stats.items():
+        functions.append({
+            "function": f"{os.path.basename(file_name)}:{line}({func_name})" if line else func_name,
+            "calls": calls,
+            "total_seconds": total,
+            "cumulative_seconds": cumulative
+        })
+    functions.sort(key=lambda f: f["cumulative_seconds"], reverse=True)
+    return functions[:PROFILE_TOP_FUNCTIONS]
+
+def _html_table(title: str, rows: list, columns: list) -> str:
+    head = "".join(f"<th>{html.escape(column)}</th>" for column in columns)
+    body = []
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column, "")
+            cells.append(f"<td>{value:.4f}</td>" if isinstance(value, float) else f"<td>{html.escape(str(value))}</td>")
+        body.append(f"<tr>{''.join(cells)}</tr>")
+    return f"<h2>{html.escape(title)}</h2>\n<table>\n<tr>{head}</tr>\n" + "\n".join(body) + "\n</table>\n"
+
+def write_profile_report(root_dir: str):
+    """Write the stage, class and hot-path function times, slowest first, to build_profile.json and
+    build_profile.html in root_dir, and the cProfile statistics to build_profile.prof if they were collected."""
+    if _profiling is None:
+        return
+    stages = [dict(stage=name, **totals) for name, totals in stage_stats().items()]
+    stages.sort(key=lambda s: s["seconds"], reverse=True)
+    classes = sorted(_profiling["classes"], key=lambda c: c["seconds"], reverse=True)
+    report = {"stages": stages, "classes": classes, "functions": []}
+
+    profiler = _profiling["profiler"]
+    if profiler is not None:
+        # With --jobs the classes, and so the profile, are all in the worker dumps
+        profiler.create_stats()
+        sources = ([profiler] if profiler.stats else []) + _profiling["worker_dumps"]
+        stats = pstats.Stats()
+        stats.add(*sources)
+        stats.dump_stats(_profiling["hot_path_dump"])
+        report["functions"] = _hot_path_functions(stats)
+        log.info("Wrote hot-path cProfile statistics to %s", _profiling["hot_path_dump"])
+
+    with open(os.path.join(root_dir, PROFILE_JSON), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    with open(os.path.join(root_dir, PROFILE_HTML), "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>Build profile</title>\n"
+                "<style>table { border-collapse: collapse; } td, th { border: 1px solid #ccc; padding: 2px 6px; } td { text-align: right; }</style>\n"
+                "</head>\n<body>\n<h1>Build profile</h1>\n")
+        f.write(_html_table("Stages", stages, ["stage", "calls", "seconds", "cpu_seconds", "probes"]))
+        f.write(_html_table("Slowest classes", classes, ["ontology", "class", "status", "seconds", "cpu_seconds", "probes"]))
+        if report["functions"]:
+            f.write(_html_table("Hot-path functions", report["functions"], ["function", "calls", "total_seconds", "cumulative_seconds"]))
+        f.write("</body>\n</html>\n")
+    log.info("Wrote build profile of %d stages and %d classes to %s", len(stages), len(classes), os.path.join(root_dir, PROFILE_JSON))
@@ -0,0 +1,314 @@
+import logging
+from rdflib import Graph, RDF, RDFS, OWL, XSD, URIRef
+from rdflib.namespace import DCTERMS, SKOS
+from graph_index import graph_index, build_used_by_index, build_class_hierarchy, build_restriction_index, build_subject_facts
+from concept_registry import has_type
+from stage_timer import timed
+from utils import get_qname, get_id, get_first_literal, class_restrictions, iter_annotations, is_refined_property, collect_list, get_class_expression_str, get_ontology_for_uri, get_leaf_classes, get_property_info
+
+log = logging.getLogger("ofn2mkdocs")
+
+class ClassExpression:
+    """A class expression as drawn in a diagram.
+
+    kind is "named" for a named class, "unionOf", "intersectionOf" or "not" for a blank node combining
+    members, or "other" for any other blank node. label is the QName or the expression as text, url the
+    page link of a named class, and members the operands, sorted as they are drawn."""
+    __slots__ = ("kind", "node_id", "label", "url", "members")
+
+    def __init__(self, kind: str, node_id: str, label: str, url: str = None, members: list = None):
+        self.kind = kind
+        self.node_id = node_id
+        self.label = label
+        self.url = url
+        self.members = members if members is not None else []
+
+class ClassModel:
+    """Everything the page and diagram of one class are rendered from, read from the graph once.
+
+    Markdown fields: description, note, example, specializations, formalization (sorted rows),
+    used_by and annotations; only description is filled for pattern classes. Diagram fields:
+    attributes (datatype property lines), superclasses and associated (ClassExpression nodes, in
+    drawing order) and associations (object property edges, merged per property and target)."""
+    __slots__ = ("uri", "name", "is_pattern", "description", "note", "example", "specializations", "formalization",
+                 "used_by", "annotations", "attributes", "superclasses", "associated", "associations")
+
+    def __init__(self, uri: URIRef, name: str, is_pattern: bool):
+        self.uri = uri
+        self.name = name
+        self.is_pattern = is_pattern
+        self.description = ""
+        self.note = ""
+        self.example = ""
+        self.specializations = []
+        self.formalization = []
+        self.used_by = []
+        self.annotations = []
+        self.attributes = []
+        self.superclasses = []
+        self.associated = []
+        self.associations = []
+
+@timed("get_specializations")
+def get_specializations(g: Graph, cls: URIRef, global_all_classes: set, ns: str, prefix_map: dict, ns_to_ontology: dict) -> list:
+    """Find all subclasses (direct and indirect) of the given class."""
+    specializations = []
+    facts = graph_index(g, build_subject_facts)
+    for s in graph_index(g, build_class_hierarchy).subclasses.get(cls, ()):
+        cls_name = get_first_literal(facts, s, [RDFS.label]) or str(s).split('/')[-1].split('#')[-1]
+        ont = get_ontology_for_uri(str(s), ns_to_ontology)
+        if cls_name in global_all_classes and ont:
+            desc = get_first_literal(facts, s, [DCTERMS.description]) or ""
+            specializations.append((cls_name, desc, ont))
+    log.debug(f"Specializations for {cls}: {specializations}")
+    return sorted(specializations, key=lambda x: x[0].lower())
+
+@timed("get_used_by")
+def get_used_by(g: Graph, cls: URIRef, global_all_classes: set, ns: str, prefix_map: dict, ns_to_ontology: dict) -> list:
+    """Find classes and their properties that reference this class via object property restrictions."""
+    used_by = []
+    facts = graph_index(g, build_subject_facts)
+    for s, prop, referencing in graph_index(g, build_used_by_index).get(cls, ()):
+        prop_name = get_qname(g, prop, ns, prefix_map)
+        for cls_sub in referencing:
+            cls_name = get_first_literal(facts, cls_sub, [RDFS.label]) or str(cls_sub).split('/')[-1].split('#')[-1]
+            ont = get_ontology_for_uri(str(cls_sub), ns_to_ontology)
+            if cls_name in global_all_classes and ont:
+                used_by.append((cls_name, prop_name, ont))
+        cls_name = get_first_literal(facts, s, [RDFS.label]) or str(s).split('/')[-1].split('#')[-1]
+        ont = get_ontology_for_uri(str(s), ns_to_ontology)
+        if cls_name in global_all_classes and ont:
+            used_by.append((cls_name, prop_name, ont))
+    log.debug(f"Used by for {cls}: {used_by}")
+    return sorted(used_by, key=lambda x: x[0].lower())
+
+def expression_node_id(expr) -> str:
+    """Graphviz node id of a blank node class expression."""
+    return str(expr).replace(":", "_").replace("/", "_").replace("#", "_").replace("_:", "bnode_")
+
+def extract_class_expression(g: Graph, expr, ns: str, prefix_map: dict, global_all_classes: set, ns_to_ontology: dict, memo: dict) -> ClassExpression:
+    """Read a class expression and its operands; memo maps terms already read to their ClassExpression."""
+    if expr in memo:
+        return memo[expr]
+    if isinstance(expr, URIRef):
+        qname = get_qname(g, expr, ns, prefix_map)
+        local = qname.split(":")[-1]
+        target_ont = get_ontology_for_uri(str(expr), ns_to_ontology)
+        url = None if ':' in qname else f"../_counters/{target_ont}__{local}.md" if qname in global_all_classes else None
+        node = memo[expr] = ClassExpression("named", get_id(qname.replace(":", "_")), qname, url)
+        return node
+    facts = graph_index(g, build_subject_facts)
+    node = memo[expr] = ClassExpression("other", expression_node_id(expr), get_class_expression_str(facts, expr, ns, prefix_map))
+    union_col = facts.value(expr, OWL.unionOf)
+    inter_col = facts.value(expr, OWL.intersectionOf)
+    if union_col and union_col != RDF.nil:
+        node.kind = "unionOf"
+        operands = sorted(collect_list(facts, union_col), key=str)
+    elif inter_col and inter_col != RDF.nil:
+        node.kind = "intersectionOf"
+        operands = sorted(collect_list(facts, inter_col), key=str)
+    else:
+        complement = facts.value(expr, OWL.complementOf)
+        operands = [complement] if complement else []
+        if complement:
+            node.kind = "not"
+    node.members = [extract_class_expression(g, m, ns, prefix_map, global_all_classes, ns_to_ontology, memo) for m in operands]
+    return node
+
+def extract_attributes(g: Graph, cls: URIRef, restrictions: tuple, ns: str, prefix_map: dict) -> list:
+    """Datatype property lines of the diagram's class box, one per property, sorted by property."""
+    data_props = {}
+    facts = graph_index(g, build_subject_facts)
+    for restriction in restrictions:
+        prop = restriction.on_property
+        if not prop:
+            continue
+        prop_name, is_inverse, base_prop = get_property_info(facts, prop, ns, prefix_map)
+        if base_prop and has_type(g, base_prop, OWL.DatatypeProperty):
+            range_type = facts.value(base_prop, RDFS.range) or XSD.string
+            range_name = get_class_expression_str(facts, range_type, ns, prefix_map)
+            restriction_parts = []
+            stereotype = "refined" if is_refined_property(g, cls, base_prop, restriction.node) else ""
+            if is_inverse:
+                stereotype += ", inverse" if stereotype else "inverse"
+            all_values_from = restriction.all_values_from
+            if all_values_from:
+                range_name = get_class_expression_str(facts, all_values_from, ns, prefix_map)
+                restriction_parts.append("only")
+            on_data_range = restriction.on_data_range
+            qualified_card = restriction.qualified_cardinality
+            min_qualified_card = restriction.min_qualified_cardinality
+            max_qualified_card = restriction.max_qualified_cardinality
+            if qualified_card:
+                restriction_parts.append(f"exactly {qualified_card}")
+            if min_qualified_card:
+                restriction_parts.append(f"min {min_qualified_card}")
+            if max_qualified_card:
+                restriction_parts.append(f"max {max_qualified_card}")
+            if on_data_range:
+                range_name = get_class_expression_str(facts, on_data_range, ns, prefix_map)
+            card = restriction.cardinality
+            min_card = restriction.min_cardinality
+            max_card = restriction.max_cardinality
+            if card:
+                restriction_parts.append(f"exactly {card}")
+            if min_card:
+                restriction_parts.append(f"min {min_card}")
+            if max_card:
+                restriction_parts.append(f"max {max_card}")
+            restriction_str = f"«{', '.join(restriction_parts)}»" if restriction_parts else ""
+            data_props.setdefault(prop_name, []).append((restriction_str, range_name, stereotype))
+            log.debug("Added datatype property %s: %s «%s»", prop_name, range_name, stereotype)
+
+    attributes = []
+    for prop_name, prop_restrictions in sorted(data_props.items()):
+        all_restrictions = []
+        range_names = set()
+        stereotypes = set()
+        for restriction_str, range_name, stereotype in prop_restrictions:
+            if restriction_str:
+                all_restrictions.append(restriction_str)
+            range_names.add(range_name)
+            if stereotype:
+                stereotypes.add(stereotype)
+        range_name = range_names.pop() if range_names else "string"
+        restriction_label = ", ".join(sorted(set(r.strip('«»') for r in all_restrictions))) if all_restrictions else ""
+        stereotype_label = ", ".join(sorted(set(s for s in stereotypes))) if stereotypes else ""
+        attribute = f"{prop_name}: {range_name}"
+        if restriction_label or stereotype_label:
+            labels = [l for l in [restriction_label, stereotype_label] if l]
+            attribute = f"{attribute} «{', '.join(labels)}»"
+        attributes.append(attribute)
+    return attributes
+
+def extract_associations(g: Graph, cls: URIRef, cls_name: str, restrictions: tuple, ns: str, prefix_map: dict, expression) -> list:
+    """Object property edges of the diagram, merged per (property, target), in restriction order.
+
+    Each edge is a dict with prop_name, style, label_parts, reflexive, is_inverse and the target
+    ClassExpression, read by expression."""
+    combined = {}
+    facts = graph_index(g, build_subject_facts)
+    for restriction in restrictions:
+        prop = restriction.on_property
+        if not prop:
+            continue
+        prop_name, is_inverse, base_prop = get_property_info(facts, prop, ns, prefix_map)
+        if base_prop and has_type(g, base_prop, OWL.ObjectProperty):
+            is_refined = is_refined_property(g, cls, base_prop, restriction.node)
+            style = "dashed" if is_refined else "solid"
+            label_parts = []
+            target_expr = None
+
+            on_class = restriction.on_class
+            qualified_card = restriction.qualified_cardinality
+            min_qualified_card = restriction.min_qualified_cardinality
+            max_qualified_card = restriction.max_qualified_cardinality
+            if qualified_card:
+                label_parts.append(f"exactly {qualified_card}")
+            if min_qualified_card:
+                label_parts.append(f"min {min_qualified_card}")
+            if max_qualified_card:
+                label_parts.append(f"max {max_qualified_card}")
+            if label_parts and on_class:
+                target_expr = on_class
+
+            all_values_from = restriction.all_values_from
+            if all_values_from:
+                label_parts.append("only")
+                target_expr = all_values_from
+
+            some_values_from = restriction.some_values_from
+            if some_values_from:
+                label_parts.append("some")
+                target_expr = some_values_from
+
+            card = restriction.cardinality
+            min_card = restriction.min_cardinality
+            max_card = restriction.max_cardinality
+            if card:
+                label_parts.append(f"exactly {card}")
+            if min_card:
+                label_parts.append(f"min {min_card}")
+            if max_card:
+                label_parts.append(f"max {max_card}")
+
+            # Handle unqualified cardinality by treating as qualified with owl:Thing
+            if label_parts and not target_expr:
+                target_expr = OWL.Thing
+
+            if target_expr and label_parts:
+                if isinstance(target_expr, URIRef):
+                    target_qname = get_qname(g, target_expr, ns, prefix_map)
+                    target_id = None if target_qname == 'ITSThing' else get_id(target_qname.replace(":", "_"))
+                    reflexive = target_qname == cls_name
+                else:
+                    target_id = expression_node_id(target_expr)
+                    target_qname = get_class_expression_str(facts, target_expr, ns, prefix_map)
+                    reflexive = False
+                key = (prop_name, target_id)
+                if key not in combined:
+                    combined[key] = {
+                        'label_parts': [],
+                        'style': style,
+                        'prop_name': prop_name,
+                        'target': expression(target_expr),
+                        'reflexive': reflexive,
+                        'is_inverse': is_inverse
+                    }
+                combined[key]['label_parts'].extend(label_parts)
+                combined[key]['style'] = "dashed" if is_refined else combined[key]['style']
+                log.debug("Added object property %s -> %s: %s, style=%s, reflexive=%s", prop_name, target_qname, label_parts, style, reflexive)
+    return list(combined.values())
+
+@timed("class_model")
+def extract_class_model(g: Graph, cls: URIRef, cls_name: str, ns: str, prefix_map: dict, global_all_classes: set, ns_to_ontology: dict, global_patterns: dict) -> ClassModel:
+    """Look up everything needed to render the page and diagram of cls in the indexes of the graph.
+
+    The indexes are built on first use, so the graph is read once per ontology rather than once per class."""
+    model = ClassModel(cls, cls_name, cls_name in global_patterns)
+    facts = graph_index(g, build_subject_facts)
+    model.description = get_first_literal(facts, cls, [DCTERMS.description]) or ""
+    if not model.is_pattern:
+        model.note = get_first_literal(facts, cls, [SKOS.note]) or ""
+        model.example = get_first_literal(facts, cls, [SKOS.example]) or ""
+        model.specializations = get_specializations(g, cls, global_all_classes, ns, prefix_map, ns_to_ontology)
+
+        # Formalization rows: restrictions, direct superclasses and disjoint classes
+        restr_rows = class_restrictions(g, cls, ns, prefix_map)
+        superclass_rows = []
+        for super_cls in facts.objects(cls, RDFS.subClassOf):
+            if isinstance(super_cls, URIRef) and super_cls != OWL.Thing:
+                superclass_rows.append(("subClassOf", get_qname(g, super_cls, ns, prefix_map)))
+        disjoint_rows = []
+        for disjoint_cls in facts.objects(cls, OWL.disjointWith):
+            if isinstance(disjoint_cls, URIRef):
+                disjoint_rows.append(("disjointWith", get_qname(g, disjoint_cls, ns, prefix_map)))
+        model.formalization = sorted(restr_rows + superclass_rows + disjoint_rows, key=lambda x: x[0].lower())
+
+        model.used_by = get_used_by(g, cls, global_all_classes, ns, prefix_map, ns_to_ontology)
+        model.annotations = list(iter_annotations(facts, cls, ns, prefix_map))
+
+    # Diagram: the class box, its superclasses, associated classes and object property edges
+    memo = {}
+    expression = lambda expr: extract_class_expression(g, expr, ns, prefix_map, global_all_classes, ns_to_ontology, memo)
+    restrictions = graph_index(g, build_restriction_index).by_class.get(cls, ())
+    model.attributes = extract_attributes(g, cls, restrictions, ns, prefix_map)
+
+    super_uris = {s for s in facts.objects(cls, RDFS.subClassOf) if isinstance(s, URIRef) and s != OWL.Thing}
+    superclasses = {get_qname(g, u, ns, prefix_map) for u in super_uris}
+    model.superclasses = [expression(u) for u in sorted(super_uris, key=lambda u: get_qname(g, u, ns, prefix_map).lower())]
+
+    associated_uris = set()
+    for restriction in restrictions:
+        prop = restriction.on_property
+        if prop and has_type(g, prop, OWL.ObjectProperty):
+            for target_expr in [t for t in (restriction.on_class, restriction.all_values_from, restriction.some_values_from) if t]:
+                for leaf in get_leaf_classes(facts, target_expr, ns, prefix_map):
+                    if isinstance(leaf, URIRef):
+                        leaf_qname = get_qname(g, leaf, ns, prefix_map)
+                        if leaf_qname != cls_name and leaf_qname not in superclasses:
+                            associated_uris.add(leaf)
+                            log.debug("Added associated URI: %s", leaf_qname)
+    model.associated = [expression(u) for u in sorted(associated_uris, key=lambda u: get_qname(g, u, ns, prefix_map).lower())]
+    model.associations = extract_associations(g, cls, cls_name, restrictions, ns, prefix_map, expression)
+    return model
@@ -0,0 +1,116 @@
+import os
+import logging
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from diagram_generator import generate_diagram
+from markdown_generator import generate_markdown
+from class_model import extract_class_model
+from build_manifest import context_fingerprint, class_fingerprint, outputs_exist
+from graph_index import graph_index, build_class_hierarchy
+from concept_registry import attach_registry_overlay
+from stage_timer import stage_stats, add_stage_stats, reset_stage_stats
+from build_profile import profile_class, hot_path, profiling_options, start_worker_profiling, take_class_profiles, add_class_profiles, collect_worker_profiles
+from utils import get_label, get_id, get_qname, ontology_lookup_stats, add_ontology_lookup_stats, reset_ontology_lookup
+
+log = logging.getLogger("ofn2mkdocs")
+
+# Per-worker copy of the ontology context, installed once by _init_worker
+_worker_context = None
+
+def process_class(context: dict, cls, errors: list, render_queue: list, fingerprints: dict) -> str:
+    """Generate the diagram and Markdown page for one class.
+
+    Return "processed", "skipped" if the class is unchanged since the build recorded in
+    context["manifest"], or "ignored"/"failed". The class's fingerprint is stored in fingerprints."""
+    g = context["g"]
+    file_path = context["file_path"]
+    cls_name = get_label(g, cls)
+    if cls_name == 'ITSThing':
+        return "ignored"
+    cls_id = get_id(cls_name)
+    page_name = f"{context['ontology_name']}__{cls_name}"
+    fingerprint = class_fingerprint(g, cls, context["context_fingerprint"])
+    if context["manifest"].get(page_name) == fingerprint and outputs_exist(file_path, context["ontology_name"], cls_name, context["write_dot"]):
+        log.debug("Skipping unchanged class: %s from %s", cls_name, file_path)
+        fingerprints[page_name] = fingerprint
+        return "skipped"
+    log.info("Processing class: %s from %s", cls_name, file_path)
+
+    try:
+        with hot_path():
+            # Read the class from the graph once for both renderers
+            model = extract_class_model(g, cls, cls_name, context["ns"], context["prefix_map"], context["global_all_classes"], context["ns_to_ontology"], context["global_patterns"])
+
+            # Generate diagram
+            generate_diagram(g, cls, cls_name, cls_id, context["ns"], context["global_all_classes"], context["abstract_map"], file_path, errors, context["prefix_map"], context["ontology_name"], context["ns_to_ontology"], render_queue, model, context["write_dot"], context["diagram_caps"])
+
+            # Generate Markdown
+            generate_markdown(g, cls, cls_name, context["global_patterns"], context["global_all_classes"], context["ns"], file_path, errors, context["prefix_map"], context["prop_map"], context["ontology_name"], context["ns_to_ontology"], context["class_to_onts"], model)
+        fingerprints[page_name] = fingerprint
+        return "processed"
+
+    except Exception as e:
+        error_msg = f"Error processing class {cls_name} from {file_path}: {str(e)}\n{traceback.format_exc()}"
+        errors.append(error_msg)
+        log.error(error_msg)
+        return "failed"
+
+def _profiled_class(context: dict, cls, errors: list, render_queue: list, fingerprints: dict) -> str:
+    with profile_class(context["ontology_name"], context["g"], cls) as record:
+        record["status"] = process_class(context, cls, errors, render_queue, fingerprints)
+    return record["status"]
+
+def _init_worker(context: dict, profiling: dict):
+    global _worker_context
+    _worker_context = context
+    # A forked worker starts with the parent's stage totals and lookup counters, which the parent already has
+    reset_stage_stats()
+    reset_ontology_lookup()
+    if profiling is not None:
+        start_worker_profiling(profiling)
+    # The overlay is keyed by graph identity, so it has to be attached to the worker's copy of the graph
+    if context.get("registry_overlay") is not None:
+        attach_registry_overlay(context["g"], context["registry_overlay"])
+
+def _process_class_in_worker(cls) -> tuple:
+    errors = []
+    render_queue = []
+    fingerprints = {}
+    status = _profiled_class(_worker_context, cls, errors, render_queue, fingerprints)
+    return status, errors, render_queue, fingerprints, take_class_profiles(), (os.getpid(), ontology_lookup_stats(), stage_stats())
+
+def process_classes(context: dict, classes: list, errors: list, render_queue: list, fingerprints: dict, jobs: int = 1) -> tuple:
+    """Generate diagrams and Markdown for the given classes, in order, and return (processed, skipped) counts.
+
+    context holds the graph and the global collections passed to generate_diagram and generate_markdown,
+    plus the page fingerprints of the previous build in context["manifest"]; classes whose fingerprint is
+    unchanged are skipped. With jobs > 1 the classes are spread over a process pool; each worker receives
+    the context once, and results are merged back in class order so that output and error reports match
+    a serial run."""
+    context["context_fingerprint"] = context_fingerprint(context)
+    g = context["g"]
+    for cycle in graph_index(g, build_class_hierarchy).cycles:
+        cycle_names = [get_qname(g, c, context["ns"], context["prefix_map"]) for c in cycle]
+        error_msg = f"rdfs:subClassOf cycle in {context['file_path']}: {' -> '.join(cycle_names + cycle_names[:1])}"
+        errors.append(error_msg)
+        log.error(error_msg)
+    if jobs <= 1 or len(classes) <= 1:
+        statuses = [_profiled_class(context, cls, errors, render_queue, fingerprints) for cls in classes]
+    else:
+        statuses = []
+        workers = min(jobs, len(classes))
+        chunksize = max(1, len(classes) // (workers * 4))
+        worker_stats = {}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context, profiling_options())) as executor:
+            for status, class_errors, class_queue, class_fingerprints, class_profiles, (pid, stats, stages) in executor.map(_process_class_in_worker, classes, chunksize=chunksize):
+                statuses.append(status)
+                add_class_profiles(class_profiles)
+                errors.extend(class_errors)
+                render_queue.extend(class_queue)
+                fingerprints.update(class_fingerprints)
+                worker_stats[pid] = (stats, stages)
+        for stats, stages in worker_stats.values():
+            add_ontology_lookup_stats(stats)
+            add_stage_stats(stages)
+        collect_worker_profiles(worker_stats)
+    return statuses.count("processed"), statuses.count("skipped")
@@ -0,0 +1,194 @@
+import os
+import hashlib
+import logging
+import sqlite3
+import weakref
+from rdflib import Graph, RDF, OWL, URIRef
+from graph_index import graph_index, build_subject_facts
+
+log = logging.getLogger("ofn2mkdocs")
+
+REGISTRY_MARKDOWN = "concept_registry.md"
+REGISTRY_DB = "concept_registry.db"
+REGISTRY_HEADER = "| base_uri | name | type | description |\n|----------|------|------|-------------|\n"
+
+def split_concept_uri(uri: str) -> tuple:
+    """Split a concept URI into the (base_uri, name) columns of the registry table."""
+    base_uri, name = uri.rsplit('/', 1) if '/' in uri else (uri, '')
+    if '#' in name:
+        base_uri, name = f"{base_uri}/{name.split('#')[0]}#", name.split('#')[1]
+    if not base_uri.endswith(('#', '/')):
+        base_uri += '/'
+    return base_uri, name
+
+def registry_sort_key(uri: str) -> tuple:
+    """Order of the rows in concept_registry.md: by base URI, then name."""
+    return (uri.rsplit('/', 1)[0] if '/' in uri else uri, uri.rsplit('/', 1)[1] if '/' in uri else '')
+
+def parse_registry_markdown(registry_path: str) -> dict:
+    """Read the concept registry table; return {uri: {'type': ..., 'description': ...}}."""
+    content = open(registry_path, 'r', encoding='utf-8').read()
+    lines = content.splitlines()
+    registry = {}
+    in_table = False
+    headers = None
+    for line in lines:
+        if line.strip().startswith('|'):
+            if not in_table:
+                headers = [h.strip().lower() for h in line.split('|') if h.strip()]
+                log.debug(f"Parsed headers: {headers}")
+                in_table = True
+            elif headers and not line.strip().startswith('|---'):
+                values = [v.strip() for v in line.split('|') if v.strip()]
+                log.debug(f"Parsed values: {values}")
+                if len(values) < 3:  # Require at least base_uri, name, type
+                    log.warning(f"Skipping row with insufficient values (expected at least 3, got {len(values)}): {line}")
+                    continue
+                try:
+                    base_uri = values[headers.index('base_uri')]
+                    name = values[headers.index('name')]
+                    concept_type = values[headers.index('type')]
+                    description = values[headers.index('description')] if 'description' in headers and len(values) > headers.index('description') else ''
+                    uri = f"{base_uri}{name}"
+                    registry[uri] = {'type': concept_type, 'description': description}
+                except ValueError as e:
+                    log.warning(f"Skipping row due to missing header: {line} ({str(e)})")
+    return registry
+
+def _file_hash(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class ConceptRegistry:
+    """Concept registry stored in SQLite, shared by every ontology of a build and by parallel workers.
+
+    concept_registry.md stays the versioned form of the registry: the database is (re)loaded from it
+    whenever the file differs from the last import or export, and export_markdown() writes it back.
+    The database runs in WAL mode, so several processes can read and add concepts at the same time."""
+    def __init__(self, script_dir: str):
+        self.markdown_path = os.path.join(script_dir, REGISTRY_MARKDOWN)
+        self.db_path = os.path.join(script_dir, REGISTRY_DB)
+        self.conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS concepts (uri TEXT PRIMARY KEY, type TEXT NOT NULL, description TEXT NOT NULL DEFAULT '')")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._sync_from_markdown()
+
+    def _sync_from_markdown(self):
+        if not os.path.exists(self.markdown_path):
+            with open(self.markdown_path, 'w', encoding='utf-8') as f:
+                f.write(REGISTRY_HEADER)
+            log.info(f"Created new {REGISTRY_MARKDOWN} in {os.path.dirname(self.markdown_path)}")
+        md_hash = _file_hash(self.markdown_path)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'markdown_sha256'").fetchone()
+            if row is None or row[0] != md_hash:
+                entries = parse_registry_markdown(self.markdown_path)
+                self.conn.execute("DELETE FROM concepts")
+                self.conn.executemany("INSERT OR REPLACE INTO concepts (uri, type, description) VALUES (?, ?, ?)",
+                                      [(uri, info['type'], info['description']) for uri, info in entries.items()])
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('markdown_sha256', ?)", (md_hash,))
+                log.info(f"Imported {len(entries)} entries from {REGISTRY_MARKDOWN} into {REGISTRY_DB}")
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def load(self) -> dict:
+        """Return all entries as {uri: {'type': ..., 'description': ...}}, in the row order of concept_registry.md."""
+        rows = self.conn.execute("SELECT uri, type, description FROM concepts").fetchall()
+        registry = {uri: {'type': concept_type, 'description': description} for uri, concept_type, description in sorted(rows, key=lambda r: registry_sort_key(r[0]))}
+        log.info(f"Loaded {len(registry)} entries from {REGISTRY_DB}")
+        return registry
+
+    def get(self, uri: str):
+        row = self.conn.execute("SELECT type, description FROM concepts WHERE uri = ?", (uri,)).fetchone()
+        return {'type': row[0], 'description': row[1]} if row else None
+
+    def add_concepts(self, concepts: dict) -> int:
+        """Insert the concepts that are not registered yet, in one transaction; return how many were added.
+
+        URIs are stored as they read back from the Markdown table; blank nodes and URIs without a
+        local name, which the table cannot hold, are not stored."""
+        rows = []
+        for uri, info in concepts.items():
+            base_uri, name = split_concept_uri(uri)
+            if name and not base_uri.startswith('N'):
+                rows.append((f"{base_uri}{name}", info['type'], info['description']))
+        if not rows:
+            return 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO concepts (uri, type, description) VALUES (?, ?, ?)", rows)
+            added = self.conn.total_changes - before
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        log.debug(f"Added {added} new entries to {REGISTRY_DB}")
+        return added
+
+    def export_markdown(self):
+        """Write the registry table to concept_registry.md and record it as the current import."""
+        rows = self.conn.execute("SELECT uri, type, description FROM concepts").fetchall()
+        tmp_path = f"{self.markdown_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(REGISTRY_HEADER)
+            for uri, concept_type, description in sorted(rows, key=lambda r: registry_sort_key(r[0])):
+                base_uri, name = split_concept_uri(uri)
+                f.write(f"| {base_uri} | {name} | {concept_type} | {description} |\n")
+        os.replace(tmp_path, self.markdown_path)
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('markdown_sha256', ?)", (_file_hash(self.markdown_path),))
+        log.info(f"Updated {REGISTRY_MARKDOWN} with {len(rows)} entries")
+
+    def close(self):
+        self.conn.close()
+
+def open_concept_registry() -> ConceptRegistry:
+    """Open the registry kept next to the generator scripts."""
+    return ConceptRegistry(os.path.dirname(os.path.realpath(__file__)))
+
+# Registry property types and the OWL types they stand for
+PROPERTY_TYPES = {'object_property': OWL.ObjectProperty, 'datatype_property': OWL.DatatypeProperty}
+
+# Overlay consulted alongside each ontology graph, see attach_registry_overlay
+_registry_overlays = weakref.WeakKeyDictionary()
+
+class RegistryOverlay:
+    """Read-only view of the property types declared in the registry, checked alongside an ontology
+    graph instead of adding an rdf:type triple to the graph for every registered property."""
+    def __init__(self, registry: dict):
+        self.types = {}
+        for uri, info in registry.items():
+            rdf_type = PROPERTY_TYPES.get(info['type'])
+            if rdf_type is not None:
+                self.types[URIRef(uri)] = rdf_type
+
+    def has_type(self, term, rdf_type) -> bool:
+        return self.types.get(term) == rdf_type
+
+def attach_registry_overlay(g: Graph, overlay: RegistryOverlay):
+    """Make overlay the registry consulted by has_type() for g."""
+    _registry_overlays[g] = overlay
+
+def registry_overlay(g: Graph):
+    """Return the overlay attached to g, or None."""
+    return _registry_overlays.get(g)
+
+def has_type(g: Graph, term, rdf_type) -> bool:
+    """Check (term, rdf:type, rdf_type) in g or in the registry overlay of g."""
+    if rdf_type in graph_index(g, build_subject_facts).objects(term, RDF.type):
+        return True
+    overlay = _registry_overlays.get(g)
+    return overlay is not None and overlay.has_type(term, rdf_type)
+
+def registry_namespaces(registry: dict) -> dict:
+    """Map each base URI in the registry to the name of its first entry, which the processors use to derive a prefix."""
+    namespaces = {}
+    for uri in registry:
+        base_uri, name = split_concept_uri(uri)
+        namespaces.setdefault(base_uri, name)
+    return namespaces
@@ -1,100 +1,304 @@
 import os
+import json
+import hashlib
 import logging
+import tempfile
+import subprocess
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from rdflib import Graph, RDF, RDFS, OWL, XSD, URIRef, BNode
 from graphviz import Digraph
-from collections import defaultdict
-from utils import get_qname, get_id, fmt_title, get_all_class_superclasses, is_refined_property, collect_list, get_class_expression_str, get_ontology_for_uri, insert_spaces, get_leaf_classes, get_property_info
+from class_model import ClassExpression, ClassModel, extract_class_model
+from diagram_layout import layout_key, read_layout, apply_layout, load_cached_layout, store_cached_layout
+from stage_timer import stage, timed
+from utils import get_qname, get_id
 
 # Configure logging
 log = logging.getLogger("ofn2mkdocs")
 
-def get_target_info(g: Graph, expr, cls_name: str, ns: str, prefix_map: dict) -> tuple:
-    """Get target information for a property's range, handling complex expressions."""
-    if not expr:
-        return None, False, None, None, False, None
-    if isinstance(expr, URIRef):
-        target_qname = get_qname(g, expr, ns, prefix_map)
-        if target_qname == 'ITSThing':
-            return None, False, None, None, False, None
-        target_id = get_id(target_qname.replace(":", "_"))
-        reflexive = target_qname == cls_name
-        is_complex = False
-        return target_id, is_complex, None, target_qname, reflexive, expr
-    else:  # BNode, complex expression
-        target_id = str(expr).replace(":", "_").replace("/", "_").replace("#", "_").replace("_:", "bnode_")
-        target_qname = get_class_expression_str(g, expr, ns, prefix_map)
-        reflexive = False
-        is_complex = True
-        return target_id, is_complex, None, target_qname, reflexive, expr
-
-def add_class_expression_node(graph, g: Graph, expr, ns: str, prefix_map: dict, global_all_classes: set, ns_to_ontology: dict, abstract_map: dict, created: set, is_superclass: bool = False, in_associated_cluster: bool = False) -> tuple:
-    """Recursively add nodes for class expressions, returning (node_id, label)."""
-    if isinstance(expr, URIRef):
-        qname = get_qname(g, expr, ns, prefix_map)
-        node_id = get_id(qname.replace(":", "_"))
-        if node_id in created:
-            return node_id, qname
-        created.add(node_id)
-        local = qname.split(":")[-1]
-        target_ont = get_ontology_for_uri(str(expr), ns_to_ontology)
-        url = None if ':' in qname else f"../_counters/{target_ont}__{local}.md" if qname in global_all_classes else None
-        label = qname
+# Output formats written for every diagram, how many diagrams one Graphviz process renders and how
+# many Graphviz processes run at once
+RENDER_FORMATS = ("svg", "png")
+RENDER_BATCH_SIZE = 200
+RENDER_WORKERS = 4
+# Hash of the DOT source each diagram in a directory was last rendered from, kept next to the images
+RENDER_HASHES = ".render_hashes.json"
+
+# Caps on the size of a class diagram, so that hub classes lay out in bounded time; 0 means no cap.
+# max_nodes and max_edges bound the class and expression nodes and the visible edges, and expressions
+# nested max_depth deep have their operands collapsed into a "+N more" node. Superclasses and associations
+# that do not fit are summarised by at most two more "+N more" nodes.
+DIAGRAM_CAPS = {"max_nodes": 40, "max_edges": 60, "max_depth": 3}
+
+# Diagrams rendered by Graphviz, those of them drawn from a cached layout, and diagrams whose images
+# were reused in this process
+_render_stats = {"rendered": 0, "reused_layouts": 0, "skipped": 0}
+
+def render_stats() -> dict:
+    """Return the rendered, reused_layouts and skipped counters of render_diagrams in this process."""
+    return dict(_render_stats)
+
+def render_hash(dot_source: str, formats: tuple) -> str:
+    """Return the hash identifying the images rendered from dot_source in the given formats."""
+    return hashlib.sha256("\0".join((dot_source, *formats)).encode("utf-8")).hexdigest()
+
+def load_render_hashes(diagrams_dir: str) -> dict:
+    """Return {dot file name: render hash} for diagrams_dir, or {} if it has none or it cannot be read."""
+    try:
+        with open(os.path.join(diagrams_dir, RENDER_HASHES), encoding="utf-8") as f:
+            hashes = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return hashes if isinstance(hashes, dict) else {}
+
+def save_render_hashes(diagrams_dir: str, hashes: dict):
+    """Replace the render hashes of diagrams_dir with hashes."""
+    path = os.path.join(diagrams_dir, RENDER_HASHES)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(hashes, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+def diagram_caps(max_nodes: int = None, max_edges: int = None, max_depth: int = None) -> dict:
+    """Return the diagram caps, taking those not given from DIAGRAM_CAPS."""
+    given = {"max_nodes": max_nodes, "max_edges": max_edges, "max_depth": max_depth}
+    return {name: DIAGRAM_CAPS[name] if value is None else value for name, value in given.items()}
+
+def cap_expression_depth(node: ClassExpression, max_depth: int, depth: int = 0) -> ClassExpression:
+    """Return node with the operands of expressions nested max_depth deep collapsed into a "+N more" node."""
+    if not node.members or not max_depth:
+        return node
+    if depth >= max_depth:
+        more = ClassExpression("more", f"{node.node_id}_more", f"+{len(node.members)} more")
+        return ClassExpression(node.kind, node.node_id, node.label, node.url, [more])
+    members = [cap_expression_depth(member, max_depth, depth + 1) for member in node.members]
+    if all(capped is member for capped, member in zip(members, node.members)):
+        return node
+    return ClassExpression(node.kind, node.node_id, node.label, node.url, members)
+
+def expression_size(node: ClassExpression, drawn: set) -> tuple:
+    """Return the nodes (ClassExpressions not in drawn, by node id) and the member edges that drawing node adds."""
+    new = {}
+    edges = 0
+    pending = [node]
+    while pending:
+        expr = pending.pop()
+        if expr.node_id in drawn or expr.node_id in new:
+            continue
+        new[expr.node_id] = expr
+        edges += len(expr.members)
+        pending.extend(expr.members)
+    return new, edges
+
+def add_class_expression_node(graph, node: ClassExpression, created: set) -> str:
+    """Recursively add nodes for a class expression and its operands, returning the node id."""
+    node_id = node.node_id
+    if node_id in created:
+        return node_id
+    created.add(node_id)
+    if node.kind == "named":
         graph.node(
             node_id,
-            label=f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1"><TR><TD BGCOLOR="lightgray" ALIGN="CENTER">{label}</TD></TR></TABLE>>',
-            URL=url,
+            label=f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1"><TR><TD BGCOLOR="lightgray" ALIGN="CENTER">{node.label}</TD></TR></TABLE>>',
+            URL=node.url,
             margin="0"
         )
-        log.debug("Added node %s: %s (superclass=%s, in_associated_cluster=%s)", node_id, qname, is_superclass, in_associated_cluster)
-        return node_id, qname
-    else:  # BNode
-        node_id = str(expr).replace(":", "_").replace("/", "_").replace("#", "_").replace("_:", "bnode_")
-        if node_id in created:
-            return node_id, get_class_expression_str(g, expr, ns, prefix_map)
-        created.add(node_id)
-        expr_str = get_class_expression_str(g, expr, ns, prefix_map)
-        # Handle unionOf
-        union_col = g.value(expr, OWL.unionOf)
-        if union_col and union_col != RDF.nil:
-            members = collect_list(g, union_col)
-            stereo = "unionOf"
-            graph.node(node_id, f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1" BGCOLOR="lightyellow"><TR><TD ALIGN="CENTER">«{stereo}»</TD></TR></TABLE>>', margin="0")
-            for member in sorted(members, key=str):
-                member_id, _ = add_class_expression_node(graph, g, member, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created, is_superclass=False, in_associated_cluster=in_associated_cluster)
-                graph.edge(node_id, member_id, style="dotted", label="member", arrowhead="normal")
-            log.debug("Added union node %s: %s", node_id, expr_str)
-            return node_id, ""
-        # Handle intersectionOf
-        inter_col = g.value(expr, OWL.intersectionOf)
-        if inter_col and inter_col != RDF.nil:
-            members = collect_list(g, inter_col)
-            stereo = "intersectionOf"
-            graph.node(node_id, f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1" BGCOLOR="lightyellow"><TR><TD ALIGN="CENTER">«{stereo}»</TD></TR></TABLE>>', margin="0")
-            for member in sorted(members, key=str):
-                member_id, _ = add_class_expression_node(graph, g, member, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created, is_superclass=False, in_associated_cluster=in_associated_cluster)
-                graph.edge(node_id, member_id, style="dotted", label="member", arrowhead="normal")
-            return node_id, ""
-        # Handle complementOf
-        complement = g.value(expr, OWL.complementOf)
-        if complement:
-            stereo = "not"
-            graph.node(node_id, f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1" BGCOLOR="lightyellow"><TR><TD ALIGN="CENTER">«{stereo}»</TD></TR></TABLE>>', margin="0")
-            comp_id, _ = add_class_expression_node(graph, g, complement, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created, is_superclass=False, in_associated_cluster=in_associated_cluster)
-            graph.edge(node_id, comp_id, style="dotted", label="of", arrowhead="normal")
-            log.debug("Added complement node %s: %s", node_id, expr_str)
-            return node_id, ""
+        log.debug("Added node %s: %s", node_id, node.label)
+    elif node.kind == "more":
+        # Operands left out by the diagram caps
+        graph.node(node_id, label=node.label, shape="plaintext", fontcolor="gray40")
+        log.debug("Added overflow node %s: %s", node_id, node.label)
+    elif node.kind == "other":
         # Fallback for other complex expressions
-        graph.node(node_id, label=expr_str, shape="plaintext")
-        log.debug("Added fallback node %s: %s", node_id, expr_str)
-        return node_id, expr_str
+        graph.node(node_id, label=node.label, shape="plaintext")
+        log.debug("Added fallback node %s: %s", node_id, node.label)
+    else:
+        # unionOf, intersectionOf and complementOf
+        graph.node(node_id, f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1" BGCOLOR="lightyellow"><TR><TD ALIGN="CENTER">«{node.kind}»</TD></TR></TABLE>>', margin="0")
+        edge_label = "of" if node.kind == "not" else "member"
+        for member in node.members:
+            member_id = add_class_expression_node(graph, member, created)
+            graph.edge(node_id, member_id, style="dotted", label=edge_label, arrowhead="normal")
+        log.debug("Added %s node %s: %s", node.kind, node_id, node.label)
+    return node_id
 
-def generate_diagram(g: Graph, cls: URIRef, cls_name: str, cls_id: str, ns: str, global_all_classes: set, abstract_map: dict, ofn_path: str, errors: list, prefix_map: dict, ontology_name: str, ns_to_ontology: dict):
-    """Generate a DOT file for a given class, producing an ODM-like diagram with associated cluster defined before edges."""
-    # Ensure output directory exists
-    diagrams_dir = os.path.join(os.path.dirname(ofn_path), "diagrams")
-    os.makedirs(diagrams_dir, exist_ok=True)
-    cls_filename = f"{ontology_name}__{cls_name}"
+@timed("render")
+def render_diagrams(render_queue: list, errors: list, formats: tuple = RENDER_FORMATS, batch_size: int = RENDER_BATCH_SIZE, workers: int = None):
+    """Render queued diagrams in batches, one Graphviz process per batch.
+
+    Each entry of render_queue is a (dot_file, cls_name, ofn_path, dot_source) tuple. Graphviz lays out
+    every graph once and writes all requested formats from that layout, naming the outputs
+    <dot_file>.<format> just like Digraph.render(); dot_file itself need not exist. Diagrams whose
+    source hashes to the value recorded in RENDER_HASHES when their images were written are not
+    rendered again. The coordinates of each layout are cached (see diagram_layout), and a diagram
+    whose source only differs from the cached one in styling is drawn from them by neato -n2.
+    A failing batch is retried diagram by diagram, so that failures are reported against the class
+    that caused them. Return the entries that failed."""
+    if not render_queue:
+        return []
+
+    # Reuse the images of diagrams whose DOT source is the one they were last rendered from. A diagram
+    # queued more than once is rendered from its last source.
+    hashes = {}
+    pending = {}
+    for entry in render_queue:
+        dot_file, _, _, dot_source = entry
+        diagrams_dir, name = os.path.split(dot_file)
+        if diagrams_dir not in hashes:
+            hashes[diagrams_dir] = load_render_hashes(diagrams_dir)
+        digest = render_hash(dot_source, formats)
+        pending.pop(dot_file, None)
+        if hashes[diagrams_dir].get(name) == digest and all(os.path.exists(f"{dot_file}.{fmt}") for fmt in formats):
+            _render_stats["skipped"] += 1
+        else:
+            pending[dot_file] = (entry, digest)
+    if len(pending) < len(render_queue):
+        log.info("Skipping %d diagrams with unchanged DOT source", len(render_queue) - len(pending))
+
+    # Draw each diagram from its cached coordinates if only its styling changed, else lay it out again
+    outcomes = []
+    items = {"neato": [], "dot": []}
+    for entry, digest in pending.values():
+        dot_file, cls_name, ofn_path, dot_source = entry
+        try:
+            key = layout_key(dot_source)
+        except Exception as e:
+            outcomes.append((entry, digest, False, f"Error rendering diagram for {cls_name} from {ofn_path}: {str(e)}\n{traceback.format_exc()}"))
+            continue
+        layout = load_cached_layout(dot_file, key)
+        if layout is not None:
+            try:
+                items["neato"].append((entry, digest, key, apply_layout(dot_source, layout)))
+                continue
+            except ValueError as e:
+                log.debug("Not reusing the cached layout of %s: %s", dot_file, e)
+        items["dot"].append((entry, digest, key, dot_source))
+
+    # Batches of diagrams drawn by the same program into the same directory
+    batches = []
+    for program, program_items in items.items():
+        by_dir = {}
+        for item in program_items:
+            by_dir.setdefault(os.path.dirname(item[0][0]), []).append(item)
+        for dir_items in by_dir.values():
+            batches += [(program, dir_items[i:i + batch_size]) for i in range(0, len(dir_items), batch_size)]
+
+    def render_batch(program, batch):
+        """Render a batch with one Graphviz process; return [(entry, digest, reused layout, error message or None)]."""
+        # -O names the outputs of each input file after it, so the sources go to a temporary directory next
+        # to the images under the name of their DOT file, and the outputs are then moved into place
+        with tempfile.TemporaryDirectory(prefix=".render-", dir=os.path.dirname(batch[0][0][0])) as tmp_dir:
+            paths = []
+            for entry, _, _, source in batch:
+                path = os.path.join(tmp_dir, os.path.basename(entry[0]))
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(source)
+                paths.append(path)
+            # neato -n2 draws from the coordinates in the source; dot also writes them (json0) for the layout cache
+            options = ["-n2"] if program == "neato" else ["-Tjson0"]
+            try:
+                result = subprocess.run([program, *options, *[f"-T{fmt}" for fmt in formats], "-O", *paths], capture_output=True)
+                # Graphviz names the input file in its messages; name the diagram's DOT file instead
+                stderr = result.stderr.decode("utf-8", "replace").strip().replace(tmp_dir, os.path.dirname(batch[0][0][0]))
+                error = None if result.returncode == 0 else RuntimeError(f"{program} exited with status {result.returncode}: {stderr}")
+            except Exception as e:
+                error = e
+            if error is not None and len(batch) > 1:
+                # Retry individually to attribute the failure to a class
+                return [outcome for item in batch for outcome in render_batch(program, [item])]
+            batch_outcomes = []
+            for (entry, digest, key, _), path in zip(batch, paths):
+                dot_file, cls_name, ofn_path, _ = entry
+                try:
+                    if error is not None:
+                        raise error
+                    for fmt in formats:
+                        os.replace(f"{path}.{fmt}", f"{dot_file}.{fmt}")
+                except Exception as e:
+                    batch_outcomes.append((entry, digest, False, f"Error rendering diagram for {cls_name} from {ofn_path}: {str(e)}\n{traceback.format_exc()}"))
+                    continue
+                if program == "dot":
+                    try:
+                        with open(f"{path}.json0", encoding="utf-8") as f:
+                            store_cached_layout(dot_file, key, read_layout(f.read()))
+                    except Exception as e:
+                        log.warning("Could not cache the layout of %s: %s", dot_file, str(e))
+                batch_outcomes.append((entry, digest, program == "neato", None))
+            return batch_outcomes
+
+    if batches:
+        workers = workers or min(len(batches), os.cpu_count() or 1, RENDER_WORKERS)
+        log.info("Rendering %d diagrams in %d batches with %d workers", sum(len(batch) for _, batch in batches), len(batches), workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for batch_outcomes in executor.map(lambda batch: render_batch(*batch), batches):
+                outcomes += batch_outcomes
+
+    failed = []
+    for entry, digest, reused_layout, error_msg in outcomes:
+        diagrams_dir, name = os.path.split(entry[0])
+        if error_msg:
+            # Forget the hash so that the diagram is rendered again next time
+            hashes[diagrams_dir].pop(name, None)
+            failed.append(entry)
+            errors.append(error_msg)
+            log.error(error_msg)
+        else:
+            hashes[diagrams_dir][name] = digest
+            _render_stats["rendered"] += 1
+            _render_stats["reused_layouts"] += reused_layout
+
+    for diagrams_dir, dir_hashes in hashes.items():
+        try:
+            save_render_hashes(diagrams_dir, dir_hashes)
+        except Exception as e:
+            error_msg = f"Error writing render hashes to {diagrams_dir}: {str(e)}\n{traceback.format_exc()}"
+            errors.append(error_msg)
+            log.error(error_msg)
+    return failed
+
+def render_class_diagram(model: ClassModel, cls_id: str, ontology_name: str, global_all_classes: set, caps: dict = None) -> Digraph:
+    """Build the ODM-like diagram of a class from its ClassModel, with the associated cluster defined before edges.
+
+    The diagram is kept within caps (DIAGRAM_CAPS by default): superclasses are admitted first, then associated
+    classes, then object property edges whose targets fit; what is left out is summarised by "+N more" nodes."""
+    cls_name = model.name
+    caps = caps or DIAGRAM_CAPS
+    max_nodes = caps["max_nodes"] or float("inf")
+    max_edges = caps["max_edges"] or float("inf")
+
+    # Select what fits within the caps, counting nodes by id as add_class_expression_node creates them
+    drawn = {cls_id}
+    left_out = set()
+    edge_count = 0
+
+    def admit(expr: ClassExpression, edges: int) -> bool:
+        nonlocal edge_count
+        new, member_edges = expression_size(expr, drawn)
+        if left_out.intersection(new) or len(drawn) + len(new) > max_nodes or edge_count + member_edges + edges > max_edges:
+            return False
+        drawn.update(new)
+        edge_count += member_edges + edges
+        return True
+
+    superclasses = [sup for sup in (cap_expression_depth(sup, caps["max_depth"]) for sup in model.superclasses) if admit(sup, 1)]
+    associated = []
+    for assoc in model.associated:
+        assoc = cap_expression_depth(assoc, caps["max_depth"])
+        if admit(assoc, 0):
+            associated.append(assoc)
+        else:
+            # Keep edges from drawing the class outside the associated cluster
+            left_out.add(assoc.node_id)
+    associations = []
+    for data in model.associations:
+        data = dict(data, target=cap_expression_depth(data['target'], caps["max_depth"]))
+        if admit(data['target'], 1):
+            associations.append(data)
+    hidden_superclasses = len(model.superclasses) - len(superclasses)
+    hidden_associated = len(model.associated) - len(associated)
+    hidden_associations = len(model.associations) - len(associations)
+    if hidden_superclasses or hidden_associated or hidden_associations:
+        log.info("Diagram of %s exceeds the caps %s; left out %d superclasses, %d associated classes and %d associations",
+                 cls_name, caps, hidden_superclasses, hidden_associated, hidden_associations)
 
     # Initialize Digraph with ODM-like styling
     dot = Digraph(
@@ -106,76 +310,10 @@ def generate_diagram(g: Graph, cls: URIRef, cls_name: str, cls_id: str, ns: str,
     )
     dot.engine = 'dot'  # Use dot for better hierarchical layout
 
-    # Track combined properties to merge restrictions
-    combined = defaultdict(dict)
-
     # Add main class node with datatype properties
     with dot.subgraph() as main_group:
         main_group.attr(rank='max')
-        data_props = defaultdict(list)
-        for restriction in g.objects(cls, RDFS.subClassOf):
-            if (restriction, RDF.type, OWL.Restriction) in g:
-                prop = g.value(restriction, OWL.onProperty)
-                if not prop:
-                    continue
-                prop_name, is_inverse, base_prop = get_property_info(g, prop, ns, prefix_map)
-                if base_prop and (base_prop, RDF.type, OWL.DatatypeProperty) in g:
-                    range_type = g.value(base_prop, RDFS.range) or XSD.string
-                    range_name = get_class_expression_str(g, range_type, ns, prefix_map)
-                    restrictions = []
-                    stereotype = "refined" if is_refined_property(g, cls, base_prop, restriction) else ""
-                    if is_inverse:
-                        stereotype += ", inverse" if stereotype else "inverse"
-                    all_values_from = g.value(restriction, OWL.allValuesFrom)
-                    if all_values_from:
-                        range_name = get_class_expression_str(g, all_values_from, ns, prefix_map)
-                        restrictions.append("only")
-                    on_data_range = g.value(restriction, OWL.onDataRange)
-                    qualified_card = g.value(restriction, OWL.qualifiedCardinality)
-                    min_qualified_card = g.value(restriction, OWL.minQualifiedCardinality)
-                    max_qualified_card = g.value(restriction, OWL.maxQualifiedCardinality)
-                    if qualified_card:
-                        restrictions.append(f"exactly {qualified_card}")
-                    if min_qualified_card:
-                        restrictions.append(f"min {min_qualified_card}")
-                    if max_qualified_card:
-                        restrictions.append(f"max {max_qualified_card}")
-                    if on_data_range:
-                        range_name = get_class_expression_str(g, on_data_range, ns, prefix_map)
-                    card = g.value(restriction, OWL.cardinality)
-                    min_card = g.value(restriction, OWL.minCardinality)
-                    max_card = g.value(restriction, OWL.maxCardinality)
-                    if card:
-                        restrictions.append(f"exactly {card}")
-                    if min_card:
-                        restrictions.append(f"min {min_card}")
-                    if max_card:
-                        restrictions.append(f"max {max_card}")
-                    restriction_str = f"«{', '.join(restrictions)}»" if restrictions else ""
-                    data_props[prop_name].append((restriction_str, range_name, stereotype))
-                    log.debug("Added datatype property %s: %s «%s»", prop_name, range_name, stereotype)
-
-        attributes = []
-        for prop_name, restrictions in sorted(data_props.items()):
-            all_restrictions = []
-            range_names = set()
-            stereotypes = set()
-            for restriction_str, range_name, stereotype in restrictions:
-                if restriction_str:
-                    all_restrictions.append(restriction_str)
-                range_names.add(range_name)
-                if stereotype:
-                    stereotypes.add(stereotype)
-            range_name = range_names.pop() if range_names else "string"
-            restriction_label = ", ".join(sorted(set(r.strip('«»') for r in all_restrictions))) if all_restrictions else ""
-            stereotype_label = ", ".join(sorted(set(s for s in stereotypes))) if stereotypes else ""
-            attribute = f"{prop_name}: {range_name}"
-            if restriction_label or stereotype_label:
-                labels = [l for l in [restriction_label, stereotype_label] if l]
-                attribute = f"{attribute} «{', '.join(labels)}»"
-            attributes.append(attribute)
-
-        attributes_html = "".join(f'<TR><TD ALIGN="LEFT">{prop}</TD></TR>' for prop in attributes)
+        attributes_html = "".join(f'<TR><TD ALIGN="LEFT">{prop}</TD></TR>' for prop in model.attributes)
         main_label = f'<<TABLE BORDER="1" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1"><TR><TD BGCOLOR="lightgray" ALIGN="CENTER" PORT="e">{cls_name}</TD></TR>{attributes_html}</TABLE>>'
         main_group.node(
             cls_id,
@@ -186,115 +324,34 @@ def generate_diagram(g: Graph, cls: URIRef, cls_name: str, cls_id: str, ns: str,
         log.debug("Added main class node %s: %s", cls_id, cls_name)
 
     # Add superclasses (direct superclasses via rdfs:subClassOf)
-    super_uris = set()
-    for super_cls in g.objects(cls, RDFS.subClassOf):
-        if isinstance(super_cls, URIRef) and super_cls != OWL.Thing:
-            super_uris.add(super_cls)
-    superclasses = {get_qname(g, u, ns, prefix_map) for u in super_uris}
     created = set()
-    for sup_uri in sorted(super_uris, key=lambda u: get_qname(g, u, ns, prefix_map).lower()):
-        sup_id, _ = add_class_expression_node(dot, g, sup_uri, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created, is_superclass=True)
+    for sup in superclasses:
+        sup_id = add_class_expression_node(dot, sup, created)
         log.debug("Added superclass node %s", sup_id)
 
-    # Collect associated classes for object properties
-    associated_uris = set()
-    for restriction in g.objects(cls, RDFS.subClassOf):
-        if (restriction, RDF.type, OWL.Restriction) in g:
-            prop = g.value(restriction, OWL.onProperty)
-            if prop and (prop, RDF.type, OWL.ObjectProperty) in g:
-                for target_expr in [g.value(restriction, p) for p in (OWL.onClass, OWL.allValuesFrom, OWL.someValuesFrom) if g.value(restriction, p)]:
-                    leaf_classes = get_leaf_classes(g, target_expr, ns, prefix_map)
-                    for leaf in leaf_classes:
-                        if isinstance(leaf, URIRef):
-                            leaf_qname = get_qname(g, leaf, ns, prefix_map)
-                            if leaf_qname != cls_name and leaf_qname not in superclasses:
-                                associated_uris.add(leaf)
-                                log.debug("Added associated URI: %s", leaf_qname)
-
     # Create associated cluster and add nodes
     assoc_nodes = []
     created_complex = set()
     with dot.subgraph(name='cluster_associated') as associated_cluster:
         associated_cluster.attr(style='invis', label='')
         associated_cluster.node('Invis', label='<<TABLE BORDER="0" CELLBORDER="0" CELLSPACING="0" CELLPADDING="1"><TR><TD></TD></TR></TABLE>>', style='invis', margin="0")
-        for assoc_uri in sorted(associated_uris, key=lambda u: get_qname(g, u, ns, prefix_map).lower()):
-            assoc_id, _ = add_class_expression_node(associated_cluster, g, assoc_uri, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created_complex, is_superclass=False, in_associated_cluster=True)
+        for assoc in associated:
+            assoc_id = add_class_expression_node(associated_cluster, assoc, created_complex)
             assoc_nodes.append(assoc_id)
             log.debug("Added associated node %s", assoc_id)
-
-    # Process object properties
-    for restriction in g.objects(cls, RDFS.subClassOf):
-        if (restriction, RDF.type, OWL.Restriction) in g:
-            prop = g.value(restriction, OWL.onProperty)
-            if not prop:
-                continue
-            prop_name, is_inverse, base_prop = get_property_info(g, prop, ns, prefix_map)
-            if base_prop and (base_prop, RDF.type, OWL.ObjectProperty) in g:
-                is_refined = is_refined_property(g, cls, base_prop, restriction)
-                style = "dashed" if is_refined else "solid"
-                label_parts = []
-                target_expr = None
-                reflexive = False
-
-                on_class = g.value(restriction, OWL.onClass)
-                qualified_card = g.value(restriction, OWL.qualifiedCardinality)
-                min_qualified_card = g.value(restriction, OWL.minQualifiedCardinality)
-                max_qualified_card = g.value(restriction, OWL.maxQualifiedCardinality)
-                if qualified_card:
-                    label_parts.append(f"exactly {qualified_card}")
-                if min_qualified_card:
-                    label_parts.append(f"min {min_qualified_card}")
-                if max_qualified_card:
-                    label_parts.append(f"max {max_qualified_card}")
-                if label_parts and on_class:
-                    target_expr = on_class
-
-                all_values_from = g.value(restriction, OWL.allValuesFrom)
-                if all_values_from:
-                    label_parts.append("only")
-                    target_expr = all_values_from
-
-                some_values_from = g.value(restriction, OWL.someValuesFrom)
-                if some_values_from:
-                    label_parts.append("some")
-                    target_expr = some_values_from
-
-                card = g.value(restriction, OWL.cardinality)
-                min_card = g.value(restriction, OWL.minCardinality)
-                max_card = g.value(restriction, OWL.maxCardinality)
-                if card:
-                    label_parts.append(f"exactly {card}")
-                if min_card:
-                    label_parts.append(f"min {min_card}")
-                if max_card:
-                    label_parts.append(f"max {max_card}")
-
-                # Handle unqualified cardinality by treating as qualified with owl:Thing
-                if label_parts and not target_expr:
-                    target_expr = OWL.Thing
-
-                if target_expr and label_parts:
-                    target_id, _, _, target_qname, reflexive, _ = get_target_info(g, target_expr, cls_name, ns, prefix_map)
-                    key = (prop_name, target_id)
-                    if key not in combined:
-                        combined[key] = {
-                            'label_parts': [],
-                            'style': style,
-                            'prop_name': prop_name,
-                            'target_expr': target_expr,
-                            'reflexive': reflexive,
-                            'target_qname': target_qname,
-                            'is_inverse': is_inverse
-                        }
-                    combined[key]['label_parts'].extend(label_parts)
-                    combined[key]['style'] = "dashed" if is_refined else combined[key]['style']
-                    log.debug("Added object property %s -> %s: %s, style=%s, reflexive=%s", prop_name, target_qname, label_parts, style, reflexive)
+        if hidden_associations or hidden_associated:
+            counts = [(hidden_associated, "classes"), (hidden_associations, "associations")]
+            label = ", ".join(f"+{count} more {noun}" for count, noun in counts if count)
+            assoc_nodes.append(add_class_expression_node(associated_cluster, ClassExpression("more", "MoreAssociated", label), created_complex))
 
     # Add edges for superclasses
-    for sup_uri in sorted(super_uris, key=lambda u: get_qname(g, u, ns, prefix_map).lower()):
-        sup_id, _ = add_class_expression_node(dot, g, sup_uri, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created, is_superclass=True)
+    for sup in superclasses:
+        sup_id = add_class_expression_node(dot, sup, created)
         dot.edge(cls_id, sup_id, arrowhead="onormal", style="solid")
         log.debug("Added generalization edge %s -> %s", cls_id, sup_id)
+    if hidden_superclasses:
+        more_id = add_class_expression_node(dot, ClassExpression("more", "MoreSuperclasses", f"+{hidden_superclasses} more superclasses"), created)
+        dot.edge(cls_id, more_id, arrowhead="onormal", style="solid")
 
     # Add invisible edges for layout
     if assoc_nodes:
@@ -306,14 +363,13 @@ def generate_diagram(g: Graph, cls: URIRef, cls_name: str, cls_id: str, ns: str,
             prev = assoc_id
 
     # Add object property edges
-    for key, data in combined.items():
+    for data in associations:
         prop_name = data['prop_name']
         style = data['style']
         label_parts = data['label_parts']
         reflexive = data['reflexive']
-        target_expr = data['target_expr']
         is_inverse = data['is_inverse']
-        target_id, target_label = add_class_expression_node(dot, g, target_expr, ns, prefix_map, global_all_classes, ns_to_ontology, abstract_map, created_complex, is_superclass=False, in_associated_cluster=True)
+        target_id = add_class_expression_node(dot, data['target'], created_complex)
         label_prefix = f"«{', '.join(sorted(set(label_parts)))}» " if label_parts else ""
         if style == "solid":
             label = f" {prop_name} \n {label_prefix} "
@@ -327,16 +383,36 @@ def generate_diagram(g: Graph, cls: URIRef, cls_name: str, cls_id: str, ns: str,
         else:
             dot.edge(source_id, dest_id, label=label, style=style, arrowhead=arrowhead)
         log.debug("Added edge %s -> %s: %s", source_id, dest_id, label)
+    return dot
 
-    # Save and render the DOT file
-    log.debug("Generated DOT source for %s:\n%s", cls_name, dot.source)
+def generate_diagram(g: Graph, cls: URIRef, cls_name: str, cls_id: str, ns: str, global_all_classes: set, abstract_map: dict, ofn_path: str, errors: list, prefix_map: dict, ontology_name: str, ns_to_ontology: dict, render_queue: list = None, model: ClassModel = None, write_dot: bool = False, caps: dict = None):
+    """Generate the DOT source for a given class, producing an ODM-like diagram with associated cluster defined before edges.
+
+    If render_queue is given, the source is queued for render_diagrams() instead of being rendered immediately.
+    The source is only written to a .dot file if write_dot is set. model is the class's ClassModel if it has
+    already been extracted. caps bound the size of the diagram (DIAGRAM_CAPS by default)."""
+    # Ensure output directory exists
+    diagrams_dir = os.path.join(os.path.dirname(ofn_path), "diagrams")
+    os.makedirs(diagrams_dir, exist_ok=True)
+    cls_filename = f"{ontology_name}__{cls_name}"
+
+    if model is None:
+        model = extract_class_model(g, cls, cls_name, ns, prefix_map, global_all_classes, ns_to_ontology, {})
+    with stage("dot"):
+        dot_source = render_class_diagram(model, cls_id, ontology_name, global_all_classes, caps).source
+    log.debug("Generated DOT source for %s:\n%s", cls_name, dot_source)
+
+    # Queue the source for rendering, writing the DOT file only if asked to
     try:
         dot_file = os.path.join(diagrams_dir, f"{cls_filename}.dot")
-        dot.save(dot_file)
-        with open(dot_file, 'r') as f:
-            log.debug("DOT file content:\n%s", f.read())
-        dot.render(dot_file, cleanup=False)
-        dot.render(dot_file, format='png', cleanup=False)
+        if write_dot:
+            with open(dot_file, 'w', encoding='utf-8') as f:
+                f.write(dot_source)
+        entry = (dot_file, cls_name, ofn_path, dot_source)
+        if render_queue is not None:
+            render_queue.append(entry)
+        else:
+            render_diagrams([entry], errors)
     except Exception as e:
         error_msg = f"Error rendering diagram for {cls_name} from {ofn_path}: {str(e)}\n{traceback.format_exc()}"
         errors.append(error_msg)
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import hashlib
+import logging
+
+log = logging.getLogger("ofn2mkdocs")
+
+# Positioned graphs of the diagrams in a directory, one JSON file per diagram, kept next to the images
+LAYOUT_CACHE_DIR = ".layout_cache"
+# Attributes that only change how a laid out graph is drawn. A diagram whose source differs from the
+# cached one only in these is drawn from the cached coordinates instead of being laid out again.
+# fontname and fontsize are not among them: they change the size of nodes and labels.
+STYLE_ATTRIBUTES = frozenset({
+    "bgcolor", "color", "colorscheme", "fillcolor", "fontcolor", "pencolor", "penwidth",
+    "style", "class", "id", "URL", "href", "target", "tooltip", "edgeURL", "edgehref", "edgetarget", "edgetooltip"
+})
+# Layout attributes read from Graphviz's json0 output and given back to neato -n2. Nodes are given
+# back with fixedsize=true, so that they keep the size the edge splines were routed around.
+GRAPH_LAYOUT_ATTRIBUTES = ("bb", "lp")
+NODE_LAYOUT_ATTRIBUTES = ("pos", "width", "height")
+EDGE_LAYOUT_ATTRIBUTES = ("pos", "lp", "xlp", "head_lp", "tail_lp")
+
+_TOKEN = re.compile(r'''
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<edgeop>->|--)
+  | (?P<punct>[{}\[\]=;,:])
+  | (?P<id>[A-Za-z_\x80-\uffff][\w\x80-\uffff]*|-?(?:\.\d+|\d+(?:\.\d*)?))
+''', re.VERBOSE | re.DOTALL)
+
+def _tokens(source: str) -> list:
+    """Split DOT source into (kind, text, start, end) tokens, leaving out whitespace and comments."""
+    tokens = []
+    pos = 0
+    while pos < len(source):
+        if source[pos] == "<":
+            # HTML string: runs to the matching >
+            depth = 0
+            for end in range(pos, len(source)):
+                depth += {"<": 1, ">": -1}.get(source[end], 0)
+                if depth == 0:
+                    break
+            else:
+                raise ValueError(f"Unterminated HTML string at offset {pos} of DOT source")
+            tokens.append(("html", source[pos:end + 1], pos, end + 1))
+            pos = end + 1
+            continue
+        match = _TOKEN.match(source, pos)
+        if not match:
+            raise ValueError(f"Unexpected {source[pos]!r} at offset {pos} of DOT source")
+        if match.lastgroup != "space":
+            tokens.append((match.lastgroup, match.group(), pos, match.end()))
+        pos = match.end()
+    return tokens
+
+def _name(token: tuple) -> str:
+    kind, text, _, _ = token
+    return text[1:-1].replace('\\"', '"') if kind == "string" else text
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '\\"') + '"'
+
+def layout_key(source: str) -> str:
+    """Hash DOT source without its STYLE_ATTRIBUTES, so that sources that only differ in styling share a layout."""
+    tokens = _tokens(source)
+    kept = []
+    i = 0
+    while i < len(tokens):
+        if i + 2 < len(tokens) and tokens[i + 1][1] == "=" and _name(tokens[i]) in STYLE_ATTRIBUTES:
+            i += 3
+            continue
+        kept.append(tokens[i][1])
+        i += 1
+    return hashlib.sha256("\0".join(kept).encode("utf-8")).hexdigest()
+
+def read_layout(json0: str) -> dict:
+    """Keep the coordinates of a graph laid out by Graphviz (-Tjson0): the bounding box and label position of
+    the graph and its clusters, the position of every node and the spline and label positions of every edge."""
+    data = json.loads(json0)
+    objects = data.get("objects", [])
+    layout = {"graph": {}, "clusters": {}, "nodes": {}, "edges": []}
+    layout["graph"] = {a: data[a] for a in GRAPH_LAYOUT_ATTRIBUTES if a in data}
+    for obj in objects:
+        if "pos" in obj:
+            layout["nodes"][obj["name"]] = {a: obj[a] for a in NODE_LAYOUT_ATTRIBUTES if a in obj}
+        elif "bb" in obj and obj["name"].startswith("cluster"):
+            layout["clusters"][obj["name"]] = {a: obj[a] for a in GRAPH_LAYOUT_ATTRIBUTES if a in obj}
+    for edge in sorted(data.get("edges", []), key=lambda e: e["_gvid"]):
+        attrs = {a: edge[a] for a in EDGE_LAYOUT_ATTRIBUTES if a in edge}
+        layout["edges"].append([objects[edge["tail"]]["name"], objects[edge["head"]]["name"], attrs])
+    return layout
+
+def _attributes(attrs: dict) -> str:
+    return " ".join(f"{name}={_quote(value)}" for name, value in attrs.items())
+
+def _pinned(attrs: dict) -> dict:
+    return {**attrs, "fixedsize": "true"} if "width" in attrs and "height" in attrs else attrs
+
+def apply_layout(source: str, layout: dict) -> str:
+    """Return source with the coordinates of layout added, for drawing with neato -n2 without a new layout.
+
+    Edges are matched to the layout by tail, head and order, clusters and nodes by name; nodes with a
+    cached size are pinned to it. Raise ValueError if the source has statements this does not handle
+    or does not match the layout."""
+    tokens = _tokens(source)
+    try:
+        insertions = _layout_insertions(tokens, layout)
+    except IndexError:
+        raise ValueError("Unterminated statement in DOT source")
+    for offset, text in sorted(insertions, reverse=True):
+        source = source[:offset] + text + source[offset:]
+    return source
+
+def _layout_insertions(tokens: list, layout: dict) -> list:
+    """Return the (offset, text) insertions that add the coordinates of layout to the source of tokens."""
+    insertions = []
+    edges = {}
+    for tail, head, attrs in layout["edges"]:
+        edges.setdefault((tail, head), []).append(attrs)
+
+    def skip_port(i):
+        while i + 1 < len(tokens) and tokens[i][1] == ":":
+            i += 2
+        return i
+
+    i = 0
+    while i < len(tokens) and tokens[i][1] != "{":
+        i += 1
+    if i == len(tokens):
+        raise ValueError("No graph body in DOT source")
+    insertions.append((tokens[i][3], f"\n\t{_attributes(layout['graph'])}" if layout["graph"] else ""))
+    depth = 1
+    i += 1
+    while i < len(tokens):
+        kind, text, start, end = tokens[i]
+        if text == "}" and kind == "punct":
+            depth -= 1
+            if depth == 0:
+                # Node positions go last, where they apply to nodes declared anywhere in the graph
+                nodes = "".join(f"\t{_quote(name)} [{_attributes(_pinned(attrs))}]\n" for name, attrs in layout["nodes"].items())
+                insertions.append((start, nodes))
+                break
+            i += 1
+        elif text in (";", ",") and kind == "punct":
+            i += 1
+        elif text == "{" and kind == "punct":
+            depth += 1
+            i += 1
+        elif kind == "id" and text == "subgraph":
+            i += 1
+            name = None
+            if tokens[i][0] in ("id", "string"):
+                name = _name(tokens[i])
+                i += 1
+            if tokens[i][1] != "{":
+                raise ValueError(f"Unexpected {tokens[i][1]!r} after subgraph in DOT source")
+            if name in layout["clusters"]:
+                insertions.append((tokens[i][3], f"\n\t\t{_attributes(layout['clusters'][name])}"))
+            depth += 1
+            i += 1
+        elif kind == "id" and text in ("graph", "node", "edge") and tokens[i + 1][1] == "[":
+            while tokens[i][1] != "]":
+                i += 1
+            i += 1
+        elif kind in ("id", "string", "html") and tokens[i + 1][1] == "=":
+            i += 3
+        elif kind in ("id", "string", "html"):
+            ids = [_name(tokens[i])]
+            i = skip_port(i + 1)
+            while tokens[i][0] == "edgeop":
+                if tokens[i + 1][0] not in ("id", "string", "html"):
+                    raise ValueError("Edges to subgraphs are not supported when reusing a layout")
+                ids.append(_name(tokens[i + 1]))
+                i = skip_port(i + 2)
+            last_end = tokens[i - 1][3]
+            attr_end = None
+            while tokens[i][1] == "[":
+                while tokens[i][1] != "]":
+                    i += 1
+                attr_end = tokens[i][2]
+                i += 1
+            if len(ids) > 2:
+                raise ValueError("Edge chains are not supported when reusing a layout")
+            if len(ids) == 2:
+                matching = edges.get(tuple(ids))
+                if not matching:
+                    raise ValueError(f"Edge {ids[0]} -> {ids[1]} is not in the cached layout")
+                attrs = _attributes(matching.pop(0))
+                insertions.append((attr_end, f" {attrs}") if attr_end is not None else (last_end, f" [{attrs}]"))
+        else:
+            raise ValueError(f"Unexpected {text!r} at offset {start} of DOT source")
+    else:
+        raise ValueError("Unterminated graph body in DOT source")
+    return insertions
+
+def load_cached_layout(dot_file: str, key: str) -> dict:
+    """Return the cached layout of dot_file if it was made for the same layout key, else None."""
+    diagrams_dir, name = os.path.split(dot_file)
+    try:
+        with open(os.path.join(diagrams_dir, LAYOUT_CACHE_DIR, f"{name}.json"), encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return cached["layout"] if isinstance(cached, dict) and cached.get("key") == key else None
+
+def store_cached_layout(dot_file: str, key: str, layout: dict):
+    """Cache the layout of dot_file under its layout key, replacing the previous one."""
+    diagrams_dir, name = os.path.split(dot_file)
+    cache_dir = os.path.join(diagrams_dir, LAYOUT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"{name}.json")
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump({"key": key, "layout": layout}, f)
+    os.replace(f"{path}.tmp", path)
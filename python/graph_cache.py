@@ -0,0 +1,224 @@
+import os
+import zlib
+import pickle
+import hashlib
+import logging
+from array import array
+import rdflib
+from rdflib import Graph, URIRef, BNode, Literal
+
+log = logging.getLogger("ofn2mkdocs")
+
+GRAPH_CACHE_DIR = ".graph_cache"
+GRAPH_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Bump when the entry layout changes; entries written by another format or rdflib version are ignored
+CACHE_FORMAT = 2
+
+class RecordingGraph(Graph):
+    """Graph that records the order in which triples are added while parsing.
+
+    rdflib's memory store iterates triples in insertion order, so replaying the same sequence
+    gives a cached graph that iterates exactly like a freshly parsed one."""
+    def __init__(self, record: bool = True, **kwargs):
+        super().__init__(**kwargs)
+        self.added = [] if record else None
+
+    def add(self, triple):
+        if self.added is not None:
+            self.added.append(triple)
+        return super().add(triple)
+
+    def addN(self, quads):
+        quads = list(quads)
+        if self.added is not None:
+            self.added.extend((s, p, o) for s, p, o, _ in quads)
+        return super().addN(quads)
+
+def _recorded_triples(g: Graph):
+    """Triples of g in the order they were added, if recorded, else in the store's order."""
+    return dict.fromkeys(g.added) if getattr(g, "added", None) is not None else g
+
+def _term_key(term, bnode_keys: dict) -> str:
+    if isinstance(term, BNode):
+        return bnode_keys.get(term, "[cycle]")
+    if isinstance(term, Literal):
+        return term.n3()
+    return f"<{term}>"
+
+def blank_node_keys(triples) -> dict:
+    """Return {blank node: hash of its content}, in the order the blank nodes first occur in triples.
+
+    The content of a blank node is its predicates and objects, with blank node objects standing in by
+    their own hashes, so nested restrictions, class expressions and RDF lists are hashed bottom-up.
+    Cycles are cut where they are first entered."""
+    content = {}
+    for s, p, o in triples:
+        if isinstance(s, BNode):
+            content.setdefault(s, []).append((p, o))
+        if isinstance(o, BNode):
+            content.setdefault(o, [])
+    keys = {}
+    for root in content:
+        if root in keys:
+            continue
+        on_path = set()
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                on_path.discard(node)
+                lines = sorted(f"{_term_key(p, keys)} {_term_key(o, keys)}" for p, o in content[node])
+                keys[node] = hashlib.sha256("\n".join(lines).encode('utf-8')).hexdigest()
+                continue
+            if node in keys or node in on_path:
+                continue
+            on_path.add(node)
+            stack.append((node, True))
+            stack.extend((o, False) for _, o in content[node] if isinstance(o, BNode) and o not in keys and o not in on_path)
+    return {node: keys[node] for node in content}
+
+def skolemize_blank_nodes(g: Graph, record: bool = True) -> Graph:
+    """Return g with every blank node relabelled from the hash of its content, so that the same input
+    always gives the same labels (and so the same diagram node ids and member order).
+
+    Blank nodes with the same content are numbered in the order they first occur. g should be a
+    RecordingGraph: the triples are added again in the order they were parsed, since the store only
+    keeps that order per subject. The result records its order if record is set."""
+    triples = list(_recorded_triples(g))
+    keys = blank_node_keys(triples)
+    if not keys:
+        if not record and isinstance(g, RecordingGraph):
+            g.added = None
+        return g
+    labels = {}
+    occurrences = {}
+    for node, key in keys.items():
+        n = occurrences[key] = occurrences.get(key, 0) + 1
+        labels[node] = BNode(f"n{key[:16]}" if n == 1 else f"n{key[:16]}_{n}")
+    skolemized = RecordingGraph(record=record, bind_namespaces="none")
+    for prefix, uri in g.namespaces():
+        skolemized.bind(prefix, uri, override=True, replace=True)
+    skolemized.addN((labels.get(s, s), p, labels.get(o, o), skolemized) for s, p, o in triples)
+    log.debug("Relabelled %d blank nodes by content", len(labels))
+    return skolemized
+
+def _entry_path(cache_dir: str, path: str, fmt: str) -> str:
+    key = hashlib.sha1(f"{os.path.abspath(path)}|{fmt}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{key}.graph")
+
+def _content_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _encode_graph(g: Graph) -> bytes:
+    """Encode triples, in insertion order if recorded, as a table of distinct terms plus an array of term indexes."""
+    index = {}
+    terms = []
+    ids = array('I')
+    for triple in _recorded_triples(g):
+        for term in triple:
+            i = index.get(term)
+            if i is None:
+                i = index[term] = len(terms)
+                if isinstance(term, Literal):
+                    terms.append(('L', str(term), str(term.datatype) if term.datatype else None, term.language))
+                elif isinstance(term, BNode):
+                    terms.append(('B', str(term)))
+                else:
+                    terms.append(('U', str(term)))
+            ids.append(i)
+    namespaces = [(prefix, str(uri)) for prefix, uri in g.namespaces()]
+    return zlib.compress(pickle.dumps((terms, ids.tobytes(), namespaces), protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+def _decode_graph(payload: bytes) -> Graph:
+    terms, id_bytes, namespaces = pickle.loads(zlib.decompress(payload))
+    nodes = []
+    for t in terms:
+        if t[0] == 'U':
+            nodes.append(URIRef(t[1]))
+        elif t[0] == 'B':
+            nodes.append(BNode(t[1]))
+        else:
+            nodes.append(Literal(t[1], datatype=URIRef(t[2]) if t[2] else None, lang=t[3]))
+    ids = array('I')
+    ids.frombytes(id_bytes)
+    g = Graph(bind_namespaces="none")
+    for prefix, uri in namespaces:
+        g.bind(prefix, URIRef(uri), override=True, replace=True)
+    g.addN((nodes[ids[i]], nodes[ids[i + 1]], nodes[ids[i + 2]], g) for i in range(0, len(ids), 3))
+    return g
+
+def load_cached_graph(cache_dir: str, path: str, fmt: str) -> tuple:
+    """Return (graph, extra) for path from the cache, or (None, None) if there is no valid entry.
+
+    An entry is valid if the file's size and mtime are unchanged, or failing that, if its content
+    hash still matches. extra is whatever was stored alongside the graph (e.g. a resolved prefix map)."""
+    if not cache_dir:
+        return None, None
+    entry_path = _entry_path(cache_dir, path, fmt)
+    try:
+        with open(entry_path, 'rb') as f:
+            header = pickle.load(f)
+            st = os.stat(path)
+            if header.get("version") != (CACHE_FORMAT, rdflib.__version__) or header.get("path") != os.path.abspath(path) or header.get("size") != st.st_size:
+                return None, None
+            if header.get("mtime") != st.st_mtime_ns and header.get("sha256") != _content_hash(path):
+                return None, None
+            g = _decode_graph(pickle.load(f))
+        os.utime(entry_path)  # Mark as recently used for eviction
+    except FileNotFoundError:
+        return None, None
+    except Exception as e:
+        log.warning("Ignoring unreadable graph cache entry %s for %s: %s", entry_path, path, str(e))
+        return None, None
+    log.info("Loaded ontology %s from graph cache, %d triples", path, len(g))
+    return g, header.get("extra")
+
+def store_cached_graph(cache_dir: str, path: str, fmt: str, g: Graph, extra=None, max_bytes: int = GRAPH_CACHE_MAX_BYTES):
+    """Store the parsed graph for path, then evict least recently used entries beyond max_bytes."""
+    if not cache_dir:
+        return
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        st = os.stat(path)
+        header = {
+            "version": (CACHE_FORMAT, rdflib.__version__),
+            "path": os.path.abspath(path),
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "sha256": _content_hash(path),
+            "extra": extra
+        }
+        entry_path = _entry_path(cache_dir, path, fmt)
+        tmp_path = f"{entry_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(_encode_graph(g), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, entry_path)
+        log.debug("Stored %s in graph cache %s", path, entry_path)
+        if isinstance(g, RecordingGraph):
+            g.added = None
+        evict_graph_cache(cache_dir, max_bytes)
+    except Exception as e:
+        log.warning("Could not store %s in graph cache: %s", path, str(e))
+
+def evict_graph_cache(cache_dir: str, max_bytes: int = GRAPH_CACHE_MAX_BYTES):
+    """Delete least recently used cache entries until the cache fits in max_bytes."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".graph"):
+            st = os.stat(os.path.join(cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except FileNotFoundError:
+            pass  # Already evicted by another process
+        total -= size
+        log.debug("Evicted %s from graph cache", name)
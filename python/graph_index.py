@@ -0,0 +1,248 @@
+import logging
+import weakref
+from collections import defaultdict
+from rdflib import Graph, RDF, RDFS, OWL, URIRef
+
+log = logging.getLogger("ofn2mkdocs")
+
+# Indexes derived from a graph, built on first use. Graphs must not be modified after an index is built.
+_graph_indexes = weakref.WeakKeyDictionary()
+
+def graph_index(g: Graph, builder):
+    """Return builder(g), computing it only once per graph."""
+    indexes = _graph_indexes.setdefault(g, {})
+    if builder not in indexes:
+        indexes[builder] = builder(g)
+    return indexes[builder]
+
+class SubjectFacts:
+    """The outgoing triples of every subject of a graph, grouped by predicate.
+
+    objects(), value() and predicate_objects() answer like the Graph methods of the same name, in
+    the same order, so the class helpers in utils can read a class and its class expressions from
+    here without a lookup on the graph."""
+    def __init__(self, by_subject: dict):
+        self.by_subject = by_subject
+
+    def objects(self, subject, predicate) -> tuple:
+        return self.by_subject.get(subject, {}).get(predicate, ())
+
+    def value(self, subject, predicate):
+        objects = self.objects(subject, predicate)
+        return objects[0] if objects else None
+
+    def predicate_objects(self, subject):
+        for predicate, objects in self.by_subject.get(subject, {}).items():
+            for o in objects:
+                yield predicate, o
+
+def build_subject_facts(g: Graph) -> SubjectFacts:
+    """Read the triples of each subject with one lookup per subject, keeping the graph's order of
+    predicates and objects (a scan of the whole graph returns them in no particular order)."""
+    by_subject = {}
+    for s in set(g.subjects()):
+        facts = {}
+        for p, o in g.predicate_objects(s):
+            facts.setdefault(p, []).append(o)
+        by_subject[s] = {p: tuple(objects) for p, objects in facts.items()}
+    log.debug("Built subject facts for %d subjects", len(by_subject))
+    return SubjectFacts(by_subject)
+
+def build_used_by_index(g: Graph) -> dict:
+    """Map each restriction target to the restrictions that use it, in a single pass over all restrictions.
+
+    Values are lists of (restriction, property, referencing classes) in graph order, where the
+    referencing classes are the named classes that are rdfs:subClassOf the restriction."""
+    restrictions = graph_index(g, build_restriction_index).by_node
+    referencing = defaultdict(list)
+    for s, o in g.subject_objects(RDFS.subClassOf):
+        if o in restrictions and isinstance(s, URIRef):
+            referencing[o].append(s)
+    index = defaultdict(list)
+    for restr in restrictions.values():
+        if not restr.on_property:
+            continue
+        for target in (restr.all_values_from, restr.some_values_from, restr.has_value):
+            if target is not None:
+                index[target].append((restr.node, restr.on_property, referencing[restr.node]))
+    log.debug("Built used-by index with %d targets", len(index))
+    return index
+
+def _closures(edges: dict) -> tuple:
+    """Transitive closures over edges (node -> ordered targets), using Tarjan's strongly connected components.
+
+    Components are completed in reverse topological order, so each closure is assembled from the
+    already computed closures of its targets. Return ({node: tuple of reachable nodes, excluding
+    the node itself}, [cycles]), where each cycle lists the members of a strongly connected component."""
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    closure = {}
+    cycles = []
+    for root in list(edges):
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(edges.get(root, ())))]
+        while work:
+            node, targets = work[-1]
+            descended = False
+            for t in targets:
+                if t not in index:
+                    index[t] = low[t] = len(index)
+                    stack.append(t)
+                    on_stack.add(t)
+                    work.append((t, iter(edges.get(t, ()))))
+                    descended = True
+                    break
+                if t in on_stack:
+                    low[node] = min(low[node], index[t])
+            if descended:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] != index[node]:
+                continue
+            component = []
+            while True:
+                member = stack.pop()
+                on_stack.discard(member)
+                component.append(member)
+                if member == node:
+                    break
+            component.reverse()
+            members = set(component)
+            if len(component) > 1 or node in edges.get(node, ()):
+                cycles.append(component)
+            reachable = {}
+            for member in component:
+                for t in edges.get(member, ()):
+                    reachable[t] = None
+                    if t not in members:
+                        reachable.update(dict.fromkeys(closure[t]))
+            for member in component:
+                closure[member] = tuple(t for t in reachable if t != member)
+    return closure, cycles
+
+class ClassHierarchy:
+    """Cached superclass and subclass closures of the named classes in a graph.
+
+    superclasses follows rdfs:subClassOf upwards to named owl:Class superclasses other than owl:Thing;
+    subclasses follows it downwards to every named subclass, nearest first. cycles lists the
+    classes of every rdfs:subClassOf cycle found while building the closures."""
+    def __init__(self, superclasses: dict, subclasses: dict, cycles: list):
+        self.superclasses = superclasses
+        self.subclasses = subclasses
+        self.cycles = cycles
+
+def build_class_hierarchy(g: Graph) -> ClassHierarchy:
+    """Build both closures of rdfs:subClassOf in one pass over the subClassOf triples."""
+    up = defaultdict(list)
+    down = defaultdict(list)
+    is_class = {}
+    for s, o in g.subject_objects(RDFS.subClassOf):
+        if not isinstance(s, URIRef):
+            continue
+        if s != o:
+            down[o].append(s)
+        if isinstance(o, URIRef) and o != OWL.Thing:
+            if o not in is_class:
+                is_class[o] = (o, RDF.type, OWL.Class) in g
+            if is_class[o]:
+                up[s].append(o)
+    superclasses, up_cycles = _closures(up)
+    subclasses, down_cycles = _closures(down)
+    cycles = []
+    seen = set()
+    for cycle in up_cycles + [list(reversed(c)) for c in down_cycles]:
+        key = frozenset(cycle)
+        if key not in seen:
+            seen.add(key)
+            cycles.append(cycle)
+    log.debug("Built class hierarchy with %d classes and %d cycles", len(superclasses), len(cycles))
+    return ClassHierarchy(superclasses, subclasses, cycles)
+
+# Restriction predicates and the Restriction fields they fill
+RESTRICTION_FIELDS = {
+    OWL.onProperty: "on_property",
+    OWL.onClass: "on_class",
+    OWL.onDataRange: "on_data_range",
+    OWL.allValuesFrom: "all_values_from",
+    OWL.someValuesFrom: "some_values_from",
+    OWL.hasValue: "has_value",
+    OWL.cardinality: "cardinality",
+    OWL.minCardinality: "min_cardinality",
+    OWL.maxCardinality: "max_cardinality",
+    OWL.qualifiedCardinality: "qualified_cardinality",
+    OWL.minQualifiedCardinality: "min_qualified_cardinality",
+    OWL.maxQualifiedCardinality: "max_qualified_cardinality",
+}
+
+class Restriction:
+    """Immutable record of one owl:Restriction node. Each field holds the value g.value() would return, or None."""
+    __slots__ = ("node",) + tuple(RESTRICTION_FIELDS.values())
+
+    def __init__(self, node, values: dict):
+        object.__setattr__(self, "node", node)
+        for name in RESTRICTION_FIELDS.values():
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Restriction records are immutable")
+
+    def __repr__(self):
+        return f"Restriction({self.node}, on_property={self.on_property})"
+
+class RestrictionIndex:
+    """All restrictions of a graph: by_node maps each restriction node to its record, and by_class
+    maps each class to the records of the restrictions it is rdfs:subClassOf, in graph order."""
+    def __init__(self, by_node: dict, by_class: dict):
+        self.by_node = by_node
+        self.by_class = by_class
+
+def build_restriction_index(g: Graph) -> RestrictionIndex:
+    """Read every owl:Restriction with a single pass over its triples."""
+    by_node = {}
+    for restr in g.subjects(RDF.type, OWL.Restriction):
+        if restr in by_node:
+            continue
+        values = {}
+        for p, o in g.predicate_objects(restr):
+            name = RESTRICTION_FIELDS.get(p)
+            if name and name not in values:
+                values[name] = o
+        by_node[restr] = Restriction(restr, values)
+    by_class = {}
+    for cls in dict.fromkeys(g.subjects(RDFS.subClassOf)):
+        records = tuple(by_node[o] for o in g.objects(cls, RDFS.subClassOf) if o in by_node)
+        if records:
+            by_class[cls] = records
+    log.debug("Built restriction index with %d restrictions on %d classes", len(by_node), len(by_class))
+    return RestrictionIndex(by_node, by_class)
+
+def restriction_signature(restriction: Restriction) -> tuple:
+    """The parts of a restriction compared when deciding whether a subclass refines it."""
+    card = restriction.qualified_cardinality or restriction.min_qualified_cardinality or restriction.max_qualified_cardinality
+    return restriction.all_values_from, card, restriction.on_class
+
+def build_inherited_restrictions(g: Graph) -> dict:
+    """Map each class to {property: set of signatures of the restrictions it inherits on that property}.
+
+    Inherited restrictions are those of all named superclasses, as given by build_class_hierarchy."""
+    hierarchy = graph_index(g, build_class_hierarchy)
+    by_class = graph_index(g, build_restriction_index).by_class
+    inherited = {}
+    for cls, supers in hierarchy.superclasses.items():
+        props = defaultdict(set)
+        for super_cls in supers:
+            for restriction in by_class.get(super_cls, ()):
+                props[restriction.on_property].add(restriction_signature(restriction))
+        if props:
+            inherited[cls] = dict(props)
+    log.debug("Built inherited restriction map for %d classes", len(inherited))
+    return inherited
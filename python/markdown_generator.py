@@ -5,7 +5,9 @@ import re
 from collections import defaultdict
 from rdflib import Graph, XSD, Literal, URIRef, OWL, RDFS, RDF
 from rdflib.namespace import DCTERMS, SKOS
-from utils import get_qname, get_first_literal, hyperlink_class, insert_spaces, class_restrictions, iter_annotations, DESC_PROPS, get_ontology_for_uri
+from utils import get_qname, get_first_literal, hyperlink_class, insert_spaces, DESC_PROPS
+from class_model import ClassModel, extract_class_model
+from stage_timer import stage, timed
 
 log = logging.getLogger("owl2mkdocs")
 
@@ -19,63 +21,14 @@ yaml.SafeLoader.add_constructor('tag:yaml.org,2002:python/name:material.extensio
 yaml.SafeLoader.add_constructor('tag:yaml.org,2002:python/name:pymdownx.superfences.fence_code_format', SafeMkDocsLoader.ignore_python_name)
 yaml.SafeLoader.add_constructor('tag:yaml.org,2002:python/name:material.extensions.emoji.to_svg', SafeMkDocsLoader.ignore_python_name)
 
-def get_specializations(g: Graph, cls: URIRef, global_all_classes: set, ns: str, prefix_map: dict, ns_to_ontology: dict) -> list:
-    """Find all subclasses (direct and indirect) of the given class."""
-    specializations = []
-    visited = set()
-    def collect_subclasses(c):
-        if c in visited:
-            return
-        visited.add(c)
-        for s in g.subjects(RDFS.subClassOf, c):
-            if isinstance(s, URIRef) and s != c:
-                cls_name = get_first_literal(g, s, [RDFS.label]) or str(s).split('/')[-1].split('#')[-1]
-                ont = get_ontology_for_uri(str(s), ns_to_ontology)
-                if cls_name in global_all_classes and ont:
-                    desc = get_first_literal(g, s, [DCTERMS.description]) or ""
-                    specializations.append((cls_name, desc, ont))
-                collect_subclasses(s)
-    collect_subclasses(cls)
-    log.debug(f"Specializations for {cls}: {specializations}")
-    return sorted(specializations, key=lambda x: x[0].lower())
-
-def get_used_by(g: Graph, cls: URIRef, global_all_classes: set, ns: str, prefix_map: dict, ns_to_ontology: dict) -> list:
-    """Find classes and their properties that reference this class via object property restrictions."""
-    used_by = []
-    for s in g.subjects(RDF.type, OWL.Restriction):
-        prop = g.value(s, OWL.onProperty)
-        for predicate in [OWL.allValuesFrom, OWL.someValuesFrom, OWL.hasValue]:
-            target = g.value(s, predicate)
-            if target == cls and prop:
-                prop_name = get_qname(g, prop, ns, prefix_map)
-                for cls_sub in g.subjects(RDFS.subClassOf, s):
-                    if isinstance(cls_sub, URIRef):
-                        cls_name = get_first_literal(g, cls_sub, [RDFS.label]) or str(cls_sub).split('/')[-1].split('#')[-1]
-                        ont = get_ontology_for_uri(str(cls_sub), ns_to_ontology)
-                        if cls_name in global_all_classes and ont:
-                            used_by.append((cls_name, prop_name, ont))
-                cls_name = get_first_literal(g, s, [RDFS.label]) or str(s).split('/')[-1].split('#')[-1]
-                ont = get_ontology_for_uri(str(s), ns_to_ontology)
-                if cls_name in global_all_classes and ont:
-                    used_by.append((cls_name, prop_name, ont))
-    log.debug(f"Used by for {cls}: {used_by}")
-    return sorted(used_by, key=lambda x: x[0].lower())
+def render_class_markdown(model: ClassModel, ontology_name: str, global_patterns: dict, class_to_onts: dict) -> str:
+    """Return the Markdown page of a class, including all superclasses and disjoint statements in Formalization."""
+    cls_name = model.name
+    top_desc = f"{model.description}\n\n" if model.description else ""
 
-def generate_markdown(g: Graph, cls: URIRef, cls_name: str, global_patterns: dict, global_all_classes: set, ns: str, file_path: str, errors: list, prefix_map: dict, prop_map: dict, ontology_name: str, ns_to_ontology: dict, class_to_onts: dict):
-    """Generate Markdown file for a class, including all superclasses and disjoint statements in Formalization."""
-    classes_dir = os.path.join(os.path.dirname(file_path), "classes")
-    filename = os.path.join(classes_dir, f"{ontology_name}__{cls_name}.md")
-    
-    log.debug(f"Writing {filename} for class {cls_name} ({cls})")
-    
-    # Check if this is a pattern class
-    is_pattern = cls_name in global_patterns
-
-    if is_pattern:
+    if model.is_pattern:
         # Pattern class Markdown
         title = f"# {insert_spaces(cls_name)}\n\n"
-        desc = get_first_literal(g, cls, [DCTERMS.description]) or ""
-        top_desc = f"{desc}\n\n" if desc else ""
         members_md = "It consists of the following classes:\n\n"
         member_tuples = global_patterns[cls_name]["classes"]
         for mem_cls, mem_ont in sorted(member_tuples, key=lambda x: x[0].lower()):
@@ -85,88 +38,78 @@ def generate_markdown(g: Graph, cls: URIRef, cls_name: str, global_patterns: dic
             if len(class_to_onts[mem_cls]) > 1:
                 display_mem += f" ({mem_ont})"
             members_md += f"- [{display_mem}]({mem_ont}__{mem_cls}.md)\n"
-        content = title + top_desc + members_md
+        return title + top_desc + members_md
+
+    # Non-pattern class Markdown
+    title = f"# {cls_name}\n\n"
+    note_md = f"NOTE: {model.note}\n\n" if model.note else ""
+    example_md = f"EXAMPLE: {model.example}\n\n" if model.example else ""
+    diagram_line = f"![{cls_name} Diagram](../diagrams/{ontology_name}__{cls_name}.dot.svg)\n\n<a href=\"../../diagrams/{ontology_name}__{cls_name}.dot.svg\">Open interactive {cls_name} diagram</a>\n\n"
+
+    # Specializations section
+    specializations_md = ""
+    if model.specializations:
+        specializations_md += f"## Specializations of {cls_name}\n\n"
+        specializations_md += "| Class | Description |\n"
+        specializations_md += "|-------|-------------|\n"
+        for spec_cls, spec_desc, spec_ont in model.specializations:
+            display_spec = insert_spaces(spec_cls)
+            if len(class_to_onts[spec_cls]) > 1:
+                display_spec += f" ({spec_ont})"
+            link = f"{spec_ont}__{spec_cls}.md"
+            specializations_md += f"| [{display_spec}]({link}) | {spec_desc} |\n"
+        specializations_md += "\n"
     else:
-        # Non-pattern class Markdown
-        title = f"# {cls_name}\n\n"
-        desc = get_first_literal(g, cls, [DCTERMS.description]) or ""
-        top_desc = f"{desc}\n\n" if desc else ""
-        note = get_first_literal(g, cls, [SKOS.note]) or ""
-        note_md = f"NOTE: {note}\n\n" if note else ""
-        example = get_first_literal(g, cls, [SKOS.example]) or ""
-        example_md = f"EXAMPLE: {example}\n\n" if example else ""
-        diagram_line = f"![{cls_name} Diagram](../diagrams/{ontology_name}__{cls_name}.dot.svg)\n\n<a href=\"../../diagrams/{ontology_name}__{cls_name}.dot.svg\">Open interactive {cls_name} diagram</a>\n\n"
-        
-        # Specializations section
-        specializations = get_specializations(g, cls, global_all_classes, ns, prefix_map, ns_to_ontology)
-        specializations_md = ""
-        if specializations:
-            specializations_md += f"## Specializations of {cls_name}\n\n"
-            specializations_md += "| Class | Description |\n"
-            specializations_md += "|-------|-------------|\n"
-            for spec_cls, spec_desc, spec_ont in specializations:
-                display_spec = insert_spaces(spec_cls)
-                if len(class_to_onts[spec_cls]) > 1:
-                    display_spec += f" ({spec_ont})"
-                link = f"{spec_ont}__{spec_cls}.md"
-                specializations_md += f"| [{display_spec}]({link}) | {spec_desc} |\n"
-            specializations_md += "\n"
-        else:
-            log.debug(f"No specializations found for {cls_name}")
-        
-        # Formalization section with superclasses and disjoints
-        restr_rows = class_restrictions(g, cls, ns, prefix_map)
-        # Collect direct superclasses
-        superclasses = []
-        for super_cls in g.objects(cls, RDFS.subClassOf):
-            if isinstance(super_cls, URIRef) and super_cls != OWL.Thing:
-                super_name = get_qname(g, super_cls, ns, prefix_map)
-                superclasses.append(("subClassOf", super_name))
-        # Collect disjoint classes
-        disjoints = []
-        for disjoint_cls in g.objects(cls, OWL.disjointWith):
-            if isinstance(disjoint_cls, URIRef):
-                disjoint_name = get_qname(g, disjoint_cls, ns, prefix_map)
-                disjoints.append(("disjointWith", disjoint_name))
-        # Combine with restrictions from class_restrictions
-        formalization_rows = sorted(restr_rows + superclasses + disjoints, key=lambda x: x[0].lower())
-        formalization_md = ""
-        if formalization_rows:
-            formalization_md += f"## Formalization for {cls_name}\n\n"
-            formalization_md += "| Property | Constraint |\n"
-            formalization_md += "|----------|------------|\n"
-            for prop, constr in formalization_rows:
-                log.debug(f"Restriction for {cls_name}: ({prop}, '{constr}')")
-                formalization_md += f"| {prop} | {constr} |\n"
-            formalization_md += "\n"
-        
-        # Used by section
-        used_by = get_used_by(g, cls, global_all_classes, ns, prefix_map, ns_to_ontology)
-        used_by_md = ""
-        if used_by:
-            used_by_md += f"## Used by classes\n\n"
-            used_by_md += "| Class | Property |\n"
-            used_by_md += "|-------|----------|\n"
-            for used_cls, used_prop, used_ont in used_by:
-                display_used = insert_spaces(used_cls)
-                if len(class_to_onts[used_cls]) > 1:
-                    display_used += f" ({used_ont})"
-                link = f"{used_ont}__{used_cls}.md"
-                used_by_md += f"| [{display_used}]({link}) | {used_prop} |\n"
-            used_by_md += "\n"
-        
-        # Other annotations
-        other_annot_md = ""
-        annotations = list(iter_annotations(g, cls, ns, prefix_map))
-        if annotations:
-            other_annot_md += "## Other annotations\n\n"
-            other_annot_md += "| Annotation | Value |\n"
-            other_annot_md += "|------------|-------|\n"
-            for pred, val in sorted(annotations):
-                other_annot_md += f"| {pred} | {val} |\n"
-            other_annot_md += "\n"
-        
-        content = title + top_desc + note_md + example_md + diagram_line + specializations_md + formalization_md + used_by_md + other_annot_md
+        log.debug(f"No specializations found for {cls_name}")
+
+    # Formalization section with restrictions, superclasses and disjoints
+    formalization_md = ""
+    if model.formalization:
+        formalization_md += f"## Formalization for {cls_name}\n\n"
+        formalization_md += "| Property | Constraint |\n"
+        formalization_md += "|----------|------------|\n"
+        for prop, constr in model.formalization:
+            log.debug(f"Restriction for {cls_name}: ({prop}, '{constr}')")
+            formalization_md += f"| {prop} | {constr} |\n"
+        formalization_md += "\n"
+
+    # Used by section
+    used_by_md = ""
+    if model.used_by:
+        used_by_md += f"## Used by classes\n\n"
+        used_by_md += "| Class | Property |\n"
+        used_by_md += "|-------|----------|\n"
+        for used_cls, used_prop, used_ont in model.used_by:
+            display_used = insert_spaces(used_cls)
+            if len(class_to_onts[used_cls]) > 1:
+                display_used += f" ({used_ont})"
+            link = f"{used_ont}__{used_cls}.md"
+            used_by_md += f"| [{display_used}]({link}) | {used_prop} |\n"
+        used_by_md += "\n"
+
+    # Other annotations
+    other_annot_md = ""
+    if model.annotations:
+        other_annot_md += "## Other annotations\n\n"
+        other_annot_md += "| Annotation | Value |\n"
+        other_annot_md += "|------------|-------|\n"
+        for pred, val in sorted(model.annotations):
+            other_annot_md += f"| {pred} | {val} |\n"
+        other_annot_md += "\n"
+
+    return title + top_desc + note_md + example_md + diagram_line + specializations_md + formalization_md + used_by_md + other_annot_md
+
+def generate_markdown(g: Graph, cls: URIRef, cls_name: str, global_patterns: dict, global_all_classes: set, ns: str, file_path: str, errors: list, prefix_map: dict, prop_map: dict, ontology_name: str, ns_to_ontology: dict, class_to_onts: dict, model: ClassModel = None):
+    """Generate Markdown file for a class; model is the class's ClassModel if it has already been extracted."""
+    classes_dir = os.path.join(os.path.dirname(file_path), "classes")
+    filename = os.path.join(classes_dir, f"{ontology_name}__{cls_name}.md")
+    
+    log.debug(f"Writing {filename} for class {cls_name} ({cls})")
+
+    if model is None:
+        model = extract_class_model(g, cls, cls_name, ns, prefix_map, global_all_classes, ns_to_ontology, global_patterns)
+    with stage("markdown"):
+        content = render_class_markdown(model, ontology_name, global_patterns, class_to_onts)
 
     # Write Markdown file
     try:
@@ -180,6 +123,7 @@ def generate_markdown(g: Graph, cls: URIRef, cls_name: str, global_patterns: dic
         log.error(error_msg)
         raise
 
+@timed("nav")
 def update_mkdocs_nav(mkdocs_path: str, global_patterns: dict, global_all_classes: set, errors: list, class_to_onts: dict, ontology_info: dict, input_files: list):
     """Update mkdocs.yml navigation with file > pattern > class or file > class structure."""
     try:
@@ -284,6 +228,7 @@ def update_mkdocs_nav(mkdocs_path: str, global_patterns: dict, global_all_classe
         log.error(error_msg)
         raise
 
+@timed("index")
 def generate_index(docs_dir: str, input_files: list, ontology_info: dict, global_patterns: dict, errors: list, class_to_onts: dict):
     """Generate index.md file."""
     index_path = os.path.join(docs_dir, "index.md")
@@ -0,0 +1,88 @@
+import os
+import gc
+import json
+import types
+import logging
+import linecache
+import weakref
+import tracemalloc
+
+log = logging.getLogger("ofn2mkdocs")
+
+MEMORY_JSON = "build_memory.json"
+# Frames kept per traced allocation, and allocation sites listed for each released ontology
+MEMORY_TRACE_FRAMES = 8
+MEMORY_TOP_SITES = 10
+
+# Accounting state of this process, set by start_memory_accounting(); None when --memory is not given
+_accounting = None
+
+def start_memory_accounting(frames: int = MEMORY_TRACE_FRAMES):
+    """Trace allocations with tracemalloc from now on. Only this process is traced, not --jobs workers."""
+    global _accounting
+    tracemalloc.start(frames)
+    _accounting = {"checkpoints": [], "leaks": [], "tracked": [], "snapshot": tracemalloc.take_snapshot()}
+
+def memory_checkpoint(point: str, source: str, *objects):
+    """Record the memory retained now and the peak since the previous checkpoint, after stage point of source.
+
+    objects (e.g. the ontology graph) are expected to be freed by the time memory_released(source) is called."""
+    if _accounting is None:
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    _accounting["checkpoints"].append({"source": source, "point": point, "retained_bytes": current, "peak_bytes": peak})
+    log.info("Memory after %s of %s: %.1f MiB retained, %.1f MiB peak", point, source, current / 2**20, peak / 2**20)
+    for obj in objects:
+        _accounting["tracked"].append((source, point, type(obj).__name__, weakref.ref(obj)))
+
+def _describe_referrer(referrer) -> str:
+    if isinstance(referrer, types.FrameType):
+        return f"frame {referrer.f_code.co_name} ({os.path.basename(referrer.f_code.co_filename)}:{referrer.f_lineno})"
+    if isinstance(referrer, dict) and "__name__" in referrer and "__builtins__" in referrer:
+        return f"globals of module {referrer['__name__']}"
+    if isinstance(referrer, dict):
+        return f"dict with keys {sorted(map(str, referrer))[:5]}"
+    return type(referrer).__name__
+
+def memory_released(source: str):
+    """Record the memory retained once source has been released, and flag the objects registered for it
+    that are still reachable, with what refers to them and where the retained memory was allocated."""
+    if _accounting is None:
+        return
+    gc.collect()
+    memory_checkpoint("release", source)
+    # Leave out what tracemalloc and formatting its tracebacks allocate
+    snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, linecache.__file__)])
+    growth = [stat for stat in snapshot.compare_to(_accounting["snapshot"], "traceback") if stat.size_diff > 0][:MEMORY_TOP_SITES]
+    _accounting["snapshot"] = snapshot
+    _accounting["checkpoints"][-1]["retained_sites"] = [{"size_bytes": stat.size_diff, "count": stat.count_diff, "traceback": stat.traceback.format()} for stat in growth]
+
+    still_tracked = []
+    for tracked_source, point, type_name, ref in _accounting["tracked"]:
+        if tracked_source != source:
+            still_tracked.append((tracked_source, point, type_name, ref))
+            continue
+        obj = ref()
+        if obj is None:
+            continue
+        referrers = [_describe_referrer(r) for r in gc.get_referrers(obj) if not (isinstance(r, types.FrameType) and r.f_code is memory_released.__code__)]
+        del obj
+        leak = {"source": source, "object": type_name, "registered_at": point, "referrers": referrers}
+        _accounting["leaks"].append(leak)
+        log.warning("%s from %s of %s is still reachable after release, from: %s", type_name, point, source, "; ".join(referrers) or "unknown")
+    _accounting["tracked"] = still_tracked
+
+def write_memory_report(root_dir: str):
+    """Write the checkpoints and the objects that outlived their ontology to build_memory.json in root_dir."""
+    if _accounting is None:
+        return
+    _, peak = tracemalloc.get_traced_memory()
+    report = {
+        "peak_bytes": max([peak] + [c["peak_bytes"] for c in _accounting["checkpoints"]]),
+        "checkpoints": _accounting["checkpoints"],
+        "leaks": _accounting["leaks"]
+    }
+    with open(os.path.join(root_dir, MEMORY_JSON), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    log.info("Peak traced memory %.1f MiB; %d objects outlived their ontology; wrote %s", report["peak_bytes"] / 2**20, len(report["leaks"]), os.path.join(root_dir, MEMORY_JSON))
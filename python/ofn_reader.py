@@ -0,0 +1,471 @@
+import re
+import logging
+from rdflib import Graph, RDF, RDFS, OWL, XSD, URIRef, BNode, Literal
+from rdflib.collection import Collection
+
+log = logging.getLogger("ofn2mkdocs")
+
+# Characters read from the file at a time
+OFN_READ_SIZE = 1 << 20
+
+# Prefixes predefined in every document, in the order funowl lists them
+STANDARD_PREFIXES = (("owl", str(OWL)), ("rdf", str(RDF)), ("rdfs", str(RDFS)), ("xsd", str(XSD)), ("xml", "http://www.w3.org/XML/1998/namespace"))
+BUILTIN_NAMESPACES = (str(XSD), str(RDF), str(RDFS), str(OWL))
+
+# Entity kinds of Declaration(...) and the rdf:type they stand for
+DECLARATION_TYPES = {
+    "Class": OWL.Class,
+    "Datatype": RDFS.Datatype,
+    "ObjectProperty": OWL.ObjectProperty,
+    "DataProperty": OWL.DatatypeProperty,
+    "AnnotationProperty": OWL.AnnotationProperty,
+    "NamedIndividual": OWL.NamedIndividual
+}
+# Object property characteristics, stated as rdf:type of the property
+PROPERTY_CHARACTERISTICS = {
+    "FunctionalObjectProperty": OWL.FunctionalProperty,
+    "InverseFunctionalObjectProperty": OWL.InverseFunctionalProperty,
+    "ReflexiveObjectProperty": OWL.ReflexiveProperty,
+    "IrreflexiveObjectProperty": OWL.IrreflexiveProperty,
+    "SymmetricObjectProperty": OWL.SymmetricProperty,
+    "AsymmetricObjectProperty": OWL.AsymmetricProperty,
+    "TransitiveObjectProperty": OWL.TransitiveProperty
+}
+CARDINALITY_PREDICATES = {
+    "Min": (OWL.minCardinality, OWL.minQualifiedCardinality),
+    "Max": (OWL.maxCardinality, OWL.maxQualifiedCardinality),
+    "Exact": (OWL.cardinality, OWL.qualifiedCardinality)
+}
+
+# Whitespace and comments are matched but not reported
+_TOKEN = re.compile(r'\s+|#[^\n]*|(<[^>]*>)|("(?:[^"\\]|\\.)*")|(\^\^)|(@[A-Za-z][A-Za-z0-9-]*)|([()=])|([^\s()<>"=^@#][^\s()<>"=^#]*)')
+_TOKEN_KINDS = (None, "iri", "string", "^^", "lang", "punct", "name")
+
+class OFNSyntaxError(ValueError):
+    pass
+
+class OFNUnsupportedError(ValueError):
+    """Raised for constructs the reader does not translate, e.g. SWRL rules."""
+    pass
+
+def tokenize(f, read_size: int = OFN_READ_SIZE):
+    """Yield (kind, text) tokens from a text file, reading it read_size characters at a time."""
+    buf = f.read(read_size)
+    pos = 0
+    eof = not buf
+    while True:
+        m = _TOKEN.match(buf, pos)
+        # A token that reaches the end of the buffer may continue in the next chunk
+        if not eof and (m is None or m.end() == len(buf)):
+            chunk = f.read(read_size)
+            buf = buf[pos:] + chunk
+            pos = 0
+            eof = not chunk
+            continue
+        if m is None:
+            if pos < len(buf):
+                raise OFNSyntaxError(f"Unexpected input: {buf[pos:pos + 40]!r}")
+            return
+        pos = m.end()
+        if m.lastindex:
+            yield _TOKEN_KINDS[m.lastindex], m.group(m.lastindex)
+
+def _unescape(text: str) -> str:
+    return re.sub(r'\\(["\\])', r'\1', text[1:-1])
+
+class OFNReader:
+    """Streaming reader for OWL 2 Functional Syntax.
+
+    Axioms are parsed one at a time and translated straight to RDF with the OWL 2 RDF mapping, so
+    the document is never held in memory as a whole. Like funowl, every entity is typed
+    (e.g. "X rdf:type owl:Class") where it is used, unless both the entity and its type are
+    built-in. prefixes lists the (name, IRI) prefix declarations in document order and
+    ontology_iri the ontology IRI; both are set as soon as they have been read."""
+    def __init__(self, path: str):
+        self.path = path
+        self.prefixes = []
+        self.ontology_iri = None
+        self._prefix_map = dict(STANDARD_PREFIXES)
+        self._bnodes = {}
+        self._tokens = None
+        self._peeked = None
+        self.g = None
+
+    # -------------------- tokens and expressions --------------------
+    def _next(self):
+        if self._peeked is not None:
+            token, self._peeked = self._peeked, None
+            return token
+        return next(self._tokens, (None, None))
+
+    def _peek(self):
+        if self._peeked is None:
+            self._peeked = next(self._tokens, (None, None))
+        return self._peeked
+
+    def _expect(self, text: str):
+        kind, value = self._next()
+        if (kind, value) != ("punct", text):
+            raise OFNSyntaxError(f"Expected '{text}', found {value!r}")
+
+    def _resolve(self, name: str):
+        if name.startswith("_:"):
+            return self._bnodes.setdefault(name, BNode())
+        if ':' in name:
+            prefix, local = name.split(':', 1)
+            if prefix not in self._prefix_map:
+                raise OFNSyntaxError(f"Undeclared prefix in {name}")
+            return URIRef(self._prefix_map[prefix] + local)
+        return name
+
+    def _expression(self):
+        """Read one term or nested form; forms are returned as [head, *arguments]."""
+        kind, value = self._next()
+        if kind == "iri":
+            return URIRef(value[1:-1])
+        if kind == "string":
+            text = _unescape(value)
+            next_kind, next_value = self._peek()
+            if next_kind == "lang":
+                self._next()
+                return Literal(text, lang=next_value[1:])
+            if next_kind == "^^":
+                self._next()
+                datatype = self._expression()
+                return Literal(text, datatype=datatype)
+            return Literal(text)
+        if kind == "name":
+            # Keywords never contain ':', abbreviated IRIs always do
+            if ':' not in value and self._peek() == ("punct", "("):
+                self._next()
+                return [value] + self._arguments()
+            return self._resolve(value)
+        if value == "(":
+            # Unnamed group, e.g. the property lists of HasKey
+            return [None] + self._arguments()
+        raise OFNSyntaxError(f"Unexpected token {value!r}")
+
+    def _arguments(self) -> list:
+        args = []
+        while self._peek() != ("punct", ")"):
+            if self._peek() == (None, None):
+                raise OFNSyntaxError("Unexpected end of file")
+            args.append(self._expression())
+        self._next()
+        return args
+
+    # -------------------- RDF mapping --------------------
+    def _add(self, s, p, o):
+        self.g.add((s, p, o))
+
+    def _entity(self, term, rdf_type, declared: bool = False):
+        if not isinstance(term, URIRef):
+            raise OFNSyntaxError(f"Expected an IRI, found {term!r}")
+        if declared or not (str(term).startswith(BUILTIN_NAMESPACES) and str(rdf_type).startswith(BUILTIN_NAMESPACES)):
+            self._add(term, RDF.type, rdf_type)
+        return term
+
+    def _seq(self, nodes: list):
+        if not nodes:
+            return RDF.nil
+        head = BNode()
+        Collection(self.g, head, nodes)
+        return head
+
+    def _individual(self, term):
+        return term if isinstance(term, BNode) else self._entity(term, OWL.NamedIndividual)
+
+    def _object_property(self, expr):
+        if isinstance(expr, list):
+            if expr[0] != "ObjectInverseOf":
+                raise OFNUnsupportedError(f"Unsupported object property expression {expr[0]}")
+            x = BNode()
+            self._add(x, OWL.inverseOf, self._entity(expr[1], OWL.ObjectProperty))
+            return x
+        return self._entity(expr, OWL.ObjectProperty)
+
+    def _data_property(self, expr):
+        return self._entity(expr, OWL.DatatypeProperty)
+
+    def _data_range(self, expr):
+        if not isinstance(expr, list):
+            return self._entity(expr, RDFS.Datatype)
+        head, args = expr[0], expr[1:]
+        x = BNode()
+        self._add(x, RDF.type, RDFS.Datatype)
+        if head in ("DataIntersectionOf", "DataUnionOf"):
+            predicate = OWL.intersectionOf if head == "DataIntersectionOf" else OWL.unionOf
+            self._add(x, predicate, self._seq([self._data_range(a) for a in args]))
+        elif head == "DataComplementOf":
+            self._add(x, OWL.datatypeComplementOf, self._data_range(args[0]))
+        elif head == "DataOneOf":
+            self._add(x, OWL.oneOf, self._seq(args))
+        elif head == "DatatypeRestriction":
+            self._add(x, OWL.onDatatype, self._entity(args[0], RDFS.Datatype))
+            facets = []
+            for facet, value in zip(args[1::2], args[2::2]):
+                y = BNode()
+                self._add(y, facet, value)
+                facets.append(y)
+            self._add(x, OWL.withRestrictions, self._seq(facets))
+        else:
+            raise OFNUnsupportedError(f"Unsupported data range {head}")
+        return x
+
+    def _restriction(self, on_property) -> BNode:
+        x = BNode()
+        self._add(x, RDF.type, OWL.Restriction)
+        self._add(x, OWL.onProperty, on_property)
+        return x
+
+    def _class(self, expr):
+        if not isinstance(expr, list):
+            return self._entity(expr, OWL.Class)
+        head, args = expr[0], expr[1:]
+        if head in ("ObjectIntersectionOf", "ObjectUnionOf", "ObjectComplementOf", "ObjectOneOf"):
+            x = BNode()
+            self._add(x, RDF.type, OWL.Class)
+            if head == "ObjectComplementOf":
+                self._add(x, OWL.complementOf, self._class(args[0]))
+            elif head == "ObjectOneOf":
+                self._add(x, OWL.oneOf, self._seq([self._individual(a) for a in args]))
+            else:
+                predicate = OWL.intersectionOf if head == "ObjectIntersectionOf" else OWL.unionOf
+                self._add(x, predicate, self._seq([self._class(a) for a in args]))
+            return x
+        if head in ("ObjectSomeValuesFrom", "ObjectAllValuesFrom"):
+            x = self._restriction(self._object_property(args[0]))
+            self._add(x, OWL.someValuesFrom if head == "ObjectSomeValuesFrom" else OWL.allValuesFrom, self._class(args[1]))
+            return x
+        if head == "ObjectHasValue":
+            x = self._restriction(self._object_property(args[0]))
+            self._add(x, OWL.hasValue, self._individual(args[1]))
+            return x
+        if head == "ObjectHasSelf":
+            x = self._restriction(self._object_property(args[0]))
+            self._add(x, OWL.hasSelf, Literal(True))
+            return x
+        if head in ("DataSomeValuesFrom", "DataAllValuesFrom"):
+            predicate = OWL.someValuesFrom if head == "DataSomeValuesFrom" else OWL.allValuesFrom
+            properties = [self._data_property(a) for a in args[:-1]]
+            if len(properties) == 1:
+                x = self._restriction(properties[0])
+            else:
+                x = BNode()
+                self._add(x, RDF.type, OWL.Restriction)
+                self._add(x, OWL.onProperties, self._seq(properties))
+            self._add(x, predicate, self._data_range(args[-1]))
+            return x
+        if head == "DataHasValue":
+            x = self._restriction(self._data_property(args[0]))
+            self._add(x, OWL.hasValue, args[1])
+            return x
+        for kind in ("Object", "Data"):
+            for bound, (plain, qualified) in CARDINALITY_PREDICATES.items():
+                if head == f"{kind}{bound}Cardinality":
+                    prop = self._object_property(args[1]) if kind == "Object" else self._data_property(args[1])
+                    x = self._restriction(prop)
+                    cardinality = Literal(str(args[0]), datatype=XSD.nonNegativeInteger)
+                    if len(args) > 2:
+                        self._add(x, qualified, cardinality)
+                        if kind == "Object":
+                            self._add(x, OWL.onClass, self._class(args[2]))
+                        else:
+                            self._add(x, OWL.onDataRange, self._data_range(args[2]))
+                    else:
+                        self._add(x, plain, cardinality)
+                    return x
+        raise OFNUnsupportedError(f"Unsupported class expression {head}")
+
+    def _split_annotations(self, args: list) -> tuple:
+        annotations = []
+        while args and isinstance(args[0], list) and args[0][0] == "Annotation":
+            annotations.append(args[0])
+            args = args[1:]
+        return annotations, args
+
+    def _annotate(self, subject, annotations: list):
+        """Attach annotations to subject, reifying each annotation that is annotated itself."""
+        for annotation in annotations:
+            nested, (prop, value) = self._split_annotations(annotation[1:])
+            triple = (subject, self._entity(prop, OWL.AnnotationProperty), value)
+            self._add(*triple)
+            self._reify(triple, nested, OWL.Annotation)
+
+    def _reify(self, triple: tuple, annotations: list, annotation_type=OWL.Axiom):
+        if annotations:
+            x = BNode()
+            self._add(x, RDF.type, annotation_type)
+            self._add(x, OWL.annotatedSource, triple[0])
+            self._add(x, OWL.annotatedProperty, triple[1])
+            self._add(x, OWL.annotatedTarget, triple[2])
+            self._annotate(x, annotations)
+
+    def _axiom_triple(self, s, p, o, annotations: list):
+        self._add(s, p, o)
+        self._reify((s, p, o), annotations)
+
+    def _pairwise(self, nodes: list, predicate, annotations: list):
+        for first, second in zip(nodes[:-1], nodes[1:]):
+            self._axiom_triple(first, predicate, second, annotations)
+
+    def _all_members(self, nodes: list, rdf_type, members_predicate, annotations: list):
+        x = BNode()
+        self._add(x, RDF.type, rdf_type)
+        self._add(x, members_predicate, self._seq(nodes))
+        self._annotate(x, annotations)
+
+    def _axiom(self, form: list):
+        head = form[0]
+        annotations, args = self._split_annotations(form[1:])
+        if head == "Declaration":
+            kind = args[0][0]
+            if kind not in DECLARATION_TYPES:
+                raise OFNSyntaxError(f"Unknown declaration {kind}")
+            self._reify((self._entity(args[0][1], DECLARATION_TYPES[kind], declared=True), RDF.type, DECLARATION_TYPES[kind]), annotations)
+        # Class axioms
+        elif head == "SubClassOf":
+            self._axiom_triple(self._class(args[0]), RDFS.subClassOf, self._class(args[1]), annotations)
+        elif head == "EquivalentClasses":
+            self._pairwise([self._class(a) for a in args], OWL.equivalentClass, annotations)
+        elif head == "DisjointClasses":
+            classes = [self._class(a) for a in args]
+            if len(classes) == 2:
+                self._axiom_triple(classes[0], OWL.disjointWith, classes[1], annotations)
+            else:
+                self._all_members(classes, OWL.AllDisjointClasses, OWL.members, annotations)
+        elif head == "DisjointUnion":
+            self._axiom_triple(self._class(args[0]), OWL.disjointUnionOf, self._seq([self._class(a) for a in args[1:]]), annotations)
+        elif head == "HasKey":
+            keys = [self._object_property(a) for a in args[1][1:]] + [self._data_property(a) for a in args[2][1:]]
+            self._axiom_triple(self._class(args[0]), OWL.hasKey, self._seq(keys), annotations)
+        # Object property axioms
+        elif head == "SubObjectPropertyOf":
+            if isinstance(args[0], list) and args[0][0] == "ObjectPropertyChain":
+                chain = self._seq([self._object_property(a) for a in args[0][1:]])
+                self._axiom_triple(self._object_property(args[1]), OWL.propertyChainAxiom, chain, annotations)
+            else:
+                self._axiom_triple(self._object_property(args[0]), RDFS.subPropertyOf, self._object_property(args[1]), annotations)
+        elif head == "EquivalentObjectProperties":
+            self._pairwise([self._object_property(a) for a in args], OWL.equivalentProperty, annotations)
+        elif head == "DisjointObjectProperties":
+            properties = [self._object_property(a) for a in args]
+            if len(properties) == 2:
+                self._axiom_triple(properties[0], OWL.propertyDisjointWith, properties[1], annotations)
+            else:
+                self._all_members(properties, OWL.AllDisjointProperties, OWL.members, annotations)
+        elif head == "InverseObjectProperties":
+            self._axiom_triple(self._object_property(args[0]), OWL.inverseOf, self._object_property(args[1]), annotations)
+        elif head in ("ObjectPropertyDomain", "ObjectPropertyRange"):
+            self._axiom_triple(self._object_property(args[0]), RDFS.domain if head == "ObjectPropertyDomain" else RDFS.range, self._class(args[1]), annotations)
+        elif head in PROPERTY_CHARACTERISTICS:
+            self._axiom_triple(self._object_property(args[0]), RDF.type, PROPERTY_CHARACTERISTICS[head], annotations)
+        # Data property axioms
+        elif head == "SubDataPropertyOf":
+            self._axiom_triple(self._data_property(args[0]), RDFS.subPropertyOf, self._data_property(args[1]), annotations)
+        elif head == "EquivalentDataProperties":
+            self._pairwise([self._data_property(a) for a in args], OWL.equivalentProperty, annotations)
+        elif head == "DisjointDataProperties":
+            properties = [self._data_property(a) for a in args]
+            if len(properties) == 2:
+                self._axiom_triple(properties[0], OWL.propertyDisjointWith, properties[1], annotations)
+            else:
+                self._all_members(properties, OWL.AllDisjointProperties, OWL.members, annotations)
+        elif head == "DataPropertyDomain":
+            self._axiom_triple(self._data_property(args[0]), RDFS.domain, self._class(args[1]), annotations)
+        elif head == "DataPropertyRange":
+            self._axiom_triple(self._data_property(args[0]), RDFS.range, self._data_range(args[1]), annotations)
+        elif head == "FunctionalDataProperty":
+            self._axiom_triple(self._data_property(args[0]), RDF.type, OWL.FunctionalProperty, annotations)
+        elif head == "DatatypeDefinition":
+            self._axiom_triple(self._entity(args[0], RDFS.Datatype), OWL.equivalentClass, self._data_range(args[1]), annotations)
+        # Assertions
+        elif head == "SameIndividual":
+            self._pairwise([self._individual(a) for a in args], OWL.sameAs, annotations)
+        elif head == "DifferentIndividuals":
+            individuals = [self._individual(a) for a in args]
+            if len(individuals) == 2:
+                self._axiom_triple(individuals[0], OWL.differentFrom, individuals[1], annotations)
+            else:
+                self._all_members(individuals, OWL.AllDifferent, OWL.distinctMembers, annotations)
+        elif head == "ClassAssertion":
+            self._axiom_triple(self._individual(args[1]), RDF.type, self._class(args[0]), annotations)
+        elif head == "ObjectPropertyAssertion":
+            if isinstance(args[0], list):
+                # ObjectInverseOf(P) a b states b P a
+                self._axiom_triple(self._individual(args[2]), self._object_property(args[0][1]), self._individual(args[1]), annotations)
+            else:
+                self._axiom_triple(self._individual(args[1]), self._object_property(args[0]), self._individual(args[2]), annotations)
+        elif head == "DataPropertyAssertion":
+            self._axiom_triple(self._individual(args[1]), self._data_property(args[0]), args[2], annotations)
+        elif head in ("NegativeObjectPropertyAssertion", "NegativeDataPropertyAssertion"):
+            x = BNode()
+            self._add(x, RDF.type, OWL.NegativePropertyAssertion)
+            self._add(x, OWL.sourceIndividual, self._individual(args[1]))
+            if head == "NegativeObjectPropertyAssertion":
+                self._add(x, OWL.assertionProperty, self._object_property(args[0]))
+                self._add(x, OWL.targetIndividual, self._individual(args[2]))
+            else:
+                self._add(x, OWL.assertionProperty, self._data_property(args[0]))
+                self._add(x, OWL.targetValue, args[2])
+            self._annotate(x, annotations)
+        # Annotation axioms
+        elif head == "AnnotationAssertion":
+            self._axiom_triple(args[1], self._entity(args[0], OWL.AnnotationProperty), args[2], annotations)
+        elif head == "SubAnnotationPropertyOf":
+            self._axiom_triple(self._entity(args[0], OWL.AnnotationProperty), RDFS.subPropertyOf, self._entity(args[1], OWL.AnnotationProperty), annotations)
+        elif head in ("AnnotationPropertyDomain", "AnnotationPropertyRange"):
+            self._axiom_triple(self._entity(args[0], OWL.AnnotationProperty), RDFS.domain if head == "AnnotationPropertyDomain" else RDFS.range, args[1], annotations)
+        else:
+            raise OFNUnsupportedError(f"Unsupported axiom {head}")
+
+    # -------------------- document --------------------
+    def read(self, g: Graph) -> Graph:
+        """Add the triples of the document to g and return it."""
+        self.g = g
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self._tokens = tokenize(f)
+            while True:
+                kind, value = self._next()
+                if kind is None:
+                    raise OFNSyntaxError("No Ontology(...) found")
+                if value == "Prefix":
+                    self._expect("(")
+                    _, name = self._next()
+                    self._expect("=")
+                    _, iri = self._next()
+                    self._expect(")")
+                    name = name.rstrip(':')
+                    self.prefixes.append((name, iri[1:-1]))
+                    self._prefix_map[name] = iri[1:-1]
+                elif value == "Ontology":
+                    break
+                else:
+                    raise OFNSyntaxError(f"Unexpected {value!r} before Ontology(...)")
+            self._expect("(")
+
+            # Ontology IRI and version IRI
+            iris = []
+            while len(iris) < 2 and (self._peek()[0] == "iri" or (self._peek()[0] == "name" and ':' in self._peek()[1])):
+                iris.append(self._expression())
+            self.ontology_iri = str(iris[0]) if iris else None
+            ontology = iris[0] if iris else BNode()
+            self._add(ontology, RDF.type, OWL.Ontology)
+            if len(iris) > 1:
+                self._add(ontology, OWL.versionIRI, iris[1])
+
+            count = 0
+            while self._peek() != ("punct", ")"):
+                form = self._expression()
+                if not isinstance(form, list):
+                    raise OFNSyntaxError(f"Unexpected {form!r} in Ontology(...)")
+                if form[0] == "Import":
+                    self._add(ontology, OWL.imports, form[1])
+                elif form[0] == "Annotation":
+                    self._annotate(ontology, [form])
+                else:
+                    self._axiom(form)
+                    count += 1
+            self._next()
+        log.info("Read %d axioms from %s", count, self.path)
+        return g
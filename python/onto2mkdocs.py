@@ -0,0 +1,228 @@
+import os
+import sys
+import logging
+import tempfile
+import traceback
+from collections import defaultdict
+from ontology_sources import SOURCE_PROCESSORS, source_processor, find_sources, parse_sources
+from diagram_generator import render_diagrams, render_stats, diagram_caps
+from markdown_generator import update_mkdocs_nav, generate_index
+from class_pipeline import process_classes
+from build_manifest import load_manifest, save_manifest
+from graph_cache import GRAPH_CACHE_DIR
+from build_profile import start_profiling, write_profile_report, PROFILE_STATS
+from memory_accounting import start_memory_accounting, memory_checkpoint, memory_released, write_memory_report
+from concept_registry import open_concept_registry, registry_overlay
+from utils import get_qname, get_label, is_abstract, parse_build_args, ontology_lookup_stats, VersionedDict
+from rdflib import XSD, Literal
+
+# -------------------- logging --------------------
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s")
+log = logging.getLogger("onto2mkdocs")
+
+def describe_extensions(extensions: tuple, conjunction: str) -> str:
+    """List extensions for messages, e.g. ".ttl, .owl and .ofn"."""
+    if len(extensions) == 1:
+        return extensions[0]
+    return f"{', '.join(extensions[:-1])} {conjunction} {extensions[-1]}"
+
+def main(script_name: str = "onto2mkdocs.py", extensions: tuple = tuple(SOURCE_PROCESSORS)):
+    """Build the pages, diagrams and navigation of the ontology files in docs/ with one of extensions.
+
+    ttl2mkdocs.py, owl2mkdocs.py and ofn2mkdocs.py call this with their own name and extension."""
+    log.info("Starting %s", script_name)
+    args = parse_build_args(script_name, describe_extensions(extensions, "and"))
+
+    # Check for mkdocs.yml in current directory
+    root_dir = os.getcwd()
+    mkdocs_path = os.path.join(root_dir, "mkdocs.yml")
+    if not os.path.exists(mkdocs_path):
+        print("Error: mkdocs.yml not found in current directory")
+        sys.exit(1)
+
+    # Check for docs directory
+    docs_dir = os.path.join(root_dir, "docs")
+    if not os.path.isdir(docs_dir):
+        print("Error: docs directory not found")
+        sys.exit(1)
+
+    # Find all ontology files with one of the extensions in docs directory
+    source_files = find_sources(docs_dir, extensions)
+    if not source_files:
+        print(f"No {describe_extensions(extensions, 'or')} files found in docs/")
+        sys.exit(0)
+
+    if args.memory:
+        start_memory_accounting()
+    if args.profile:
+        start_profiling(os.path.join(root_dir, PROFILE_STATS) if args.profile_hot_path else None)
+
+    # Initialize global collections
+    global_patterns = {}
+    global_all_classes = set()
+    abstract_map = {}
+    ontology_info = {}
+    errors = []
+    processed_count = 0
+    skipped_count = 0
+    ns_to_ontology = VersionedDict()
+    class_to_onts = defaultdict(list)
+    render_queue = []
+    manifest = {} if args.rebuild else load_manifest(root_dir)
+    # Without the persistent cache, parallel parsing hands graphs over through a cache for this run only
+    run_cache = tempfile.TemporaryDirectory(prefix="onto2mkdocs-") if args.no_cache and args.jobs > 1 else None
+    cache_dir = run_cache.name if run_cache else None if args.no_cache else os.path.join(root_dir, GRAPH_CACHE_DIR)
+    fingerprints = {}
+
+    # Pages are named after the ontology, so only one file per ontology name can be built
+    input_files = []
+    source_by_name = {}
+    for path in source_files:
+        ontology_name = os.path.splitext(os.path.basename(path))[0]
+        if ontology_name in source_by_name:
+            error_msg = f"Skipping {path}: ontology {ontology_name} is already built from {source_by_name[ontology_name]}"
+            errors.append(error_msg)
+            log.error(error_msg)
+            continue
+        source_by_name[ontology_name] = path
+        input_files.append(path)
+
+    # Parse all files in parallel, then process them in order
+    failed_parses = parse_sources(input_files, cache_dir, args.jobs) if args.jobs > 1 else {}
+
+    for path in input_files:
+        ontology_name = os.path.splitext(os.path.basename(path))[0]
+        log.info("########## Processing ontology file: %s", path)
+        # Initialize ontology_info for this file
+        ontology_info[path] = {
+            "title": "Untitled Ontology",
+            "description": "",
+            "patterns": set(),
+            "non_pattern_classes": set(),
+            "ontology_name": ontology_name
+        }
+        if path in failed_parses:
+            errors.extend(failed_parses[path])
+            continue
+        try:
+            # Process ontology
+            g, ns, prefix_map, classes, local_classes, prop_map = source_processor(path).process_ontology(path, errors, ontology_info[path], cache_dir)
+            if g is None:
+                continue
+            ns_to_ontology[ns] = ontology_name
+
+            # Update global collections
+            for cls in classes:
+                cls_qname = get_qname(g, cls, ns, prefix_map)
+                abstract_map[cls_qname] = is_abstract(cls, g, ns)
+                if cls_qname != 'ITSThing':
+                    global_all_classes.add(cls_qname)
+                if ':' not in cls_qname:
+                    class_to_onts[cls_qname].append(ontology_name)
+
+            for cls in local_classes:
+                cls_name = get_label(g, cls)
+                global_all_classes.add(cls_name)
+                if cls_name == 'ITSThing':
+                    continue
+                pattern_literal = g.value(cls, XSD.pattern)
+                if pattern_literal and isinstance(pattern_literal, Literal):
+                    pattern_name = str(pattern_literal)
+                    if pattern_name not in global_patterns:
+                        global_patterns[pattern_name] = {"classes": []}
+                    global_patterns[pattern_name]["classes"].append((cls_name, ontology_name))
+                    ontology_info[path]["patterns"].add(pattern_name)
+                else:
+                    ontology_info[path]["non_pattern_classes"].add(cls_name)
+                    class_to_onts[cls_name].append(ontology_name)
+
+            # Process classes for diagrams and Markdown
+            context = {
+                "g": g, "ns": ns, "prefix_map": prefix_map, "prop_map": prop_map,
+                "file_path": path, "ontology_name": ontology_name, "ns_to_ontology": ns_to_ontology,
+                "global_all_classes": global_all_classes, "abstract_map": abstract_map,
+                "global_patterns": global_patterns, "class_to_onts": class_to_onts, "manifest": manifest,
+                "registry_overlay": registry_overlay(g), "write_dot": args.write_dot,
+                "diagram_caps": diagram_caps(args.max_diagram_nodes, args.max_diagram_edges, args.max_expression_depth)
+            }
+            sorted_classes = sorted(local_classes, key=lambda u: get_label(g, u).lower())
+            processed, skipped = process_classes(context, sorted_classes, errors, render_queue, fingerprints, args.jobs)
+            processed_count += processed
+            skipped_count += skipped
+            memory_checkpoint("pages", path)
+
+        except Exception as e:
+            error_msg = f"Error processing ontology {path}: {str(e)}\n{traceback.format_exc()}"
+            errors.append(error_msg)
+            log.error(error_msg)
+            continue
+        finally:
+            # Release the ontology before the next one is loaded
+            g = context = classes = local_classes = sorted_classes = prop_map = None
+            memory_released(path)
+
+    if run_cache:
+        run_cache.cleanup()
+
+    # Render all queued diagrams and record what was built
+    failed_renders = render_diagrams(render_queue, errors)
+    try:
+        save_manifest(root_dir, fingerprints, failed_renders)
+    except Exception as e:
+        error_msg = f"Error writing build manifest: {str(e)}\n{traceback.format_exc()}"
+        errors.append(error_msg)
+        log.error(error_msg)
+
+    # Export the concept registry collected during this run
+    try:
+        registry_store = open_concept_registry()
+        registry_store.export_markdown()
+        registry_store.close()
+    except Exception as e:
+        error_msg = f"Error exporting concept registry: {str(e)}\n{traceback.format_exc()}"
+        errors.append(error_msg)
+        log.error(error_msg)
+
+    # Update mkdocs.yml navigation with all ontologies at once
+    try:
+        update_mkdocs_nav(mkdocs_path, global_patterns, global_all_classes, errors, class_to_onts, ontology_info, input_files)
+    except Exception as e:
+        error_msg = f"Error updating mkdocs.yml: {str(e)}\n{traceback.format_exc()}"
+        errors.append(error_msg)
+        log.error(error_msg)
+
+    # Generate index.md
+    try:
+        generate_index(docs_dir, input_files, ontology_info, global_patterns, errors, class_to_onts)
+    except Exception as e:
+        error_msg = f"Error generating index.md: {str(e)}\n{traceback.format_exc()}"
+        errors.append(error_msg)
+        log.error(error_msg)
+
+    log.info("Total processed classes: %d", processed_count)
+    log.info("Unchanged classes skipped: %d", skipped_count)
+    lookup_stats = ontology_lookup_stats()
+    log.info("Ontology lookups: %d hits, %d misses, %d index builds", lookup_stats["hits"], lookup_stats["misses"], lookup_stats["rebuilds"])
+    diagram_stats = render_stats()
+    log.info("Diagram renders: %d rendered (%d from cached layouts), %d skipped with unchanged DOT source", diagram_stats["rendered"], diagram_stats["reused_layouts"], diagram_stats["skipped"])
+    if args.profile:
+        try:
+            write_profile_report(root_dir)
+        except Exception as e:
+            error_msg = f"Error writing build profile: {str(e)}\n{traceback.format_exc()}"
+            errors.append(error_msg)
+            log.error(error_msg)
+    if args.memory:
+        try:
+            write_memory_report(root_dir)
+        except Exception as e:
+            error_msg = f"Error writing memory report: {str(e)}\n{traceback.format_exc()}"
+            errors.append(error_msg)
+            log.error(error_msg)
+    if errors:
+        log.error("Errors occurred:")
+        for err in errors:
+            log.error(err)
+
+if __name__ == "__main__":
+    main()
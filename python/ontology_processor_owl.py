@@ -1,105 +1,87 @@
 import os
 import logging
+import tempfile
 import traceback
 from rdflib import Graph, RDF, OWL, URIRef, Literal, XSD, RDFS
-from utils import get_qname, get_ontology_metadata, _norm_base
+from utils import get_qname, get_ontology_metadata, _norm_base, VersionedDict
+from concept_registry import open_concept_registry, RegistryOverlay, attach_registry_overlay, registry_namespaces
+from graph_cache import RecordingGraph, load_cached_graph, store_cached_graph, skolemize_blank_nodes
+from stage_timer import stage, timed
+from memory_accounting import memory_checkpoint
 from rdflib.namespace import DC, DCTERMS
 
 log = logging.getLogger("owl2mkdocs")
 
-def parse_concept_registry(script_dir):
-    registry_path = os.path.join(script_dir, "concept_registry.md")
-    if not os.path.exists(registry_path):
-        with open(registry_path, 'w', encoding='utf-8') as f:
-            f.write("| base_uri | name | type | description |\n|----------|------|------|-------------|\n")
-        log.info(f"Created new concept_registry.md in {script_dir}")
-        return {}
-    content = open(registry_path, 'r', encoding='utf-8').read()
-    lines = content.splitlines()
-    registry = {}
-    in_table = False
-    headers = None
-    for line in lines:
-        if line.strip().startswith('|'):
-            if not in_table:
-                headers = [h.strip().lower() for h in line.split('|') if h.strip()]
-                log.debug(f"Parsed headers: {headers}")
-                in_table = True
-            elif headers and not line.strip().startswith('|---'):
-                values = [v.strip() for v in line.split('|') if v.strip()]
-                log.debug(f"Parsed values: {values}")
-                if len(values) < 3:  # Require at least base_uri, name, type
-                    log.warning(f"Skipping row with insufficient values (expected at least 3, got {len(values)}): {line}")
-                    continue
-                try:
-                    base_uri = values[headers.index('base_uri')]
-                    name = values[headers.index('name')]
-                    concept_type = values[headers.index('type')]
-                    description = values[headers.index('description')] if 'description' in headers and len(values) > headers.index('description') else ''
-                    uri = f"{base_uri}{name}"
-                    registry[uri] = {'type': concept_type, 'description': description}
-                except ValueError as e:
-                    log.warning(f"Skipping row due to missing header: {line} ({str(e)})")
-    log.info(f"Loaded {len(registry)} entries from concept_registry.md")
-    return registry
-
-def update_concept_registry(script_dir, registry):
-    registry_path = os.path.join(script_dir, "concept_registry.md")
-    with open(registry_path, 'w', encoding='utf-8') as f:
-        f.write("| base_uri | name | type | description |\n|----------|------|------|-------------|\n")
-        # Sort by base_uri and then name
-        sorted_items = sorted(registry.items(), key=lambda x: (x[0].rsplit('/', 1)[0] if '/' in x[0] else x[0], x[0].rsplit('/', 1)[1] if '/' in x[0] else ''))
-        for uri, info in sorted_items:
-            base_uri, name = uri.rsplit('/', 1) if '/' in uri else (uri, '')
-            if '#' in name:
-                base_uri, name = f"{base_uri}/{name.split('#')[0]}#", name.split('#')[1]
-            if not base_uri.endswith(('#', '/')):
-                base_uri += '/'
-            if not base_uri.startswith('N'):
-                f.write(f"| {base_uri} | {name} | {info['type']} | {info['description']} |\n")
-    log.info(f"Updated concept_registry.md with {len(registry)} entries")
-
-def process_ontology(owl_path: str, errors: list, ontology_info) -> tuple:
-    """Process an OWL file and update ontology_info, return graph, namespace, prefix map, classes, local_classes, and property map."""
-    # Load OWL ontology
+def load_owlready_graph(owl_path: str, record: bool = False) -> Graph:
+    """Load a file that rdflib cannot parse (e.g. OWL/XML) with owlready2 and copy its triples into an in-memory graph.
+
+    The file is loaded into a World of its own, backed by a temporary on-disk quadstore, which is closed
+    and deleted before returning; nothing is left in owlready2's process-global default_world."""
+    from owlready2 import World
+    with tempfile.TemporaryDirectory(prefix="owlready2-") as tmp_dir:
+        world = World(filename=os.path.join(tmp_dir, "quadstore.sqlite3"))
+        try:
+            onto = world.get_ontology("file://" + os.path.abspath(owl_path)).load()
+            if onto is None:
+                raise ValueError("owlready2 returned None")
+            world_graph = world.as_rdflib_graph()
+            g = RecordingGraph(record=record)
+            g.addN((s, p, o, g) for s, p, o in world_graph.triples((None, None, None)))
+        finally:
+            world.close()
+    return g
+
+@timed("parse")
+def load_graph(owl_path: str, errors: list, cache_dir: str = None) -> tuple:
+    """Parse an OWL file, or load it from the graph cache in cache_dir; return (graph, None), or (None, None) on failure."""
     try:
         if not os.path.exists(owl_path):
             error_msg = f"Ontology file not found: {owl_path}"
             errors.append(error_msg)
             log.error(error_msg)
-            return None, None, None, None, None, None
-
-        g = Graph()
-        if owl_path.lower().endswith('.ttl'):
-            g.parse(owl_path, format='turtle')
-            log.info("Loaded ontology %s with Turtle format, %d triples", owl_path, len(g))
-        else:
-            try:
-                g.parse(owl_path, format='xml')
-                log.info("Loaded ontology %s with RDF/XML, %d triples", owl_path, len(g))
-            except Exception as xml_e:
+            return None, None
+
+        g, _ = load_cached_graph(cache_dir, owl_path, 'owl')
+        if g is None:
+            g = RecordingGraph()
+            if owl_path.lower().endswith('.ttl'):
+                g.parse(owl_path, format='turtle')
+                log.info("Loaded ontology %s with Turtle format, %d triples", owl_path, len(g))
+            else:
                 try:
-                    from owlready2 import get_ontology, default_world
-                    onto = get_ontology("file://" + os.path.abspath(owl_path)).load()
-                    if onto is None:
-                        raise ValueError("owlready2 returned None")
-                    g = default_world.as_rdflib_graph()
-                    log.info("Loaded ontology %s with owlready2 fallback, %d triples", owl_path, len(g))
-                except Exception as owl_e:
-                    error_msg = f"Failed RDF/XML: {str(xml_e)}\n{traceback.format_exc()}\nFailed owlready2: {str(owl_e)}\n{traceback.format_exc()}"
-                    errors.append(error_msg)
-                    log.error(error_msg)
-                    return None, None, None, None, None, None
-        if len(g) == 0:
-            error_msg = f"RDF graph is empty after loading ontology {owl_path}"
-            errors.append(error_msg)
-            log.error(error_msg)
-            return None, None, None, None, None, None
+                    g.parse(owl_path, format='xml')
+                    log.info("Loaded ontology %s with RDF/XML, %d triples", owl_path, len(g))
+                except Exception as xml_e:
+                    try:
+                        g = load_owlready_graph(owl_path, record=True)
+                        log.info("Loaded ontology %s with owlready2 fallback, %d triples", owl_path, len(g))
+                    except Exception as owl_e:
+                        error_msg = f"Failed RDF/XML: {str(xml_e)}\n{traceback.format_exc()}\nFailed owlready2: {str(owl_e)}\n{traceback.format_exc()}"
+                        errors.append(error_msg)
+                        log.error(error_msg)
+                        return None, None
+            if len(g) == 0:
+                error_msg = f"RDF graph is empty after loading ontology {owl_path}"
+                errors.append(error_msg)
+                log.error(error_msg)
+                return None, None
+            g = skolemize_blank_nodes(g, record=bool(cache_dir))
+            store_cached_graph(cache_dir, owl_path, 'owl', g)
     except Exception as e:
         error_msg = f"Failed to load or parse ontology from {owl_path}: {str(e)}\n{traceback.format_exc()}"
         errors.append(error_msg)
         log.error(error_msg)
+        return None, None
+    return g, None
+
+def process_ontology(owl_path: str, errors: list, ontology_info, cache_dir: str = None) -> tuple:
+    """Process an OWL file and update ontology_info, return graph, namespace, prefix map, classes, local_classes, and property map.
+    Parsed graphs are cached in cache_dir unless it is None."""
+    # Load OWL ontology
+    g, _ = load_graph(owl_path, errors, cache_dir)
+    if g is None:
         return None, None, None, None, None, None
+    memory_checkpoint("parse", owl_path, g)
 
     # Dynamically set default namespace from ontology IRI
     ns = None
@@ -111,89 +93,82 @@ def process_ontology(owl_path: str, errors: list, ontology_info) -> tuple:
         ns = "https://isotc204.org/ontologies/its/default#"
 
     # Load the concept registry from the Python script directory
-    script_dir = os.path.dirname(os.path.realpath(__file__))
-    registry = parse_concept_registry(script_dir)
-
-    # Add object and datatype properties from registry to the graph
-    for uri, info in registry.items():
-        if info['type'] == 'object_property':
-            g.add((URIRef(uri), RDF.type, OWL.ObjectProperty))
-            log.debug(f"Added to graph: {uri} a owl:ObjectProperty")
-        elif info['type'] == 'datatype_property':
-            g.add((URIRef(uri), RDF.type, OWL.DatatypeProperty))
-            log.debug(f"Added to graph: {uri} a owl:DatatypeProperty")
-
-    # Collect new concepts (local and external) from the current ontology
-    new_concepts = {}
-    # Local classes
-    for cls in g.subjects(RDF.type, OWL.Class):
-        uri = str(cls)
-        if uri.startswith(ns) and uri not in registry and uri not in new_concepts:
-            description = g.value(cls, RDFS.comment) or g.value(cls, DC.description) or ''
-            new_concepts[uri] = {'type': 'class', 'description': str(description) if isinstance(description, Literal) else description}
-            log.debug(f"Added local class: {uri}")
-    # Local object properties
-    for prop in g.subjects(RDF.type, OWL.ObjectProperty):
-        uri = str(prop)
-        if uri.startswith(ns) and uri not in registry and uri not in new_concepts:
-            description = g.value(prop, RDFS.comment) or g.value(prop, DC.description) or ''
-            new_concepts[uri] = {'type': 'object_property', 'description': str(description) if isinstance(description, Literal) else description}
-            log.debug(f"Added local object_property: {uri}")
-    # Local datatype properties
-    for prop in g.subjects(RDF.type, OWL.DatatypeProperty):
-        uri = str(prop)
-        if uri.startswith(ns) and uri not in registry and uri not in new_concepts:
-            description = g.value(prop, RDFS.comment) or g.value(prop, DC.description) or ''
-            new_concepts[uri] = {'type': 'datatype_property', 'description': str(description) if isinstance(description, Literal) else description}
-            log.debug(f"Added local datatype_property: {uri}")
-
-    # Inferred external concepts from usage
-    for s, p, o in g.triples((None, RDFS.subClassOf, None)):
-        if isinstance(o, URIRef) and not str(o).startswith(ns) and str(o) != str(OWL.Thing):
-            uri = str(o)
-            if uri not in registry and uri not in new_concepts:
-                new_concepts[uri] = {'type': 'class', 'description': ''}
-                log.debug(f"Inferred external class: {uri}")
-    for s, p, o in g.triples((None, RDFS.subClassOf, None)):
-        if (o, RDF.type, OWL.Restriction) in g:
-            prop = g.value(o, OWL.onProperty)
-            if prop and not str(prop).startswith(ns):
-                uri = str(prop)
-                avf = g.value(o, OWL.allValuesFrom)
-                card = g.value(o, OWL.qualifiedCardinality) or g.value(o, OWL.minQualifiedCardinality) or g.value(o, OWL.maxQualifiedCardinality)
-                if avf and isinstance(avf, URIRef):
-                    prop_type = 'object_property'
-                elif card or g.value(o, OWL.onDataRange):
-                    prop_type = 'datatype_property'
-                else:
-                    prop_type = 'object_property'  # Default assumption
+    with stage("registry"):
+        registry_store = open_concept_registry()
+        registry = registry_store.load()
+
+        # Check registered property types alongside the graph instead of adding them to it
+        attach_registry_overlay(g, RegistryOverlay(registry))
+
+        # Collect new concepts (local and external) from the current ontology
+        new_concepts = {}
+        # Local classes
+        for cls in g.subjects(RDF.type, OWL.Class):
+            uri = str(cls)
+            if uri.startswith(ns) and uri not in registry and uri not in new_concepts:
+                description = g.value(cls, RDFS.comment) or g.value(cls, DC.description) or ''
+                new_concepts[uri] = {'type': 'class', 'description': str(description) if isinstance(description, Literal) else description}
+                log.debug(f"Added local class: {uri}")
+        # Local object properties
+        for prop in g.subjects(RDF.type, OWL.ObjectProperty):
+            uri = str(prop)
+            if uri.startswith(ns) and uri not in registry and uri not in new_concepts:
+                description = g.value(prop, RDFS.comment) or g.value(prop, DC.description) or ''
+                new_concepts[uri] = {'type': 'object_property', 'description': str(description) if isinstance(description, Literal) else description}
+                log.debug(f"Added local object_property: {uri}")
+        # Local datatype properties
+        for prop in g.subjects(RDF.type, OWL.DatatypeProperty):
+            uri = str(prop)
+            if uri.startswith(ns) and uri not in registry and uri not in new_concepts:
+                description = g.value(prop, RDFS.comment) or g.value(prop, DC.description) or ''
+                new_concepts[uri] = {'type': 'datatype_property', 'description': str(description) if isinstance(description, Literal) else description}
+                log.debug(f"Added local datatype_property: {uri}")
+
+        # Inferred external concepts from usage
+        for s, p, o in g.triples((None, RDFS.subClassOf, None)):
+            if isinstance(o, URIRef) and not str(o).startswith(ns) and str(o) != str(OWL.Thing):
+                uri = str(o)
                 if uri not in registry and uri not in new_concepts:
-                    new_concepts[uri] = {'type': prop_type, 'description': ''}
-                    log.debug(f"Inferred external {prop_type}: {uri}")
-
-    # Update registry with new concepts only if not present
-    for uri, info in new_concepts.items():
-        if uri not in registry:
-            registry[uri] = info
-    update_concept_registry(script_dir, registry)
+                    new_concepts[uri] = {'type': 'class', 'description': ''}
+                    log.debug(f"Inferred external class: {uri}")
+        for s, p, o in g.triples((None, RDFS.subClassOf, None)):
+            if (o, RDF.type, OWL.Restriction) in g:
+                prop = g.value(o, OWL.onProperty)
+                if prop and not str(prop).startswith(ns):
+                    uri = str(prop)
+                    avf = g.value(o, OWL.allValuesFrom)
+                    card = g.value(o, OWL.qualifiedCardinality) or g.value(o, OWL.minQualifiedCardinality) or g.value(o, OWL.maxQualifiedCardinality)
+                    if avf and isinstance(avf, URIRef):
+                        prop_type = 'object_property'
+                    elif card or g.value(o, OWL.onDataRange):
+                        prop_type = 'datatype_property'
+                    else:
+                        prop_type = 'object_property'  # Default assumption
+                    if uri not in registry and uri not in new_concepts:
+                        new_concepts[uri] = {'type': prop_type, 'description': ''}
+                        log.debug(f"Inferred external {prop_type}: {uri}")
+
+        # Update registry with new concepts only if not present
+        for uri, info in new_concepts.items():
+            if uri not in registry:
+                registry[uri] = info
+        registry_store.add_concepts(new_concepts)
+        registry_store.close()
+    memory_checkpoint("registry", owl_path)
 
     # Extract prefixes and create prefix map
-    prefix_map = {str(uri): f"{prefix}:" for prefix, uri in g.namespaces()}
-    if ns not in prefix_map:
-        prefix_map[ns] = ":"
-    # Add prefixes from registry
-    for uri, info in registry.items():
-        base_uri, name = uri.rsplit('/', 1) if '/' in uri else (uri, '')
-        if '#' in name:
-            base_uri, name = f"{base_uri}/{name.split('#')[0]}#", name.split('#')[1]
-        if not base_uri.endswith(('#', '/')):
-            base_uri += '/'
-        if base_uri not in prefix_map:
-            prefix = name.lower()
-            prefix_map[base_uri] = f"{prefix}:"
-    log.debug("Prefixes for %s:", owl_path)
-    for uri, prefix in prefix_map.items():
-        log.debug("  %s → %s", prefix, uri)
+    with stage("prefixes"):
+        prefix_map = VersionedDict({str(uri): f"{prefix}:" for prefix, uri in g.namespaces()})
+        if ns not in prefix_map:
+            prefix_map[ns] = ":"
+        # Add prefixes from registry
+        for base_uri, name in registry_namespaces(registry).items():
+            if base_uri not in prefix_map:
+                prefix = name.lower()
+                prefix_map[base_uri] = f"{prefix}:"
+        log.debug("Prefixes for %s:", owl_path)
+        for uri, prefix in prefix_map.items():
+            log.debug("  %s → %s", prefix, uri)
 
     # Extract ontology metadata and update ontology_info
     dc_title = get_ontology_metadata(g, ns, DC.title) or "Untitled Ontology"
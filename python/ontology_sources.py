@@ -0,0 +1,46 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import ontology_processor_ttl
+import ontology_processor_owl
+import ontology_processor_ofn
+
+log = logging.getLogger("ofn2mkdocs")
+
+# Processor module for each supported file extension; each provides load_graph() and process_ontology()
+SOURCE_PROCESSORS = {
+    ".ttl": ontology_processor_ttl,
+    ".owl": ontology_processor_owl,
+    ".ofn": ontology_processor_ofn
+}
+
+def source_processor(path: str):
+    """Return the processor module for an ontology file, chosen by its extension, or None if unsupported."""
+    return SOURCE_PROCESSORS.get(os.path.splitext(path)[1].lower())
+
+def find_sources(docs_dir: str, extensions: tuple = tuple(SOURCE_PROCESSORS)) -> list:
+    """Return the supported ontology files in docs_dir with one of extensions, sorted by path."""
+    return sorted(os.path.join(docs_dir, f) for f in os.listdir(docs_dir)
+                  if source_processor(f) is not None and os.path.splitext(f)[1].lower() in extensions)
+
+def _parse_source(path: str, cache_dir: str) -> tuple:
+    errors = []
+    g, _ = source_processor(path).load_graph(path, errors, cache_dir)
+    return path, g is not None, errors
+
+def parse_sources(paths: list, cache_dir: str, jobs: int) -> dict:
+    """Parse the given files concurrently, one per worker process, into the graph cache in cache_dir.
+
+    The graphs are not returned: process_ontology() then loads each one from the cache in file order,
+    so the concept registry sees the ontologies in the same order as a serial run. Return the load
+    errors of the files that failed, as {path: errors}."""
+    failed = {}
+    if not paths or not cache_dir:
+        return failed
+    workers = min(jobs, len(paths))
+    log.info("Parsing %d ontology files with %d workers", len(paths), workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, loaded, errors in executor.map(_parse_source, paths, [cache_dir] * len(paths)):
+            if not loaded:
+                failed[path] = errors
+    return failed
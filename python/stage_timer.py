@@ -0,0 +1,70 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Time spent in each pipeline stage of this process: {stage: {"calls", "seconds", "cpu_seconds", "probes"}}.
+# Stages may nest (e.g. class_restrictions runs inside class_model), so their times are not additive.
+_stage_totals = {}
+
+# Triple-pattern lookups on rdflib's in-memory store, counted once count_graph_probes() has been called
+_graph_probes = 0
+
+def count_graph_probes():
+    """Count every triples() lookup on rdflib's in-memory store from now on; Graph.value, objects,
+    subjects and `in` all go through it. Forked worker processes inherit the counting."""
+    from rdflib.plugins.stores.memory import Memory
+    if getattr(Memory.triples, "counts_probes", False):
+        return
+    lookup = Memory.triples
+
+    @wraps(lookup)
+    def triples(self, triple_pattern, context=None):
+        global _graph_probes
+        _graph_probes += 1
+        return lookup(self, triple_pattern, context)
+    triples.counts_probes = True
+    Memory.triples = triples
+
+def graph_probes() -> int:
+    return _graph_probes
+
+@contextmanager
+def stage(name: str):
+    """Add the wall time, CPU time and graph probes of the with-block to the totals of stage name."""
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    start_probes = _graph_probes
+    try:
+        yield
+    finally:
+        totals = _stage_totals.get(name)
+        if totals is None:
+            totals = _stage_totals[name] = {"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0, "probes": 0}
+        totals["calls"] += 1
+        totals["seconds"] += time.perf_counter() - start
+        totals["cpu_seconds"] += time.process_time() - start_cpu
+        totals["probes"] += _graph_probes - start_probes
+
+def timed(name: str):
+    """Decorator that times every call of the function as stage name."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def stage_stats() -> dict:
+    """Return a copy of the stage totals of this process."""
+    return {name: dict(totals) for name, totals in _stage_totals.items()}
+
+def add_stage_stats(stats: dict):
+    """Add stage totals collected in another process (e.g. a --jobs worker) to this process's totals."""
+    for name, totals in stats.items():
+        mine = _stage_totals.setdefault(name, {"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0, "probes": 0})
+        for key, value in totals.items():
+            mine[key] += value
+
+def reset_stage_stats():
+    _stage_totals.clear()
@@ -0,0 +1,105 @@
+import json
+import unittest
+from diagram_layout import layout_key, read_layout, apply_layout
+
+SOURCE = """// Diagram for Car
+digraph {
+	graph [rankdir=TB splines=true]
+	node [fontname=Arial fontsize=12 shape=none]
+	Car [label=<<TABLE><TR><TD PORT="e">Car [1..*] &gt; x</TD></TR></TABLE>> URL="../classes/Car.md"]
+	subgraph cluster_associated {
+		label="" style=invis
+		Wheel [label="Wheel" color=black]
+	}
+	Car -> Vehicle [arrowhead=onormal style=solid]
+	Car:e -> Wheel [label="has" style=dashed]
+	Car -> Wheel
+}
+"""
+
+LAYOUT = {
+    "graph": {"bb": "0,0,200,100"},
+    "clusters": {"cluster_associated": {"bb": "10,10,90,60", "lp": "50,55"}},
+    "nodes": {
+        "Car": {"pos": "100,80", "width": "1.2", "height": "0.5"},
+        "Vehicle": {"pos": "150,20", "width": "1", "height": "0.5"},
+        "Wheel": {"pos": "50,30"}
+    },
+    "edges": [
+        ["Car", "Vehicle", {"pos": "e,150,38 100,62"}],
+        ["Car", "Wheel", {"pos": "e,50,48 90,62", "lp": "70,55"}],
+        ["Car", "Wheel", {"pos": "e,55,48 95,62"}]
+    ]
+}
+
+class LayoutKeyTest(unittest.TestCase):
+    def test_ignores_styling(self):
+        styled = SOURCE.replace("color=black", "color=red fillcolor=gray").replace('URL="../classes/Car.md"', 'URL="x.md" tooltip="Car"')
+        self.assertEqual(layout_key(SOURCE), layout_key(styled))
+
+    def test_ignores_whitespace_and_comments(self):
+        reformatted = SOURCE.replace("// Diagram for Car\n", "/* Car */").replace("\t", "  ")
+        self.assertEqual(layout_key(SOURCE), layout_key(reformatted))
+
+    def test_changes_with_layout_attributes(self):
+        for old, new in (("rankdir=TB", "rankdir=LR"), ("fontsize=12", "fontsize=14"), ("fontname=Arial", "fontname=Helvetica"),
+                         ('label="has"', 'label="owns"'), ("Car -> Wheel\n", "Car -> Wheel\n\tWheel -> Car\n")):
+            with self.subTest(change=new):
+                self.assertNotEqual(layout_key(SOURCE), layout_key(SOURCE.replace(old, new, 1)))
+
+class ReadLayoutTest(unittest.TestCase):
+    def test_reads_graph_cluster_node_and_edge_coordinates(self):
+        json0 = json.dumps({
+            "name": "%1", "bb": "0,0,200,100", "_subgraph_cnt": 1,
+            "objects": [
+                {"_gvid": 0, "name": "cluster_associated", "bb": "10,10,90,60", "lp": "50,55", "label": ""},
+                {"_gvid": 1, "name": "Car", "pos": "100,80", "width": "1.2", "height": "0.5", "label": "Car"},
+                {"_gvid": 2, "name": "Wheel", "pos": "50,30", "width": "1", "height": "0.5", "color": "black"}
+            ],
+            "edges": [
+                {"_gvid": 1, "tail": 1, "head": 2, "pos": "e,55,48 95,62"},
+                {"_gvid": 0, "tail": 1, "head": 2, "pos": "e,50,48 90,62", "lp": "70,55", "style": "dashed"}
+            ]
+        })
+        layout = read_layout(json0)
+        self.assertEqual(layout["graph"], {"bb": "0,0,200,100"})
+        self.assertEqual(layout["clusters"], {"cluster_associated": {"bb": "10,10,90,60", "lp": "50,55"}})
+        self.assertEqual(layout["nodes"], {"Car": {"pos": "100,80", "width": "1.2", "height": "0.5"},
+                                           "Wheel": {"pos": "50,30", "width": "1", "height": "0.5"}})
+        self.assertEqual(layout["edges"], [["Car", "Wheel", {"pos": "e,50,48 90,62", "lp": "70,55"}],
+                                           ["Car", "Wheel", {"pos": "e,55,48 95,62"}]])
+
+class ApplyLayoutTest(unittest.TestCase):
+    def test_adds_coordinates(self):
+        positioned = apply_layout(SOURCE, LAYOUT)
+        self.assertIn('digraph {\n\tbb="0,0,200,100"\n', positioned)
+        self.assertIn('subgraph cluster_associated {\n\t\tbb="10,10,90,60" lp="50,55"\n', positioned)
+        self.assertIn('Car -> Vehicle [arrowhead=onormal style=solid pos="e,150,38 100,62"]', positioned)
+        self.assertIn('Car:e -> Wheel [label="has" style=dashed pos="e,50,48 90,62" lp="70,55"]', positioned)
+        self.assertIn('Car -> Wheel [pos="e,55,48 95,62"]\n', positioned)
+        self.assertTrue(positioned.endswith('\t"Wheel" [pos="50,30"]\n}\n'))
+
+    def test_pins_node_sizes(self):
+        positioned = apply_layout(SOURCE, LAYOUT)
+        self.assertIn('\t"Car" [pos="100,80" width="1.2" height="0.5" fixedsize="true"]\n', positioned)
+        self.assertIn('\t"Vehicle" [pos="150,20" width="1" height="0.5" fixedsize="true"]\n', positioned)
+
+    def test_keeps_source_statements(self):
+        positioned = apply_layout(SOURCE, LAYOUT)
+        self.assertIn('Car [label=<<TABLE><TR><TD PORT="e">Car [1..*] &gt; x</TD></TR></TABLE>> URL="../classes/Car.md"]', positioned)
+        self.assertIn('Wheel [label="Wheel" color=black]', positioned)
+
+    def test_rejects_edges_missing_from_layout(self):
+        with self.assertRaises(ValueError):
+            apply_layout(SOURCE.replace("}\n", "\tWheel -> Car\n}\n"), LAYOUT)
+
+    def test_rejects_edge_chains(self):
+        with self.assertRaises(ValueError):
+            apply_layout(SOURCE.replace("Car -> Vehicle", "Car -> Vehicle -> Wheel"), LAYOUT)
+
+    def test_rejects_unterminated_source(self):
+        with self.assertRaises(ValueError):
+            apply_layout(SOURCE.rstrip().rstrip("}"), LAYOUT)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from rdflib import BNode, Graph
+from rdflib.compare import isomorphic
+from graph_cache import RecordingGraph, skolemize_blank_nodes
+
+TURTLE = """@prefix : <http://example.org/cars#> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+:Car a owl:Class ;
+    rdfs:subClassOf [ a owl:Restriction ; owl:onProperty :hasPart ; owl:someValuesFrom [ owl:unionOf ( :Wheel :Engine ) ] ] ,
+        [ a owl:Restriction ; owl:onProperty :hasPart ; owl:allValuesFrom :Wheel ] .
+:Truck a owl:Class ;
+    rdfs:subClassOf [ a owl:Restriction ; owl:onProperty :hasPart ; owl:allValuesFrom :Wheel ] .
+"""
+
+def parse(data: str) -> Graph:
+    return skolemize_blank_nodes(RecordingGraph().parse(data=data, format="turtle"))
+
+class SkolemizeBlankNodesTest(unittest.TestCase):
+    def test_same_labels_for_same_input(self):
+        first, second = parse(TURTLE), parse(TURTLE)
+        labels = sorted(n for n in first.all_nodes() if isinstance(n, BNode))
+        self.assertEqual(len(labels), 6)
+        self.assertEqual(labels, sorted(n for n in second.all_nodes() if isinstance(n, BNode)))
+        self.assertEqual(set(first), set(second))
+
+    def test_keeps_graph(self):
+        self.assertTrue(isomorphic(parse(TURTLE), Graph().parse(data=TURTLE, format="turtle")))
+
+    def test_numbers_blank_nodes_with_same_content(self):
+        labels = [str(o) for o in parse(TURTLE).objects(None, None) if isinstance(o, BNode) and str(o).endswith("_2")]
+        self.assertEqual(len(labels), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from rdflib import Graph, Namespace
+from graph_index import _closures, build_class_hierarchy
+
+EX = Namespace("http://example.org/cars#")
+
+TURTLE = """@prefix : <http://example.org/cars#> .
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+:Vehicle a owl:Class .
+:Car a owl:Class ; rdfs:subClassOf :Auto , :Vehicle .
+:Auto a owl:Class ; rdfs:subClassOf :Car .
+:Sedan a owl:Class ; rdfs:subClassOf :Car .
+"""
+
+class ClosuresTest(unittest.TestCase):
+    def test_chain(self):
+        closure, cycles = _closures({"a": ["b"], "b": ["c"]})
+        self.assertEqual(closure, {"a": ("b", "c"), "b": ("c",), "c": ()})
+        self.assertEqual(cycles, [])
+
+    def test_cycles(self):
+        closure, cycles = _closures({"a": ["b"], "b": ["a", "c"], "d": ["d"]})
+        self.assertEqual(set(closure["a"]), {"b", "c"})
+        self.assertEqual(set(closure["b"]), {"a", "c"})
+        self.assertEqual(closure["d"], ())
+        self.assertEqual(sorted(map(sorted, cycles)), [["a", "b"], ["d"]])
+
+class ClassHierarchyTest(unittest.TestCase):
+    def test_subclass_cycle(self):
+        hierarchy = build_class_hierarchy(Graph().parse(data=TURTLE, format="turtle"))
+        self.assertEqual([set(c) for c in hierarchy.cycles], [{EX.Car, EX.Auto}])
+        self.assertEqual(set(hierarchy.superclasses[EX.Car]), {EX.Auto, EX.Vehicle})
+        self.assertEqual(set(hierarchy.superclasses[EX.Auto]), {EX.Car, EX.Vehicle})
+        self.assertEqual(set(hierarchy.superclasses[EX.Sedan]), {EX.Car, EX.Auto, EX.Vehicle})
+        self.assertEqual(set(hierarchy.subclasses[EX.Vehicle]), {EX.Car, EX.Auto, EX.Sedan})
+        self.assertEqual(set(hierarchy.subclasses[EX.Car]), {EX.Auto, EX.Sedan})
+
+if __name__ == "__main__":
+    unittest.main()
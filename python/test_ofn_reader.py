@@ -0,0 +1,93 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from rdflib import Graph, Literal, Namespace, RDFS, XSD
+from rdflib.compare import isomorphic
+from ofn_reader import OFNReader, OFNUnsupportedError
+from ontology_processor_ofn import _funowl_graph, load_graph
+
+EX = Namespace("http://example.org/cars#")
+
+DOCUMENT = """Prefix(:=<http://example.org/cars#>)
+Prefix(xsd:=<http://www.w3.org/2001/XMLSchema#>)
+Prefix(rdfs:=<http://www.w3.org/2000/01/rdf-schema#>)
+Ontology(<http://example.org/cars#> <http://example.org/cars/1.0>
+Annotation(rdfs:comment "Cars and their parts"@en)
+Declaration(Class(:Car))
+Declaration(Class(:Wheel))
+Declaration(Class(:Engine))
+Declaration(ObjectProperty(:hasPart))
+Declaration(DataProperty(:doors))
+SubClassOf(:Car ObjectSomeValuesFrom(:hasPart :Engine))
+SubClassOf(:Car ObjectAllValuesFrom(:hasPart ObjectUnionOf(:Wheel :Engine)))
+SubClassOf(:Car ObjectMinCardinality(4 :hasPart :Wheel))
+SubClassOf(:Car ObjectMaxCardinality(1 :hasPart))
+SubClassOf(:Car DataExactCardinality(1 :doors xsd:integer))
+EquivalentClasses(:Part ObjectIntersectionOf(:Wheel ObjectComplementOf(:Engine)))
+SubClassOf(Annotation(rdfs:comment "asserted") :Wheel :Part)
+AnnotationAssertion(rdfs:label :Car "Car"@en)
+AnnotationAssertion(rdfs:label :Car "Auto"@de)
+AnnotationAssertion(rdfs:comment :Wheel "4"^^xsd:integer)
+)
+"""
+
+ESCAPED = """Prefix(:=<http://example.org/cars#>)
+Prefix(rdfs:=<http://www.w3.org/2000/01/rdf-schema#>)
+Ontology(<http://example.org/cars#>
+AnnotationAssertion(rdfs:comment :Car "a \\"quoted\\" C:\\\\path")
+)
+"""
+
+SWRL = """Prefix(:=<http://example.org/cars#>)
+Ontology(<http://example.org/cars#>
+Declaration(Class(:Car))
+DLSafeRule(Body(ClassAtom(:Car Variable(<urn:x>))) Head(ClassAtom(:Car Variable(<urn:x>))))
+)
+"""
+
+class OFNReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, text: str) -> str:
+        path = os.path.join(self.dir, "cars.ofn")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_matches_funowl(self):
+        path = self.write(DOCUMENT)
+        reader = OFNReader(path)
+        g = reader.read(Graph())
+        self.assertTrue(isomorphic(g, _funowl_graph(path, False)))
+        self.assertEqual(reader.ontology_iri, str(EX))
+        self.assertEqual(reader.prefixes[0], ("", str(EX)))
+        self.assertIn((EX.Car, RDFS.label, Literal("Auto", lang="de")), g)
+        self.assertIn((EX.Wheel, RDFS.comment, Literal("4", datatype=XSD.integer)), g)
+
+    def test_unescapes_strings(self):
+        # funowl keeps the backslashes; the OWL 2 grammar makes \" and \\ escapes for " and \
+        g = OFNReader(self.write(ESCAPED)).read(Graph())
+        self.assertEqual(list(g.objects(EX.Car, RDFS.comment)), [Literal('a "quoted" C:\\path')])
+
+    def test_unsupported_constructs(self):
+        with self.assertRaises(OFNUnsupportedError):
+            OFNReader(self.write(SWRL)).read(Graph())
+
+    def test_falls_back_to_funowl(self):
+        # funowl reads no construct the reader lacks, so the reader is made to give up on a document funowl can read
+        path = self.write(DOCUMENT)
+        errors = []
+        with mock.patch.object(OFNReader, "read", side_effect=OFNUnsupportedError("Unsupported axiom X")) as read:
+            g, _ = load_graph(path, errors)
+        read.assert_called_once()
+        self.assertEqual(errors, [])
+        self.assertTrue(isomorphic(g, _funowl_graph(path, False)))
+
+if __name__ == "__main__":
+    unittest.main()
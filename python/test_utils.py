@@ -0,0 +1,61 @@
+import pickle
+import unittest
+from utils import VersionedDict, get_qname, get_ontology_for_uri, ontology_lookup
+
+NS = "http://example.org/onto#"
+
+class QNameResolverTest(unittest.TestCase):
+    def test_remapped_namespace_in_plain_dict(self):
+        prefix_map = {"http://x.org/b#": "a"}
+        self.assertEqual(get_qname(None, "http://x.org/b#Foo", NS, prefix_map), "a:Foo")
+        prefix_map["http://x.org/b#"] = "c"
+        self.assertEqual(get_qname(None, "http://x.org/b#Foo", NS, prefix_map), "c:Foo")
+
+    def test_remapped_namespace_in_versioned_dict(self):
+        prefix_map = VersionedDict({"http://x.org/b#": "a"})
+        self.assertEqual(get_qname(None, "http://x.org/b#Foo", NS, prefix_map), "a:Foo")
+        prefix_map["http://x.org/b#"] = "c"
+        self.assertEqual(get_qname(None, "http://x.org/b#Foo", NS, prefix_map), "c:Foo")
+        del prefix_map["http://x.org/b#"]
+        prefix_map.update({"http://x.org/": "x"})
+        self.assertEqual(get_qname(None, "http://x.org/b#Foo", NS, prefix_map), "x:b#Foo")
+
+    def test_default_namespace(self):
+        self.assertEqual(get_qname(None, NS + "Car", NS, VersionedDict({NS: ":"})), "Car")
+
+class OntologyLookupTest(unittest.TestCase):
+    def test_remapped_namespace(self):
+        for ns_to_ontology in ({"http://a.org/x#": "A"}, VersionedDict({"http://a.org/x#": "A"})):
+            with self.subTest(type=type(ns_to_ontology).__name__):
+                self.assertEqual(get_ontology_for_uri("http://a.org/x#Car", ns_to_ontology), "A")
+                ns_to_ontology["http://a.org/x#"] = "B"
+                self.assertEqual(get_ontology_for_uri("http://a.org/x#Car", ns_to_ontology), "B")
+
+    def test_reused_while_unchanged(self):
+        ns_to_ontology = VersionedDict({"http://a.org/x#": "A"})
+        lookup = ontology_lookup(ns_to_ontology)
+        get_ontology_for_uri("http://a.org/x#Car", ns_to_ontology)
+        self.assertIs(ontology_lookup(ns_to_ontology), lookup)
+        ns_to_ontology["http://b.org/y#"] = "B"
+        self.assertIsNot(ontology_lookup(ns_to_ontology), lookup)
+        self.assertEqual(get_ontology_for_uri("http://b.org/y#Truck", ns_to_ontology), "B")
+
+class VersionedDictTest(unittest.TestCase):
+    def test_counts_changes(self):
+        mapping = VersionedDict({"a": 1})
+        versions = [mapping.version]
+        for change in (lambda: mapping.__setitem__("b", 2), lambda: mapping.pop("a"), lambda: mapping.setdefault("c", 3),
+                       lambda: mapping.update(d=4), mapping.popitem, mapping.clear):
+            change()
+            versions.append(mapping.version)
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_pickles_with_contents(self):
+        mapping = VersionedDict({"a": 1})
+        mapping["b"] = 2
+        copy = pickle.loads(pickle.dumps(mapping))
+        self.assertIsInstance(copy, VersionedDict)
+        self.assertEqual(copy, {"a": 1, "b": 2})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,13 @@
 import re
+import argparse
 import logging
+from functools import lru_cache
 from typing import Optional, Iterable, Tuple, List
 from rdflib import Graph, RDF, RDFS, OWL, URIRef, Literal, BNode
 from rdflib.namespace import DC, DCTERMS, SKOS
+from ofn_reader import STANDARD_PREFIXES
+from stage_timer import timed
+from graph_index import graph_index, build_class_hierarchy, build_restriction_index, build_inherited_restrictions, build_subject_facts, restriction_signature
 
 log = logging.getLogger("ofn2mkdocs")
 
@@ -13,84 +18,189 @@ SKIP_IN_OTHER = set(DESC_PROPS) | {RDFS.label, DCTERMS.description, SKOS.note, S
 def _norm_base(u: str) -> str:
     return u.rstrip('/#')
 
-def get_prefix_named_pairs(ontology_doc, ns: str):
-    """Return [{'prefix': <str>, 'uri': <str>}, ...] from funowl PrefixDeclarations,
-    handling different return shapes of as_prefixes() across funowl versions."""
-    pd = getattr(ontology_doc, "prefixDeclarations", None)
-    if not pd:
-#        log.debug("No prefix declarations found, using default namespace: %s", ns)
-        return [{"prefix": "", "uri": ns}]
-
-    ap = pd.as_prefixes()
-    out = []
-
-    if hasattr(ap, "items"):
-        out = [{"prefix": str(k), "uri": str(v)} for k, v in ap.items()]
-    else:
-        for item in ap:
-            if isinstance(item, tuple) and len(item) == 2:
-                k, v = item
-                out.append({"prefix": str(k), "uri": str(v)})
-#                log.debug("      %s %s", k, v)
-                continue
-
-            p = (
-                getattr(item, "prefixName", None)
-                or getattr(item, "prefix", None)
-                or getattr(item, "name", None)
-            )
-            iri = (
-                getattr(item, "fullIRI", None)
-                or getattr(item, "iri", None)
-                or getattr(item, "iriRef", None)
-            )
-            if p is not None and iri is not None:
-                out.append({"prefix": str(p), "uri": str(iri)})
+def discover_namespaces(g: Graph) -> list:
+    """Return the sorted http(s) namespaces of the URIs used in g: each URI up to its last '/' or '#'.
+
+    The graph is scanned once and each distinct term is split only once."""
+    terms = set()
+    for triple in g:
+        terms.update(triple)
+    namespaces = set()
+    for term in terms:
+        if isinstance(term, URIRef):
+            uri = str(term)
+            ns_end = max(uri.rfind('/'), uri.rfind('#'))
+            if ns_end != -1 and uri.startswith('http'):
+                namespaces.add(uri[:ns_end + 1])
+    return sorted(namespaces)
+
+class PrefixAllocator:
+    """Add namespaces to a prefix map ({namespace: "prefix:"}) under prefixes that are not in use yet.
+
+    A prefix counts as used if some value of the map starts with "prefix:", as checked by scanning
+    the values; the used prefixes are kept in a set so that each allocation is a few lookups."""
+    def __init__(self, prefix_map: dict):
+        self.prefix_map = prefix_map
+        self.used = set()
+        for value in prefix_map.values():
+            self._mark_used(value)
+
+    def _mark_used(self, value: str):
+        for i, c in enumerate(value):
+            if c == ':':
+                self.used.add(value[:i])
+
+    def allocate(self, namespace: str, prefix: str) -> str:
+        """Map namespace to prefix, or to prefix1, prefix2, ... if taken; return the prefix used."""
+        base_prefix = prefix
+        count = 1
+        while prefix in self.used:
+            prefix = f"{base_prefix}{count}"
+            count += 1
+        self.prefix_map[namespace] = f"{prefix}:"
+        self._mark_used(self.prefix_map[namespace])
+        return prefix
+
+def get_prefix_named_pairs(prefixes: list, ns: str):
+    """Return [{'prefix': <str>, 'uri': <str>}, ...] for the (name, IRI) prefix declarations read from an OFN file.
+    The standard prefixes come first and redeclarations override them in place; the empty prefix is
+    declared for ns unless some prefix already maps to it."""
+    declared = dict(STANDARD_PREFIXES)
+    for name, iri in prefixes:
+        declared[name] = iri
+    out = [{"prefix": name, "uri": iri} for name, iri in declared.items() if name]
 
     if not any(d["uri"] == ns for d in out):
         out.append({"prefix": "", "uri": ns})
-
-#    log.debug("Prefixes extracted: %s", out)
     return out
 
-def get_qname(g: Graph, uri, ns: str, prefix_map: dict):
-    if uri is None or not str(uri).strip():
-        log.error("Invalid URI provided to get_qname: %s", uri)
-        return "INVALID_URI"
-    s = str(uri)
-    norm = _norm_base(s)
-#    log.debug("Processing URI: %s, normalized: %s, namespace: %s", s, norm, ns)
-    if norm == _norm_base(ns) or s.startswith(ns):
-        local = s[len(_norm_base(ns)):]
-        if local.startswith(('/', '#', '_')):
-            local = local[1:]
-        qname = local.rstrip()
-#        log.debug("Matched default namespace, returning QName: %s", qname)
-        return qname
-    if not prefix_map:
-        log.warning("Empty prefix map for URI: %s, namespace: %s", s, ns)
-        return s
-    for base in sorted(prefix_map.keys(), key=len, reverse=True):
-        base_norm = _norm_base(base)
-#        log.debug("Checking prefix base: %s, normalized: %s", base, base_norm)
-        if s == base or s.startswith(base) or norm == base_norm or norm.startswith(base_norm):
+class VersionedDict(dict):
+    """A dict that counts the changes made to it, so that a cache built from it can tell in O(1) whether it is stale."""
+    # Class default, so that items set while unpickling (before the instance state is restored) can be counted
+    version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+def built_from(cached_source: dict, cached_copy: dict, cached_version: int, mapping: dict) -> bool:
+    """Check whether a cache built from cached_source, when it held cached_copy at cached_version, still
+    matches mapping: an identity and version check for a VersionedDict, a comparison of contents otherwise."""
+    if cached_source is not mapping:
+        return False
+    if isinstance(mapping, VersionedDict):
+        return cached_version == mapping.version
+    return cached_copy == mapping
+
+# Size of the URI -> QName memo kept by each QNameResolver
+QNAME_MEMO_SIZE = 65536
+# Resolvers of recently used prefix maps, keyed by (ns, id(prefix_map))
+_qname_resolvers = {}
+_MAX_QNAME_RESOLVERS = 16
+
+class PrefixIndex:
+    """Longest-key prefix lookup over normalized namespaces.
+
+    Keys are ranked as in a sort by key length, longest first, and matched on their normalized
+    form. A normalized URI is cut at each distinct key length and looked up in a hash index,
+    so a lookup costs one probe per length instead of a scan of every key."""
+    def __init__(self, keys: Iterable[str]):
+        self.keys = {}
+        for rank, key in enumerate(sorted(keys, key=len, reverse=True)):
+            self.keys.setdefault(_norm_base(key), (rank, key))
+        self.lengths = sorted({len(key_norm) for key_norm in self.keys})
+
+    def find(self, norm: str) -> Optional[str]:
+        """Return the first ranked key whose normalized form is a prefix of norm, or None."""
+        best = None
+        for length in self.lengths:
+            if length > len(norm):
+                break
+            match = self.keys.get(norm[:length])
+            if match is not None and (best is None or match[0] < best[0]):
+                best = match
+        return best[1] if best else None
+
+class QNameResolver:
+    """Resolve URIs to QNames for one default namespace and prefix map, memoizing results per URI."""
+    def __init__(self, ns: str, prefix_map: dict, memo_size: int = QNAME_MEMO_SIZE):
+        self.ns = ns
+        self.ns_norm = _norm_base(ns)
+        self.source = prefix_map
+        self.version = getattr(prefix_map, "version", 0)
+        self.prefix_map = dict(prefix_map)
+        self.bases = PrefixIndex(prefix_map)
+        self.resolve = lru_cache(maxsize=memo_size)(self._resolve)
+
+    def _resolve(self, s: str) -> str:
+        norm = _norm_base(s)
+        if norm == self.ns_norm or s.startswith(self.ns):
+            local = s[len(self.ns_norm):]
+            if local.startswith(('/', '#', '_')):
+                local = local[1:]
+            return local.rstrip()
+        if not self.prefix_map:
+            log.warning("Empty prefix map for URI: %s, namespace: %s", s, self.ns)
+            return s
+        base = self.bases.find(norm)
+        if base is not None:
             local = s[len(base):]
             if local.startswith(('/', '#', '_')):
                 local = local[1:]
             local = local.rstrip()
             if not local:
-#                log.debug("No local part after prefix %s, using base URI", base)
                 local = s
-            if prefix_map[base] == ":":
-                qname = local
-            else:
-                qname = prefix_map[base] + ":" + local
-            return qname
-    if not s.startswith('N'):
-        log.warning("No prefix found for URI: %s, namespace: %s, prefix_map:", s, ns)
-#    for prefix in prefix_map:
-#        log.debug("  %s", str(prefix))
-    return s
+            if self.prefix_map[base] == ":":
+                return local
+            return self.prefix_map[base] + ":" + local
+        if not s.startswith('N'):
+            log.warning("No prefix found for URI: %s, namespace: %s, prefix_map:", s, self.ns)
+        return s
+
+def qname_resolver(ns: str, prefix_map: dict) -> QNameResolver:
+    """Return the resolver for ns and prefix_map, building it again if the map was changed since (see built_from)."""
+    key = (ns, id(prefix_map))
+    cached = _qname_resolvers.get(key)
+    if cached is not None and built_from(cached.source, cached.prefix_map, cached.version, prefix_map):
+        return cached
+    if len(_qname_resolvers) >= _MAX_QNAME_RESOLVERS:
+        _qname_resolvers.pop(next(iter(_qname_resolvers)))
+    resolver = _qname_resolvers[key] = QNameResolver(ns, prefix_map)
+    return resolver
+
+def get_qname(g: Graph, uri, ns: str, prefix_map: dict):
+    if uri is None or not str(uri).strip():
+        log.error("Invalid URI provided to get_qname: %s", uri)
+        return "INVALID_URI"
+    return qname_resolver(ns, prefix_map).resolve(str(uri))
 
 def get_label(g: Graph, c: URIRef) -> str:
     if c is None:
@@ -106,7 +216,7 @@ def get_first_literal(g: Graph, subj: URIRef, preds: Iterable[URIRef]) -> Option
         log.error("Invalid subject URI provided to get_first_literal: None")
         return None
     for p in preds:
-        for _, _, lit in g.triples((subj, p, None)):
+        for lit in g.objects(subj, p):
             if isinstance(lit, Literal):
                 return str(lit)
     return None
@@ -182,37 +292,40 @@ def get_class_expression_str(g: Graph, expr, ns: str, prefix_map: dict) -> str:
         return f"(not {get_class_expression_str(g, comp, ns, prefix_map)})"
     return str(expr)
 
+@timed("class_restrictions")
 def class_restrictions(g: Graph, c: URIRef, ns: str, prefix_map: dict) -> List[Tuple[str, str]]:
     """Extract OWL restrictions and subClassOf constraints for Markdown output."""
     if c is None:
         return []
 
     rows = []
-    for super_cls in g.objects(c, RDFS.subClassOf):
-        if isinstance(super_cls, URIRef) and (super_cls, RDF.type, OWL.Class) in g:
+    restrictions = graph_index(g, build_restriction_index).by_node
+    facts = graph_index(g, build_subject_facts)
+    for super_cls in facts.objects(c, RDFS.subClassOf):
+        if isinstance(super_cls, URIRef) and OWL.Class in facts.objects(super_cls, RDF.type):
             super_qname = get_qname(g, super_cls, ns, prefix_map)
             rows.append(("subClassOf", super_qname))
-        elif (super_cls, RDF.type, OWL.Restriction) in g:
-            restr = super_cls
-            prop = g.value(restr, OWL.onProperty)
-            prop_name, is_inverse, base_prop = get_property_info(g, prop, ns, prefix_map)
+        elif super_cls in restrictions:
+            restr = restrictions[super_cls]
+            prop = restr.on_property
+            prop_name, is_inverse, base_prop = get_property_info(facts, prop, ns, prefix_map)
 
-            all_values_from = g.value(restr, OWL.allValuesFrom)
+            all_values_from = restr.all_values_from
             if all_values_from:
                 label_parts = ["only"]
-                target_str = get_class_expression_str(g, all_values_from, ns, prefix_map)
+                target_str = get_class_expression_str(facts, all_values_from, ns, prefix_map)
                 rows.append((prop_name, f"{' '.join(label_parts)} {target_str}"))
 
-            some_values_from = g.value(restr, OWL.someValuesFrom)
+            some_values_from = restr.some_values_from
             if some_values_from:
                 label_parts = ["some"]
-                target_str = get_class_expression_str(g, some_values_from, ns, prefix_map)
+                target_str = get_class_expression_str(facts, some_values_from, ns, prefix_map)
                 rows.append((prop_name, f"{' '.join(label_parts)} {target_str}"))
 
-            on_class = g.value(restr, OWL.onClass)
-            qualified_card = g.value(restr, OWL.qualifiedCardinality)
-            min_qualified_card = g.value(restr, OWL.minQualifiedCardinality)
-            max_qualified_card = g.value(restr, OWL.maxQualifiedCardinality)
+            on_class = restr.on_class
+            qualified_card = restr.qualified_cardinality
+            min_qualified_card = restr.min_qualified_cardinality
+            max_qualified_card = restr.max_qualified_cardinality
             if prop_name and (qualified_card is not None or min_qualified_card is not None or max_qualified_card is not None) and on_class:
                 label_parts = []
                 if qualified_card is not None:
@@ -222,10 +335,10 @@ def class_restrictions(g: Graph, c: URIRef, ns: str, prefix_map: dict) -> List[T
                 if max_qualified_card is not None:
                     label_parts.append(f"max {max_qualified_card}")
                 if label_parts:
-                    target_str = get_class_expression_str(g, on_class, ns, prefix_map)
+                    target_str = get_class_expression_str(facts, on_class, ns, prefix_map)
                     rows.append((prop_name, f"{' '.join(label_parts)} {target_str}"))
 
-            on_data_range = g.value(restr, OWL.onDataRange)
+            on_data_range = restr.on_data_range
             if prop_name and (qualified_card or min_qualified_card or max_qualified_card) and on_data_range:
                 label_parts = []
                 if qualified_card is not None:
@@ -235,30 +348,30 @@ def class_restrictions(g: Graph, c: URIRef, ns: str, prefix_map: dict) -> List[T
                 if max_qualified_card is not None:
                     label_parts.append(f"max {max_qualified_card}")
                 if label_parts:
-                    range_name = get_class_expression_str(g, on_data_range, ns, prefix_map)
+                    range_name = get_class_expression_str(facts, on_data_range, ns, prefix_map)
                     rows.append((prop_name, f"{' '.join(label_parts)} {range_name}"))
 
-            card = g.value(restr, OWL.cardinality)
-            min_card = g.value(restr, OWL.minCardinality)
-            max_card = g.value(restr, OWL.maxCardinality)
+            card = restr.cardinality
+            min_card = restr.min_cardinality
+            max_card = restr.max_cardinality
             if card is not None:
-                range_type = g.value(base_prop, RDFS.range) if base_prop else None
+                range_type = facts.value(base_prop, RDFS.range) if base_prop else None
                 if range_type:
-                    range_name = get_class_expression_str(g, range_type, ns, prefix_map)
+                    range_name = get_class_expression_str(facts, range_type, ns, prefix_map)
                     rows.append((prop_name, f"exactly {card} {range_name}"))
                 else:
                     rows.append((prop_name, f"exactly {card} owl::Thing"))
             if min_card is not None:
-                range_type = g.value(base_prop, RDFS.range) if base_prop else None
+                range_type = facts.value(base_prop, RDFS.range) if base_prop else None
                 if range_type:
-                    range_name = get_class_expression_str(g, range_type, ns, prefix_map)
+                    range_name = get_class_expression_str(facts, range_type, ns, prefix_map)
                     rows.append((prop_name, f"min {min_card} {range_name}"))
                 else:
                     rows.append((prop_name, f"min {min_card} owl::Thing"))
             if max_card is not None:
-                range_type = g.value(base_prop, RDFS.range) if base_prop else None
+                range_type = facts.value(base_prop, RDFS.range) if base_prop else None
                 if range_type:
-                    range_name = get_class_expression_str(g, range_type, ns, prefix_map)
+                    range_name = get_class_expression_str(facts, range_type, ns, prefix_map)
                     rows.append((prop_name, f"max {max_card} {range_name}"))
                 else:
                     rows.append((prop_name, f"max {max_card} owl::Thing"))
@@ -298,14 +411,7 @@ def get_all_class_superclasses(cls, g):
     if cls is None:
         log.error("Invalid class URI provided to get_all_class_superclasses: None")
         return set()
-    direct_supers = set()
-    for super_cls in g.objects(cls, RDFS.subClassOf):
-        if isinstance(super_cls, URIRef) and super_cls != OWL.Thing and (super_cls, RDF.type, OWL.Class) in g:
-            direct_supers.add(super_cls)
-    all_supers = set(direct_supers)
-    for sup in direct_supers:
-        all_supers.update(get_all_class_superclasses(sup, g))
-    return all_supers
+    return set(graph_index(g, build_class_hierarchy).superclasses.get(cls, ()))
 
 def get_property_info(g: Graph, prop: URIRef, ns: str, prefix_map: dict) -> tuple:
     """Get property name, handling inverses."""
@@ -327,23 +433,12 @@ def is_refined_property(g: Graph, cls: URIRef, prop: URIRef, restriction: URIRef
     if cls is None or prop is None or restriction is None:
         log.error("Invalid input to is_refined_property: cls=%s, prop=%s, restriction=%s", cls, prop, restriction)
         return False
-    all_supers = get_all_class_superclasses(cls, g)
-    for super_cls in all_supers:
-        for super_restr in g.objects(super_cls, RDFS.subClassOf):
-            if (super_restr, RDF.type, OWL.Restriction) in g:
-                super_prop = g.value(super_restr, OWL.onProperty)
-                if super_prop == prop:
-                    current_avf = g.value(restriction, OWL.allValuesFrom)
-                    super_avf = g.value(super_restr, OWL.allValuesFrom)
-                    current_card = g.value(restriction, OWL.qualifiedCardinality) or g.value(restriction, OWL.minQualifiedCardinality) or g.value(restriction, OWL.maxQualifiedCardinality)
-                    super_card = g.value(super_restr, OWL.qualifiedCardinality) or g.value(super_restr, OWL.minQualifiedCardinality) or g.value(super_restr, OWL.maxQualifiedCardinality)
-                    current_on_class = g.value(restriction, OWL.onClass)
-                    super_on_class = g.value(super_restr, OWL.onClass)
-                    if (current_avf != super_avf or
-                        current_card != super_card or
-                        current_on_class != super_on_class):
-                        return True
-    return False
+    inherited = graph_index(g, build_inherited_restrictions).get(cls, {}).get(prop)
+    if not inherited:
+        return False
+    current = graph_index(g, build_restriction_index).by_node.get(restriction)
+    signature = restriction_signature(current) if current else (None, None, None)
+    return any(s != signature for s in inherited)
 
 def insert_spaces(name: str) -> str:
     if not name:
@@ -353,9 +448,82 @@ def insert_spaces(name: str) -> str:
     name = re.sub(r'([a-z\d])([A-Z])', r'\1 \2', name)
     return name
 
+class OntologyLookup:
+    """Map URIs to the ontology whose namespace is their longest prefix, for one ns_to_ontology map.
+
+    hits counts lookups answered from the memo, misses those that had to search the index."""
+    def __init__(self, ns_to_ontology: dict, memo_size: int = QNAME_MEMO_SIZE):
+        self.source = ns_to_ontology
+        self.version = getattr(ns_to_ontology, "version", 0)
+        self.ns_to_ontology = dict(ns_to_ontology)
+        self.namespaces = PrefixIndex(ns_to_ontology)
+        self.memo_size = memo_size
+        self.memo = {}
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, uri_str: str) -> Optional[str]:
+        if uri_str in self.memo:
+            self.hits += 1
+            return self.memo[uri_str]
+        self.misses += 1
+        ont_ns = self.namespaces.find(_norm_base(uri_str))
+        ont_name = self.ns_to_ontology[ont_ns] if ont_ns is not None else None
+        if len(self.memo) >= self.memo_size:
+            self.memo.clear()
+        self.memo[uri_str] = ont_name
+        return ont_name
+
+# Lookup of the current ns_to_ontology map, with counters accumulated over rebuilds
+_ontology_lookup = None
+_ontology_lookup_stats = {"hits": 0, "misses": 0, "rebuilds": 0}
+
+def ontology_lookup(ns_to_ontology: dict) -> OntologyLookup:
+    """Return the lookup for ns_to_ontology, building it again if the map was changed or replaced (see built_from)."""
+    global _ontology_lookup
+    if _ontology_lookup is not None and built_from(_ontology_lookup.source, _ontology_lookup.ns_to_ontology, _ontology_lookup.version, ns_to_ontology):
+        return _ontology_lookup
+    if _ontology_lookup is not None:
+        _ontology_lookup_stats["hits"] += _ontology_lookup.hits
+        _ontology_lookup_stats["misses"] += _ontology_lookup.misses
+    _ontology_lookup = OntologyLookup(ns_to_ontology)
+    _ontology_lookup_stats["rebuilds"] += 1
+    return _ontology_lookup
+
+def ontology_lookup_stats() -> dict:
+    """Return the hit, miss and rebuild counters of get_ontology_for_uri in this process."""
+    stats = dict(_ontology_lookup_stats)
+    if _ontology_lookup is not None:
+        stats["hits"] += _ontology_lookup.hits
+        stats["misses"] += _ontology_lookup.misses
+    return stats
+
+def reset_ontology_lookup():
+    """Forget the lookup and its counters, e.g. those a forked --jobs worker inherits from the parent."""
+    global _ontology_lookup
+    _ontology_lookup = None
+    for name in _ontology_lookup_stats:
+        _ontology_lookup_stats[name] = 0
+
+def add_ontology_lookup_stats(stats: dict):
+    """Add counters collected in another process (e.g. a --jobs worker) to this process's totals."""
+    for name, count in stats.items():
+        _ontology_lookup_stats[name] += count
+
 def get_ontology_for_uri(uri_str: str, ns_to_ontology: dict) -> str:
-    norm_uri = _norm_base(uri_str)
-    for ont_ns, ont_name in sorted(ns_to_ontology.items(), key=lambda x: len(x[0]), reverse=True):
-        if norm_uri.startswith(_norm_base(ont_ns)):
-            return ont_name
-    return None
\ No newline at end of file
+    return ontology_lookup(ns_to_ontology).lookup(uri_str)
+
+def parse_build_args(script_name: str, extensions: str) -> argparse.Namespace:
+    """Parse the command line options shared by the *2mkdocs.py entry points; extensions is e.g. ".ttl" or ".ttl, .owl and .ofn"."""
+    parser = argparse.ArgumentParser(prog=script_name, description=f"Generate MkDocs class pages and diagrams for the {extensions} ontologies in docs/.")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N", help="number of worker processes for class pages and diagrams (default: 1)")
+    parser.add_argument("--rebuild", action="store_true", help="ignore the build manifest and regenerate every page and diagram")
+    parser.add_argument("--no-cache", action="store_true", help="parse every ontology file instead of loading it from the graph cache")
+    parser.add_argument("--write-dot", action="store_true", help="also write the DOT source of every diagram to docs/diagrams")
+    parser.add_argument("--max-diagram-nodes", type=int, metavar="N", help="most class and expression nodes in a diagram before the rest is summarised as \"+N more\" (default: 40, 0 for no cap)")
+    parser.add_argument("--max-diagram-edges", type=int, metavar="N", help="most visible edges in a diagram before the rest is summarised as \"+N more\" (default: 60, 0 for no cap)")
+    parser.add_argument("--max-expression-depth", type=int, metavar="N", help="nesting depth of class expressions in a diagram beyond which operands are summarised (default: 3, 0 for no cap)")
+    parser.add_argument("--profile", action="store_true", help="write the time, CPU time and graph probes of every stage and class to build_profile.json and build_profile.html")
+    parser.add_argument("--profile-hot-path", action="store_true", help="with --profile, also run cProfile around class page and diagram generation and write build_profile.prof")
+    parser.add_argument("--memory", action="store_true", help="trace memory with tracemalloc and write peak and retained memory per ontology and stage to build_memory.json")
+    return parser.parse_args()